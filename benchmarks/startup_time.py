@@ -0,0 +1,56 @@
+"""Startup time of every main.py command: CLI import plus the modules the command imports.
+
+Usage: python benchmarks/startup_time.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules imported by each command before doing any work. Keep in sync with main.py
+COMMAND_IMPORTS = {
+    "init-db": ["src.db"],
+    "get-top-holders": ["src.db"],
+    "run-indexing": ["src.db", "src.db.db_utils", "src.providers", "src.services"],
+    "run-chains": ["src.db", "src.db.db_utils", "src.models", "src.services"],
+    "serve-api": ["src.api"],
+    "export": ["src.services.export_service"],
+    "reconcile": ["src.providers", "src.services.reconcile_service"],
+    "rebuild-balances": ["src.db"],
+    "watch-balances": ["src.db"],
+    "load-test": ["src.db", "src.providers.stand_in_node", "src.services.load_test_service"],
+}
+QUERY_COMMANDS = ["get-top-holders"]
+QUERY_BUDGET = 1.0  # seconds
+
+
+def measure(modules, runs: int) -> float:
+    """Median wall time of a fresh interpreter importing main and the modules"""
+    code = "; ".join(["import main"] + [f"import {module}" for module in modules])
+    timings = []
+    for _ in range(runs):
+        st = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+        timings.append(time.perf_counter() - st)
+    return statistics.median(timings)
+
+
+def main(runs: int = 5) -> int:
+    baseline = measure([], runs)
+    print(f"{'python -c import main':<25} {baseline:.3f}s")
+    over_budget = False
+    for command, modules in COMMAND_IMPORTS.items():
+        elapsed = measure(modules, runs)
+        flag = ""
+        if command in QUERY_COMMANDS and elapsed > QUERY_BUDGET:
+            flag = f" OVER BUDGET ({QUERY_BUDGET}s)"
+            over_budget = True
+        print(f"{command:<25} {elapsed:.3f}s{flag}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
@@ -0,0 +1,82 @@
+"""Ingest throughput of a Storage backend in isolation, with synthetic transfers and no provider.
+
+Usage: python benchmarks/storage_ingest.py [storage_url] [transfers]
+    storage_url: 'sqlite:///<path>' (default, a temporary file) or 'postgres' for the Postgres of the settings
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import get_storage  # noqa: E402
+from src.models import TransferModel, BalanceModel  # noqa: E402
+
+CHAIN_ID = 1
+TOKEN = "0x" + "ab" * 20
+WALLETS = 10000
+BATCH_SIZE = 2000  # Transfers per insert, like a backfill chunk
+INCREMENTS = 2000  # Single balance increments, like the real-time indexer
+
+
+def synthetic_transfers(count: int):
+    rng = random.Random(0)
+    wallets = ["0x" + format(i, "040x") for i in range(1, WALLETS + 1)]
+    start = datetime(2023, 1, 1)
+    return [
+        TransferModel(
+            chain_id=CHAIN_ID,
+            block_num=16000000 + i // 10,
+            log_index=i % 10,
+            tx_hash="0x" + format(i, "064x"),
+            tx_from=rng.choice(wallets),
+            tx_to=rng.choice(wallets),
+            value=Decimal(rng.randint(1, 10**24)).scaleb(-18),
+            type="Transfer",
+            token_address=TOKEN,
+            block_time=start + timedelta(seconds=12 * (i // 10)),
+        )
+        for i in range(count)
+    ]
+
+
+def timed(name: str, rows: int, func) -> None:
+    st = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - st
+    print(f"{name:<25} {rows:>9} rows {elapsed:8.3f}s {rows / elapsed:>12.0f} rows/s")
+
+
+def main(url: str, count: int) -> None:
+    if not url:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    storage = get_storage(url if url != "postgres" else "")
+    storage.create_tables()
+    for delete in (storage.delete_token_transfers, storage.delete_token_balances, storage.delete_transfer_rollups):
+        delete(CHAIN_ID, TOKEN)
+    transfers = synthetic_transfers(count)
+    batches = [transfers[i: i + BATCH_SIZE] for i in range(0, count, BATCH_SIZE)]
+
+    timed("insert_transfers", count, lambda: [storage.insert_transfers(batch) for batch in batches])
+    timed(
+        "apply_transfer_rollups", count,
+        lambda: [storage.apply_transfer_rollups(CHAIN_ID, TOKEN, batch) for batch in batches],
+    )
+    balances = [
+        BalanceModel(chain_id=CHAIN_ID, token_address=TOKEN, wallet_address="0x" + format(i, "040x"), balance=Decimal(i))
+        for i in range(1, WALLETS + 1)
+    ]
+    timed("insert_balances", len(balances), lambda: storage.insert_balances(CHAIN_ID, balances))
+    timed(
+        "increment_balance", INCREMENTS,
+        lambda: [storage.increment_balance(CHAIN_ID, TOKEN, t.tx_to, t.value) for t in transfers[:INCREMENTS]],
+    )
+    timed("get_token_top_holders", 100, lambda: storage.get_token_top_holders(CHAIN_ID, TOKEN, 100))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "", int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
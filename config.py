@@ -3,15 +3,27 @@ from pydantic import BaseSettings
 
 
 class Config(BaseSettings):
-    POSTGRES_HOST: str
-    POSTGRES_USER: str
-    POSTGRES_PASS: str
-    POSTGRES_PORT: int
-    POSTGRES_DATABASE: str
+    # Empty for Postgres, 'sqlite:///<path>' for the embedded storage with no external service
+    STORAGE_URL: str = ""
+    POSTGRES_HOST: str = "localhost"
+    POSTGRES_USER: str = ""
+    POSTGRES_PASS: str = ""
+    POSTGRES_PORT: int = 5432
+    POSTGRES_DATABASE: str = ""
+    # Connections shared by every chain and service of the process
+    POSTGRES_POOL_SIZE: int = 10
+    POSTGRES_MAX_OVERFLOW: int = 5
+    # Read replicas of the primary, comma separated 'host' or 'host:port', with the same user and database
+    POSTGRES_REPLICAS: str = ""
+    # Blocks a replica may be behind the last committed block of a token before its reads go to the primary
+    POSTGRES_REPLICA_MAX_LAG: int = 0
 
     PROVIDER_URL: str
     PROVIDER_WEBSOCKET: str
     PROVIDER_KEY: str
+    # Extra endpoints/keys to balance the load, comma separated 'url' or 'url|weight'
+    PROVIDER_ENDPOINTS: str = ""
+    PROVIDER_CU_PER_SECOND: int = 330
 
 
 load_dotenv()
@@ -3,49 +3,154 @@ import asyncio
 import logging
 
 from config import settings
-from src.db import Base, get_token_top_holders
-from src.db.db_utils import create_tables
-from src.providers import AlchemyProvider
-from src.services import IndexerService, BackfillService
-from src.constants import INIT_BLOCK, DEFAULT_CHAIN_ID
+from src.constants import (
+    INIT_BLOCK,
+    DEFAULT_CHAIN_ID,
+    EXPORT_ROWS_PER_FILE,
+    FETCH_STRATEGIES,
+    FETCH_STRATEGY_AUTO,
+    FETCH_STRATEGY_DEFAULT,
+    COMPACTION_BATCH_SIZE,
+    ARCHIVE_FORMAT_DEFAULT,
+)
 
 logger = logging.getLogger()
 logger.setLevel(level=logging.INFO)
 
+# Each command imports only what it uses (web3, pandas and the db engine are slow to load)
+
 
 @click.group()
 def cli():
     pass
 
 
+def _build_provider():
+    """Returns the AlchemyProvider of DEFAULT_CHAIN_ID configured from settings"""
+    from src.providers import AlchemyProvider, parse_endpoints
+
+    return AlchemyProvider(
+        DEFAULT_CHAIN_ID,
+        settings.PROVIDER_URL,
+        settings.PROVIDER_WEBSOCKET,
+        settings.PROVIDER_KEY,
+        endpoints=parse_endpoints(settings.PROVIDER_ENDPOINTS),
+        compute_units_per_second=settings.PROVIDER_CU_PER_SECOND,
+    )
+
+
+def _build_storage():
+    """Returns the Storage configured in settings.STORAGE_URL, Postgres by default"""
+    from src.db import get_storage
+
+    return get_storage(settings.STORAGE_URL)
+
+
+@click.command()
+def init_db() -> None:
+    """Creates the tables if they don't exist already."""
+    _build_storage().create_tables()
+
+
 @click.command()
 @click.argument("contract_address", type=str)
 @click.argument("backfill", type=bool, default=True)
-def run_indexing(contract_address: str, backfill: bool) -> None:
+@click.option(
+    "--fetch-strategy",
+    type=click.Choice(FETCH_STRATEGIES + (FETCH_STRATEGY_AUTO,)),
+    default=FETCH_STRATEGY_DEFAULT,
+    help="Backfill calls. auto picks the cheapest per range given the log density of the token",
+)
+@click.option("--profile", is_flag=True, default=False, help="Sample the indexer and write a flamegraph and summary")
+@click.option("--profile-seconds", type=float, default=60, help="Seconds to profile")
+@click.option("--profile-chunks", type=int, default=None, help="Backfill chunks to profile, if reached before")
+@click.option("--profile-dir", type=click.Path(file_okay=False), default="profile")
+def run_indexing(
+        contract_address: str,
+        backfill: bool,
+        fetch_strategy: str,
+        profile: bool,
+        profile_seconds: float,
+        profile_chunks: int,
+        profile_dir: str,
+) -> None:
     """Strats the indexing for the contract 'contract_address'.
 
     :param contract_address: contract_address
     :param backfill: if True, backfill past
+    :param fetch_strategy: calls made by the backfill, see src.providers.fetch_strategies
+    :param profile: if set, run the sampling profiler
+    :param profile_seconds: seconds to profile
+    :param profile_chunks: Optional. backfill chunks to profile
+    :param profile_dir: directory of profile.collapsed and profile_summary.txt
     :return : None
     """
+    profiler = None
+    if profile:
+        from src.utils.profiler import SamplingProfiler
+
+        profiler = SamplingProfiler(profile_dir, max_seconds=profile_seconds, max_chunks=profile_chunks)
+        profiler.start()
+    try:
+        _run_indexing(contract_address, backfill, fetch_strategy, profiler)
+    finally:
+        if profiler:
+            profiler.stop()
+
+
+def _run_indexing(contract_address: str, backfill: bool, fetch_strategy: str, profiler) -> None:
+    """Backfills or catches up contract_address, then follows it in real time"""
+    from src.services import IndexerService, BackfillService
+
+    storage = _build_storage()
+    storage.create_tables()
+
     logging.info(f"Starting Indexer for contract '{contract_address}' for chain ID {DEFAULT_CHAIN_ID}")
-    provider = AlchemyProvider(DEFAULT_CHAIN_ID, settings.PROVIDER_URL, settings.PROVIDER_WEBSOCKET, settings.PROVIDER_KEY)
-    backfill_service = BackfillService(DEFAULT_CHAIN_ID, provider)
-    indexer_service = IndexerService(DEFAULT_CHAIN_ID, provider)
+    provider = _build_provider()
+    backfill_service = BackfillService(DEFAULT_CHAIN_ID, provider, storage, fetch_strategy)
+    indexer_service = IndexerService(DEFAULT_CHAIN_ID, provider, storage)
 
     checksum_address = provider.checksum_address(contract_address)
     current_block = provider.get_latest_block_num()
     if backfill:
         logging.info(f"Backfilling Transfers for ERC20 contract '{checksum_address}' up to block {current_block}")
         # TODO IMPROVEMENT: replace INIT_BLOCK by finding contract creation using Etherscan API
-        backfill_service.backfill(checksum_address, INIT_BLOCK, current_block)
+        backfill_service.backfill(
+            checksum_address, INIT_BLOCK, current_block, on_chunk=profiler.chunk_done if profiler else None
+        )
     else:
         logging.info(f"Skipped Backfill")
+        last_block = storage.get_last_indexed_block(DEFAULT_CHAIN_ID, checksum_address)
+        if last_block is not None:
+            logging.info(f"Catching up Transfers from block {last_block + 1} up to block {current_block}")
+            indexer_service.catch_up(checksum_address, last_block + 1, current_block)
 
+    # Blocks mined while backfilling or catching up are caught up by follow once subscribed
     logging.info(f"Real-Time Indexing starting...")
     asyncio.run(indexer_service.start(checksum_address))
 
 
+@click.command()
+@click.argument("chains_file", type=click.Path(exists=True, dir_okay=False))
+def run_chains(chains_file: str) -> None:
+    """Indexes several chains in one process, as configured in the JSON list of chains_file.
+
+    :param chains_file: JSON file with a list of ChainConfigModel
+    :return : None
+    """
+    from typing import List
+    from pydantic import parse_file_as
+    from src.models import ChainConfigModel
+    from src.services import MultiChainService
+
+    storage = _build_storage()
+    storage.create_tables()
+
+    chains = parse_file_as(List[ChainConfigModel], chains_file)
+    logging.info(f"Starting Indexer for chain IDs {[chain.chain_id for chain in chains]}")
+    asyncio.run(MultiChainService(chains, max_workers=settings.POSTGRES_POOL_SIZE, storage=storage).run())
+
+
 @click.command()
 @click.argument("token_address", type=str)
 @click.argument("limit", type=int, default=10)
@@ -56,15 +161,241 @@ def get_top_holders(token_address: str, limit: int) -> None:
     :param limit: number of holders to display
     :return : None
     """
-    holders = get_token_top_holders(DEFAULT_CHAIN_ID, token_address, limit)
+    holders = _build_storage().get_token_top_holders(DEFAULT_CHAIN_ID, token_address, limit)
     i = 1
     for holder in holders:
         print(f"#{i}. wallet_address: {holder.wallet_address}. balance: {holder.balance}")
         i += 1
 
+
+@click.command()
+@click.option("--host", type=str, default="127.0.0.1")
+@click.option("--port", type=int, default=8080)
+def serve_api(host: str, port: int) -> None:
+    """Serves the read-only HTTP API with block-keyed response caching.
+
+    :param host: interface to bind
+    :param port: port to listen on
+    :return : None
+    """
+    from src.api import run_api
+
+    run_api(DEFAULT_CHAIN_ID, host, port)
+
+
+@click.command()
+@click.argument("table", type=click.Choice(["transfers", "balances"]))
+@click.argument("token_address", type=str)
+@click.argument("output_dir", type=click.Path(file_okay=False))
+@click.option("--format", "file_format", type=click.Choice(["parquet", "csv"]), default="parquet")
+@click.option("--from-block", type=int, default=None)
+@click.option("--to-block", type=int, default=None)
+@click.option("--rows-per-file", type=int, default=EXPORT_ROWS_PER_FILE)
+def export(
+        table: str,
+        token_address: str,
+        output_dir: str,
+        file_format: str,
+        from_block: int,
+        to_block: int,
+        rows_per_file: int,
+) -> None:
+    """Streams the transfers or balances of token_address into chunked Parquet or CSV files.
+
+    :param table: transfers or balances
+    :param token_address: Token Address
+    :param output_dir: directory of the files
+    :param file_format: parquet or csv
+    :param from_block: Optional. first block of the transfers
+    :param to_block: Optional. last block of the transfers
+    :param rows_per_file: max rows per file
+    :return : None
+    """
+    from src.services.export_service import ExportService
+
+    files = ExportService(DEFAULT_CHAIN_ID).export(
+        table,
+        token_address,
+        output_dir,
+        file_format=file_format,
+        from_block=from_block,
+        to_block=to_block,
+        rows_per_file=rows_per_file,
+    )
+    for file in files:
+        print(file)
+
+
+@click.command()
+@click.argument("token_address", type=str)
+@click.option("--sample", type=int, default=None, help="Number of random holders to check. All if not set")
+@click.option("--repair", is_flag=True, default=False, help="Overwrite the mismatched balances")
+def reconcile(token_address: str, sample: int, repair: bool) -> None:
+    """Verifies the indexed balances of token_address against the on-chain balanceOf.
+
+    :param token_address: Token Address
+    :param sample: Optional. number of random holders to check
+    :param repair: if set, repair the mismatched balances
+    :return : None
+    """
+    from src.services.reconcile_service import ReconcileService
+
+    provider = _build_provider()
+    report = ReconcileService(DEFAULT_CHAIN_ID, provider).reconcile(token_address, sample=sample, repair=repair)
+    for mismatch in report.mismatches:
+        print(f"wallet_address: {mismatch.wallet_address}. db: {mismatch.db_balance}. chain: {mismatch.chain_balance}")
+    print(f"Checked {report.checked} holders at block {report.block_num}. Mismatches: {len(report.mismatches)}. Repaired: {report.repaired}")
+
+
+@click.command()
+@click.argument("token_address", type=str)
+def rebuild_balances(token_address: str) -> None:
+    """Recomputes the balances and holder stats of token_address from the stored transfers, inside Postgres.
+    Stop the real-time indexing of the token first.
+
+    :param token_address: Token Address
+    :return : None
+    """
+    import time
+    from src.db import rebuild_token_balances
+
+    st = time.time()
+    rows = rebuild_token_balances(DEFAULT_CHAIN_ID, token_address)
+    print(f"Rebuilt {rows} balances in {time.time() - st:.1f} seconds")
+
+
+@click.command()
+@click.argument("token_address", type=str)
+@click.argument("retain_blocks", type=int)
+@click.option("--archive-dir", type=click.Path(file_okay=False), default=None, help="Archive the compacted transfers here instead of only deleting them")
+def set_retention(token_address: str, retain_blocks: int, archive_dir: str) -> None:
+    """Sets the retention policy of token_address: transfers older than its last retain_blocks indexed blocks are
+    compacted into a balance checkpoint by compact-transfers.
+
+    :param token_address: Token Address
+    :param retain_blocks: blocks of transfers history kept
+    :param archive_dir: Optional. directory of the compressed archives of the compacted transfers
+    :return : None
+    """
+    from src.services.retention_service import RetentionService
+
+    RetentionService(DEFAULT_CHAIN_ID).set_policy(token_address, retain_blocks, archive_dir)
+    print(f"Keeping {retain_blocks} blocks of transfers of {token_address}")
+
+
+@click.command()
+@click.argument("token_addresses", type=str, nargs=-1)
+@click.option("--format", "file_format", type=click.Choice(["csv.gz", "parquet"]), default=ARCHIVE_FORMAT_DEFAULT)
+@click.option("--batch-size", type=int, default=COMPACTION_BATCH_SIZE, help="Transfers deleted per transaction")
+def compact_transfers(token_addresses: tuple, file_format: str, batch_size: int) -> None:
+    """Archives and deletes the transfers older than the retention policy of the tokens, keeping their balances
+    exact through balance checkpoints. Can run along the indexer.
+
+    :param token_addresses: Optional. tokens to compact, all the tokens with a retention policy if not given
+    :param file_format: csv.gz or parquet archives
+    :param batch_size: transfers per transaction
+    :return : None
+    """
+    from src.services.retention_service import RetentionService
+
+    service = RetentionService(DEFAULT_CHAIN_ID, batch_size=batch_size, file_format=file_format)
+    if token_addresses:
+        reports = [service.compact(token_address) for token_address in token_addresses]
+    else:
+        reports = service.compact_all()
+    for report in reports:
+        print(f"token: {report.token_address}. cutoff block: {report.cutoff_block}. compacted: {report.compacted}. files: {len(report.files)}")
+        for file in report.files:
+            print(file)
+
+
+@click.command()
+@click.argument("token_addresses", type=str, nargs=-1)
+def watch_balances(token_addresses: tuple) -> None:
+    """Prints the balance changes notified by the indexers, optionally of some tokens only.
+
+    :param token_addresses: Optional. tokens to watch, all if not given
+    :return : None
+    """
+    from src.db import listen_balance_changes
+
+    tokens = {token.lower() for token in token_addresses} or None
+    for change in listen_balance_changes(tokens):
+        print(f"block: {change.block_num}. token: {change.token_address}. wallet_address: {change.wallet_address}. balance: {change.balance}")
+
+
+@click.command()
+@click.option("--rate", type=float, default=1000, help="Transfers per second produced by the stand-in node")
+@click.option("--duration", type=float, default=60, help="Seconds of block production")
+@click.option("--tokens", type=int, default=2, help="Tokens emitting the transfers")
+@click.option("--block-interval", type=float, default=1.0, help="Seconds between blocks")
+@click.option("--reorg-every", type=int, default=0, help="Blocks between head reorgs, 0 to disable them")
+@click.option("--history-blocks", type=int, default=100, help="Blocks mined before the start, caught up first")
+@click.option("--max-concurrency", type=int, default=1, help="Tokens written at the same time")
+@click.option("--storage-url", type=str, default=None, help="Storage of the indexer, a temporary SQLite file by default")
+def load_test(
+        rate: float,
+        duration: float,
+        tokens: int,
+        block_interval: float,
+        reorg_every: int,
+        history_blocks: int,
+        max_concurrency: int,
+        storage_url: str,
+) -> None:
+    """Drives the real-time indexer against a local stand-in node, offline, and reports its sustained throughput,
+    notification to commit latency and memory.
+
+    :param rate: transfers per second
+    :param duration: seconds of block production
+    :param tokens: number of tokens
+    :param block_interval: seconds between blocks
+    :param reorg_every: blocks between reorgs, 0 to disable them
+    :param history_blocks: blocks caught up before following
+    :param max_concurrency: tokens written at the same time
+    :param storage_url: Optional. 'sqlite:///<path>' or '' for the Postgres of the settings
+    :return : None
+    """
+    import os
+    import tempfile
+    from src.db import get_storage
+    from src.providers.stand_in_node import StandInNode
+    from src.services.load_test_service import LoadTestService
+
+    # The per transfer logs would flood the report
+    logger.setLevel(logging.WARNING)
+    if storage_url is None:
+        storage_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "load_test.db")
+    storage = get_storage(storage_url)
+    storage.create_tables()
+
+    token_addresses = ["0x" + format(0xe20c0000 + i, "040x") for i in range(tokens)]
+    node = StandInNode(
+        token_addresses, rate, block_interval=block_interval, reorg_every=reorg_every, history_blocks=history_blocks
+    )
+    report = asyncio.run(LoadTestService(node, storage, max_concurrency).run(duration))
+
+    print(f"Caught up {report.catch_up_transfers} transfers in {report.catch_up_seconds:.1f} seconds")
+    print(f"Produced {report.target_rate:.0f} transfers/s for {report.duration:.1f} seconds. Notified: {report.emitted}. Removed by reorgs: {report.removed}")
+    print(f"Committed: {report.committed}. Sustained throughput: {report.throughput:.0f} transfers/s")
+    if report.latency_p50 is not None:
+        print(f"Notification to commit latency. p50: {report.latency_p50 * 1000:.1f} ms. p99: {report.latency_p99 * 1000:.1f} ms")
+    for elapsed, rss in report.memory:
+        print(f"{elapsed:>8.1f}s RSS {rss / 2**20:8.1f} MiB")
+
+
+cli.add_command(init_db)
 cli.add_command(run_indexing)
+cli.add_command(run_chains)
 cli.add_command(get_top_holders)
+cli.add_command(serve_api)
+cli.add_command(export)
+cli.add_command(reconcile)
+cli.add_command(rebuild_balances)
+cli.add_command(set_retention)
+cli.add_command(compact_transfers)
+cli.add_command(watch_balances)
+cli.add_command(load_test)
 
 if __name__ == "__main__":
-    create_tables(metadata=Base.metadata)
     cli()
@@ -1,8 +1,10 @@
 -- Some few queries
+-- Addresses are stored as 20 bytes (BYTEA). Use decode('<address without 0x>', 'hex') to filter
+-- and '0x' || encode(<column>, 'hex') to display them.
 
 -- Balances
-SELECT * FROM balances
-WHERE token_address = LOWER('0x600000000a36f3cd48407e35eb7c5c910dc1f7a8')
+SELECT '0x' || encode(wallet_address, 'hex') AS wallet_address, balance FROM balances
+WHERE token_address = decode('600000000a36f3cd48407e35eb7c5c910dc1f7a8', 'hex')
 ORDER BY balance DESC;
 
 -- Transfers
@@ -10,9 +12,10 @@ SELECT * FROM transfers
 ORDER BY block_num DESC;
 
 SELECT COUNT(*) FROM transfers
-WHERE token_address = LOWER('0xBAac2B4491727D78D2b78815144570b9f2Fe8899')
+WHERE token_address = decode('baac2b4491727d78d2b78815144570b9f2fe8899', 'hex')
 AND value > 0;
 
-SELECT * FROM transfers
-WHERE token_address = LOWER('0x600000000a36f3cd48407e35eb7c5c910dc1f7a8')
-ORDER BY block_num DESC;
\ No newline at end of file
+SELECT block_num, tx_hash, '0x' || encode(tx_from, 'hex') AS tx_from, '0x' || encode(tx_to, 'hex') AS tx_to, value
+FROM transfers
+WHERE token_address = decode('600000000a36f3cd48407e35eb7c5c910dc1f7a8', 'hex')
+ORDER BY block_num DESC;
@@ -0,0 +1,13 @@
+-- Converts the lowercase hex address columns of an existing database to 20 bytes BYTEA
+BEGIN;
+
+ALTER TABLE transfers
+    ALTER COLUMN tx_from TYPE BYTEA USING decode(substring(tx_from FROM 3), 'hex'),
+    ALTER COLUMN tx_to TYPE BYTEA USING decode(substring(tx_to FROM 3), 'hex'),
+    ALTER COLUMN token_address TYPE BYTEA USING decode(substring(token_address FROM 3), 'hex');
+
+ALTER TABLE balances
+    ALTER COLUMN wallet_address TYPE BYTEA USING decode(substring(wallet_address FROM 3), 'hex'),
+    ALTER COLUMN token_address TYPE BYTEA USING decode(substring(token_address FROM 3), 'hex');
+
+COMMIT;
@@ -0,0 +1,8 @@
+-- Adds the log position of the transfers and the keyset pagination indexes.
+-- Existing rows get log_index 0, so transfers sharing a block can be skipped at a page boundary until the token
+-- is backfilled again.
+ALTER TABLE transfers ADD COLUMN IF NOT EXISTS log_index INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS transfers_token_block ON transfers (token_address, block_num, log_index);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS transfers_token_from_block ON transfers (token_address, tx_from, block_num, log_index);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS transfers_token_to_block ON transfers (token_address, tx_to, block_num, log_index);
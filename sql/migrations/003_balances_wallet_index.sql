@@ -0,0 +1,2 @@
+-- Adds the wallet-first index of the cross-token portfolio queries.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS balances_chain_wallet ON balances (chain_id, wallet_address);
@@ -0,0 +1,2 @@
+-- Adds the balance-ordered index of the top holders and top-10 share queries.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS balances_chain_token_balance ON balances (chain_id, token_address, balance);
@@ -0,0 +1,4 @@
+-- Stores a transfer once per log, so a replayed indexer batch skips the transfers already applied (ON CONFLICT DO NOTHING).
+-- Transfers given log_index 0 by 002 may share a block: backfill those tokens again first, or the index fails to build.
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS transfers_chain_token_block_log ON transfers (chain_id, token_address, block_num, log_index);
+ALTER TABLE transfers ADD CONSTRAINT transfers_chain_token_block_log UNIQUE USING INDEX transfers_chain_token_block_log;
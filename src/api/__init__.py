@@ -0,0 +1,2 @@
+from .response_cache import ResponseCache, make_etag
+from .server import ReadAPI, run_api
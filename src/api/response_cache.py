@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import hashlib
+from typing import Hashable, Tuple
+
+from src.utils.lru_cache import LRUCache
+
+# Position of a token in the indexer: (last indexed block, state version)
+Position = Tuple[int, int]
+
+
+def make_etag(token_address: str, query: str, params: Hashable, position: Position | None) -> str:
+    """Returns the strong ETag of a response, it changes only when the token indexer position changes"""
+    digest = hashlib.sha1(f"{token_address}|{query}|{params}".encode()).hexdigest()[:16]
+    block, version = position if position else (0, 0)
+    return f'"{block}-{version}-{digest}"'
+
+
+class ResponseCache:
+    """Serialized responses keyed by (token, query, params), valid while the token position doesn't change"""
+
+    def __init__(self, max_size: int) -> None:
+        self._cache = LRUCache(max_size)
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def get(self, token_address: str, query: str, params: Hashable, position: Position | None) -> Tuple[str, bytes] | None:
+        """Returns (etag, body) if cached for the current position"""
+        entry = self._cache.get((token_address, query, params))
+        if entry is None or entry[0] != position:
+            return None
+        return entry[1], entry[2]
+
+    def put(self, token_address: str, query: str, params: Hashable, position: Position | None, body: bytes) -> str:
+        """Caches body for the position. Returns its etag"""
+        etag = make_etag(token_address, query, params, position)
+        self._cache.put((token_address, query, params), (position, etag, body))
+        return etag
@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import re
+from datetime import datetime
+from typing import Callable, Dict, Hashable, Tuple
+
+from aiohttp import web
+
+import src.db as db
+from src.utils.address_utils import intern_address
+from src.constants import ROLLUP_PERIODS
+from .response_cache import Position, ResponseCache
+
+POSITION_REFRESH_INTERVAL = 1  # Seconds between indexer_state reads
+RESPONSE_CACHE_SIZE = 10000
+MAX_LIMIT = 1000
+ALL_TOKENS = "*"  # Cache key of the cross-token responses
+
+ADDRESS_PATTERN = re.compile(r"^0x[0-9a-fA-F]{40}$")
+
+logger = logging.getLogger()
+
+
+class ReadAPI:
+    """Read-only HTTP API over the db query layer.
+
+    Responses are cached per (token, query, params) and served from memory until the indexer advances the
+    token. Indexer positions are read from indexer_state in the background, once per refresh interval for
+    all the tokens, so repeated polls between blocks don't touch the database. A query runs on a read replica
+    only if the replica has reached the position the response is cached for, otherwise on the primary.
+    """
+
+    def __init__(
+            self,
+            chain_id: int,
+            refresh_interval: float = POSITION_REFRESH_INTERVAL,
+            cache_size: int = RESPONSE_CACHE_SIZE,
+    ) -> None:
+        self.chain_id = chain_id
+        self._refresh_interval = refresh_interval
+        self._cache = ResponseCache(cache_size)
+        self._positions: Dict[str, Position] = {}
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.get("/health", self.health),
+            web.get("/tokens/{token}/top-holders", self.top_holders),
+            web.get("/tokens/{token}/balances/{wallet}", self.wallet_balance),
+            web.get("/tokens/{token}/transfers", self.latest_transfers),
+            web.get("/tokens/{token}/wallets/{wallet}/transfers", self.wallet_transfers),
+            web.get("/tokens/{token}/stats", self.token_stats),
+            web.get("/tokens/{token}/rollups", self.transfer_rollups),
+            web.get("/wallets/{wallet}/portfolio", self.wallet_portfolio),
+        ])
+        app.cleanup_ctx.append(self._position_refresher)
+        return app
+
+    async def _position_refresher(self, app: web.Application):
+        await self.refresh_positions()
+        task = asyncio.create_task(self._refresh_loop())
+        yield
+        task.cancel()
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._refresh_interval)
+            try:
+                await self.refresh_positions()
+            except Exception as e:
+                logger.warning(f"Could not refresh indexer positions: {e}")
+
+    async def refresh_positions(self) -> None:
+        """Reads the indexer position of every token. Changed positions invalidate their cached responses"""
+        loop = asyncio.get_running_loop()
+        states = await loop.run_in_executor(None, db.get_indexer_states, self.chain_id)
+        self._positions = {state.token_address: (state.last_block, state.version) for state in states}
+        if states:
+            # Cross-token responses change whenever any token advances
+            self._positions[ALL_TOKENS] = (
+                max(state.last_block for state in states), sum(state.version for state in states)
+            )
+
+    async def _respond(
+            self, request: web.Request, token_address: str, query: str, params: Hashable, func: Callable
+    ) -> web.Response:
+        positions = self._positions
+        position = positions.get(token_address)
+        cached = self._cache.get(token_address, query, params, position)
+        if cached:
+            etag, body = cached
+        else:
+            # The positions the cached response must reflect
+            if token_address == ALL_TOKENS:
+                expected = {token: position for token, position in positions.items() if token != ALL_TOKENS}
+            else:
+                expected = {token_address: position} if position else None
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, func, expected)
+            body = json.dumps(result, default=str).encode()
+            etag = self._cache.put(token_address, query, params, position, body)
+
+        headers = {"ETag": etag}
+        if position:
+            headers["X-Indexed-Block"] = str(position[0])
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=body, content_type="application/json", headers=headers)
+
+    @staticmethod
+    def _address(request: web.Request, name: str) -> str:
+        address = request.match_info[name]
+        if not ADDRESS_PATTERN.match(address):
+            raise web.HTTPBadRequest(text=f"Invalid {name} address")
+        return intern_address(address)
+
+    @staticmethod
+    def _limit(request: web.Request, default: int) -> int:
+        try:
+            limit = int(request.query.get("limit", default))
+        except ValueError:
+            raise web.HTTPBadRequest(text="Invalid limit")
+        return max(1, min(limit, MAX_LIMIT))
+
+    @staticmethod
+    def _cursor(request: web.Request) -> Tuple[int, int] | None:
+        value = request.query.get("before")
+        if value is None:
+            return None
+        try:
+            block_num, log_index = value.split(":")
+            return int(block_num), int(log_index)
+        except ValueError:
+            raise web.HTTPBadRequest(text="Invalid before cursor, expected <block_num>:<log_index>")
+
+    @staticmethod
+    def _datetime(request: web.Request, name: str) -> datetime | None:
+        value = request.query.get(name)
+        if value is None:
+            return None
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise web.HTTPBadRequest(text=f"Invalid {name} datetime")
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({"status": "ok", "tokens": len(self._positions.keys() - {ALL_TOKENS})})
+
+    async def top_holders(self, request: web.Request) -> web.Response:
+        token_address = self._address(request, "token")
+        limit = self._limit(request, 10)
+
+        def query(expected):
+            holders = db.get_token_top_holders(self.chain_id, token_address, limit, expected=expected)
+            return [holder.dict(include={"wallet_address", "balance"}) for holder in holders]
+
+        return await self._respond(request, token_address, "top_holders", limit, query)
+
+    async def wallet_balance(self, request: web.Request) -> web.Response:
+        token_address = self._address(request, "token")
+        wallet_address = self._address(request, "wallet")
+
+        def query(expected):
+            balance = db.get_wallet_balance(self.chain_id, token_address, wallet_address, expected=expected)
+            return {"wallet_address": wallet_address, "balance": balance.balance if balance else 0}
+
+        return await self._respond(request, token_address, "wallet_balance", wallet_address, query)
+
+    async def latest_transfers(self, request: web.Request) -> web.Response:
+        token_address = self._address(request, "token")
+        limit = self._limit(request, 100)
+
+        def query(expected):
+            transfers = db.get_token_latest_transfers(self.chain_id, token_address, limit, expected=expected)
+            return [transfer.dict(exclude={"chain_id", "token_id", "token_key"}) for transfer in transfers]
+
+        return await self._respond(request, token_address, "latest_transfers", limit, query)
+
+    async def wallet_transfers(self, request: web.Request) -> web.Response:
+        token_address = self._address(request, "token")
+        wallet_address = self._address(request, "wallet")
+        limit = self._limit(request, 100)
+        before = self._cursor(request)
+
+        def query(expected):
+            transfers, cursor = db.get_wallet_transfers(
+                self.chain_id, token_address, wallet_address, limit, before, expected=expected
+            )
+            return {
+                "transfers": [transfer.dict(exclude={"chain_id", "token_id", "token_key"}) for transfer in transfers],
+                "next": f"{cursor[0]}:{cursor[1]}" if cursor else None,
+            }
+
+        return await self._respond(
+            request, token_address, "wallet_transfers", (wallet_address, limit, before), query
+        )
+
+    async def token_stats(self, request: web.Request) -> web.Response:
+        token_address = self._address(request, "token")
+
+        def query(expected):
+            stats = db.get_token_stats(self.chain_id, token_address, expected=expected)
+            return stats.dict() if stats else None
+
+        return await self._respond(request, token_address, "token_stats", None, query)
+
+    async def transfer_rollups(self, request: web.Request) -> web.Response:
+        token_address = self._address(request, "token")
+        period = request.query.get("period", "day")
+        if period not in ROLLUP_PERIODS:
+            raise web.HTTPBadRequest(text="Invalid period")
+        start = self._datetime(request, "from")
+        end = self._datetime(request, "to")
+
+        def query(expected):
+            rollups = db.get_transfer_rollups(self.chain_id, token_address, period, start, end, expected=expected)
+            return [rollup.dict(exclude={"chain_id", "token_address", "period"}) for rollup in rollups]
+
+        return await self._respond(request, token_address, "transfer_rollups", (period, start, end), query)
+
+    async def wallet_portfolio(self, request: web.Request) -> web.Response:
+        wallet_address = self._address(request, "wallet")
+
+        def query(expected):
+            portfolio = db.get_wallet_portfolio(self.chain_id, wallet_address, expected=expected)
+            return [entry.dict(exclude={"chain_id", "wallet_address"}) for entry in portfolio]
+
+        return await self._respond(request, ALL_TOKENS, "wallet_portfolio", wallet_address, query)
+
+
+def run_api(chain_id: int, host: str, port: int) -> None:
+    """Serves the ReadAPI until interrupted"""
+    web.run_app(ReadAPI(chain_id).build_app(), host=host, port=port)
@@ -1 +1,3 @@
 from .evm import *
+from .alchemy import *
+from .events import *
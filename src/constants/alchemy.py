@@ -0,0 +1,41 @@
+# Compute Units charged by Alchemy per JSON-RPC method
+# https://docs.alchemy.com/reference/compute-unit-costs
+COMPUTE_UNITS = {
+    "eth_blockNumber": 10,
+    "eth_chainId": 0,
+    "eth_call": 26,
+    "eth_getLogs": 75,
+    "eth_getBlockByNumber": 16,
+    "eth_getBlockReceipts": 500,
+    "eth_getTransactionReceipt": 15,
+    "eth_subscribe": 10,
+    "alchemy_getAssetTransfers": 150,
+}
+COMPUTE_UNITS_DEFAULT = 26
+
+# Throughput of the Alchemy free tier, per API key
+COMPUTE_UNITS_PER_SECOND = 330
+
+# Rate limiting and failover
+RATE_LIMIT_STATUS = 429
+RATE_LIMIT_BACKOFF = 1  # Seconds an endpoint is paused after a 429
+RATE_LIMIT_RETRIES = 10  # Throttled attempts before giving up on a call
+ENDPOINT_COOLDOWN = 30  # Seconds an unhealthy endpoint is skipped
+ENDPOINT_WEIGHT_DEFAULT = 1
+
+# JSON-RPC batching
+RPC_BATCH_SIZE = 100  # Calls per JSON-RPC batch request
+RPC_TIMEOUT = 30
+
+# Log fetch strategies of the backfill
+FETCH_STRATEGIES = ("logs", "receipts", "transfers")  # eth_getLogs, eth_getBlockReceipts, alchemy_getAssetTransfers
+FETCH_STRATEGY_AUTO = "auto"  # Cheapest strategy per range, given the log density
+FETCH_STRATEGY_DEFAULT = "logs"
+FETCH_SAMPLE_BLOCKS = 200  # Blocks fetched with eth_getLogs to measure the initial log density
+MAX_LOGS_PER_CALL = 10000  # Logs returned by an eth_getLogs call over any block range
+ASSET_TRANSFERS_PAGE_SIZE = 1000  # Max alchemy_getAssetTransfers page
+RECEIPTS_BATCH_SIZE = 10  # eth_getBlockReceipts per JSON-RPC batch, receipts of busy blocks are large
+REQUEST_LATENCY = 0.2  # Seconds, round trip estimate of a request when comparing strategies
+
+# Block number -> timestamp cache entries
+BLOCK_TIME_CACHE_SIZE = 50000
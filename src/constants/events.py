@@ -0,0 +1,71 @@
+# Event ABIs with a precompiled decoder (see abi_utils.EventDecoderRegistry)
+
+
+def _input(name: str, type: str, indexed: bool) -> dict:
+    return {"name": name, "type": type, "indexed": indexed}
+
+
+ERC20_TRANSFER_EVENT = {
+    "type": "event",
+    "name": "Transfer",
+    "anonymous": False,
+    "inputs": [_input("from", "address", True), _input("to", "address", True), _input("value", "uint256", False)],
+}
+ERC721_TRANSFER_EVENT = {
+    "type": "event",
+    "name": "Transfer",
+    "anonymous": False,
+    "inputs": [_input("from", "address", True), _input("to", "address", True), _input("tokenId", "uint256", True)],
+}
+ERC1155_TRANSFER_SINGLE_EVENT = {
+    "type": "event",
+    "name": "TransferSingle",
+    "anonymous": False,
+    "inputs": [
+        _input("operator", "address", True),
+        _input("from", "address", True),
+        _input("to", "address", True),
+        _input("id", "uint256", False),
+        _input("value", "uint256", False),
+    ],
+}
+ERC1155_TRANSFER_BATCH_EVENT = {
+    "type": "event",
+    "name": "TransferBatch",
+    "anonymous": False,
+    "inputs": [
+        _input("operator", "address", True),
+        _input("from", "address", True),
+        _input("to", "address", True),
+        _input("ids", "uint256[]", False),
+        _input("values", "uint256[]", False),
+    ],
+}
+ERC20_APPROVAL_EVENT = {
+    "type": "event",
+    "name": "Approval",
+    "anonymous": False,
+    "inputs": [_input("owner", "address", True), _input("spender", "address", True), _input("value", "uint256", False)],
+}
+ERC721_APPROVAL_EVENT = {
+    "type": "event",
+    "name": "Approval",
+    "anonymous": False,
+    "inputs": [_input("owner", "address", True), _input("approved", "address", True), _input("tokenId", "uint256", True)],
+}
+APPROVAL_FOR_ALL_EVENT = {
+    "type": "event",
+    "name": "ApprovalForAll",
+    "anonymous": False,
+    "inputs": [_input("owner", "address", True), _input("operator", "address", True), _input("approved", "bool", False)],
+}
+
+STANDARD_EVENTS = [
+    ERC20_TRANSFER_EVENT,
+    ERC721_TRANSFER_EVENT,
+    ERC1155_TRANSFER_SINGLE_EVENT,
+    ERC1155_TRANSFER_BATCH_EVENT,
+    ERC20_APPROVAL_EVENT,
+    ERC721_APPROVAL_EVENT,
+    APPROVAL_FOR_ALL_EVENT,
+]
@@ -26,6 +26,45 @@ TRANSFER_SELECTOR_MAP = {
 # Types
 TYPE_ERC20 = "ERC20"
 
-DECIMALS_DEFAULT = 18
+DECIMALS_DEFAULT = 18  # Tokens without metadata or without decimals()
+DECIMALS_MAX = 77  # 10**77 is the largest power of ten below 2**256
 
 INIT_BLOCK = 10000000
+
+# Addresses kept in the in-process interning table
+ADDRESS_INTERN_SIZE = 1000000
+
+# Holder distribution buckets: floor(log10(balance)), clamped
+HOLDER_BUCKET_MIN = -6
+HOLDER_BUCKET_MAX = 12
+
+# Streaming exports
+EXPORT_CHUNK_SIZE = 50000  # Rows fetched per server-side cursor round trip
+EXPORT_ROWS_PER_FILE = 5000000
+
+# Multicall3, deployed at the same address on most EVM chains
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+AGGREGATE3_SELECTOR = "0x82ad56cb"  # aggregate3((address,bool,bytes)[])
+BALANCE_OF_SELECTOR = "0x70a08231"  # balanceOf(address)
+DECIMALS_SELECTOR = "0x313ce567"  # decimals()
+SYMBOL_SELECTOR = "0x95d89b41"  # symbol()
+NAME_SELECTOR = "0x06fdde03"  # name()
+MULTICALL_BATCH_SIZE = 1000  # Calls aggregated per eth_call
+MULTICALL_RPC_BATCH_SIZE = 10  # Aggregated eth_calls per JSON-RPC batch request
+
+# Transfer rollups
+ROLLUP_PERIODS = ("hour", "day")
+
+# Balance change notifications (pg_notify)
+BALANCE_CHANNEL = "balance_changes"
+NOTIFY_PAYLOAD_LIMIT = 7900  # Bytes, Postgres rejects payloads of 8000 bytes or more
+
+# Wallet portfolios
+PORTFOLIO_BATCH_SIZE = 10000  # Wallets looked up per query
+
+# Read replicas
+REPLICA_LAG_CHECK_INTERVAL = 1  # Seconds between comparisons of the replicas indexer state with the primary
+
+# Transfer retention
+COMPACTION_BATCH_SIZE = 10000  # Transfers folded into the checkpoint and deleted per transaction
+ARCHIVE_FORMAT_DEFAULT = "csv.gz"
@@ -5,7 +5,17 @@ from sqlalchemy.orm import declarative_base
 from .db_utils import DBSession
 
 Base = declarative_base()
-engine = DBSession.get_engine()
-Session = DBSession.get_db()
+
+
+def __getattr__(name: str):
+    # engine and Session are created on first use, not on import
+    if name == "engine":
+        return DBSession.get_engine()
+    if name == "Session":
+        return DBSession.get_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 from .schemas import *
+from .storage import Storage, PostgresStorage, get_storage
+from .notifications import publish_balance_changes, listen_balance_changes
@@ -1,30 +1,243 @@
+from __future__ import annotations
+
+import itertools
 import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.schema import MetaData
-from sqlalchemy.engine import Engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from config import settings
+from src.utils.address_utils import address_to_bytes
+from src.constants import REPLICA_LAG_CHECK_INTERVAL
+
+IndexerPosition = Tuple[int, int]  # (last committed block, version) of a token in indexer_state
+IndexerPositions = Dict[Tuple[int, bytes], IndexerPosition]  # (chain_id, token_address) -> position
+
+
+def _create_engine(host: str, port: int) -> Engine:
+    engine_url = f"postgresql+psycopg2://{settings.POSTGRES_USER}:{settings.POSTGRES_PASS}@{host}:{port}/{settings.POSTGRES_DATABASE}"
+    return create_engine(
+        engine_url,
+        future=True,
+        echo=False,
+        pool_size=settings.POSTGRES_POOL_SIZE,
+        max_overflow=settings.POSTGRES_MAX_OVERFLOW,
+        pool_pre_ping=True,
+    )
+
+
+def _parse_replicas(replicas: str) -> List[Tuple[str, int]]:
+    """Returns the (host, port) of the comma separated 'host' or 'host:port' replicas"""
+    hosts = []
+    for replica in filter(None, (replica.strip() for replica in replicas.split(","))):
+        host, _, port = replica.partition(":")
+        hosts.append((host, int(port) if port else settings.POSTGRES_PORT))
+    return hosts
+
+
+def _indexer_positions(conn: Connection, chain_id: int | None = None) -> IndexerPositions:
+    """Returns the position of every token, of chain_id if given, in the indexer_state read through conn"""
+    statement = "SELECT chain_id, token_address, last_block, version FROM indexer_state"
+    if chain_id is not None:
+        statement += " WHERE chain_id = :chain_id"
+    rows = conn.execute(text(statement), {"chain_id": chain_id})
+    return {
+        (row_chain_id, bytes(token_address)): (last_block, version)
+        for row_chain_id, token_address, last_block, version in rows
+    }
+
+
+def _is_at(position: IndexerPosition, expected: IndexerPosition, max_lag: int = 0) -> bool:
+    """True if position is at or past expected, or at most max_lag blocks behind it"""
+    last_block, version = position
+    expected_block, expected_version = expected
+    if last_block >= expected_block and version >= expected_version:
+        return True
+    # A tolerated lag covers the rebuilds and compactions, which bump the version on the same block
+    return max_lag > 0 and expected_block - last_block <= max_lag
 
 
 class DBSession:
-    """DBSession class preparing to be scalable to multiple connections"""
+    """DBSession class splitting the writes and the reads between the primary and its read replicas.
+
+    Intake functions write to the primary (get_engine, get_db). Query functions read through read_session and
+    read_connection, round robin over the POSTGRES_REPLICAS caught up with the token read: every
+    REPLICA_LAG_CHECK_INTERVAL seconds the position (last committed block, version) of every token in
+    indexer_state is compared between each replica and the primary. Replicas behind, by more than
+    POSTGRES_REPLICA_MAX_LAG blocks if a lag is tolerated, or unreachable, are skipped and the read falls back to
+    the primary. The indexer state and token metadata queries, part of the intake path, stay on the primary.
+
+    Callers caching the response for given positions, like the read API, pass them as expected: the replica must
+    then be at or past them in its own indexer_state, checked on the connection running the read.
+
+    The engines and sessionmakers are created on first use and shared by the whole process
+    """
+    _engine: Engine = None
+    _sessionmaker: sessionmaker = None
+    _replica_engines: List[Engine] = None
+    _replica_sessionmakers: List[sessionmaker] = None
+    _primary_positions: IndexerPositions = {}
+    _replica_positions: List[IndexerPositions | None] = []  # None if unreachable
+    _positions_checked_at = float("-inf")
+    _positions_lock = threading.Lock()
+    _round_robin = itertools.count()
+
     @classmethod
     def get_engine(cls) -> Engine:
-        """Create SQL Alchemy Engine based on Postgres"""
-        engine_url = f"postgresql+psycopg2://{settings.POSTGRES_USER}:{settings.POSTGRES_PASS}@{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_DATABASE}"
-        engine = create_engine(engine_url, future=True, echo=False)
+        """Return the SQL Alchemy Engine of the Postgres primary, creating it on first use"""
+        if cls._engine is None:
+            cls._engine = _create_engine(settings.POSTGRES_HOST, settings.POSTGRES_PORT)
 
-        return engine
+        return cls._engine
 
     @classmethod
     def get_db(cls) -> sessionmaker:
-        """Return SQL Alchemy sessionmaker"""
-        engine = cls.get_engine()
-        session = sessionmaker(engine)
+        """Return SQL Alchemy sessionmaker of the primary"""
+        if cls._sessionmaker is None:
+            cls._sessionmaker = sessionmaker(cls.get_engine())
+
+        return cls._sessionmaker
+
+    @classmethod
+    def get_replica_engines(cls) -> List[Engine]:
+        """Return the Engines of the read replicas, empty if none is configured"""
+        if cls._replica_engines is None:
+            cls._replica_engines = [_create_engine(host, port) for host, port in _parse_replicas(settings.POSTGRES_REPLICAS)]
+            cls._replica_sessionmakers = [sessionmaker(engine) for engine in cls._replica_engines]
 
-        return session
+        return cls._replica_engines
+
+    @classmethod
+    @contextmanager
+    def read_session(
+            cls,
+            chain_id: int,
+            token_address: str | None = None,
+            expected: Dict[str, IndexerPosition] | None = None,
+    ) -> Iterator[Session]:
+        """Yields a Session, in a transaction, of a replica caught up with token_address, or with every token of the
+        chain if None. The primary one if none is
+
+        :param expected: Optional. {token_address: (last_block, version)} the replica must be at or past"""
+        for replica in cls._read_replicas(chain_id, token_address):
+            session = cls._replica_sessionmakers[replica]()
+            if not cls._reflects(replica, session.connection, chain_id, expected):
+                session.close()
+                continue
+            try:
+                yield session
+                session.commit()
+            finally:
+                session.close()
+            return
+
+        with cls.get_db().begin() as session:
+            yield session
+
+    @classmethod
+    @contextmanager
+    def read_connection(
+            cls,
+            chain_id: int,
+            token_address: str | None = None,
+            expected: Dict[str, IndexerPosition] | None = None,
+    ) -> Iterator[Connection]:
+        """Yields a Connection of a replica caught up with token_address, or with every token of the chain if None.
+        The primary one if none is
+
+        :param expected: Optional. {token_address: (last_block, version)} the replica must be at or past"""
+        for replica in cls._read_replicas(chain_id, token_address):
+            conn = cls._replica_engines[replica].connect()
+            if not cls._reflects(replica, lambda: conn, chain_id, expected):
+                conn.close()
+                continue
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+
+        with cls.get_engine().connect() as conn:
+            yield conn
+
+    @classmethod
+    def _read_replicas(cls, chain_id: int, token_address: str | None) -> List[int]:
+        """Returns the replicas caught up with the token at the last check, in round robin order"""
+        replicas = cls.get_replica_engines()
+        if not replicas:
+            return []
+        cls._check_positions()
+
+        token = address_to_bytes(token_address) if token_address else None
+        start = next(cls._round_robin)
+        caught_up = [
+            replica for replica in ((start + i) % len(replicas) for i in range(len(replicas)))
+            if cls._is_caught_up(replica, chain_id, token)
+        ]
+        if not caught_up:
+            logging.debug(f"No read replica caught up with chain {chain_id} token {token_address}, reading the primary")
+        return caught_up
+
+    @classmethod
+    def _reflects(
+            cls, replica: int, connection, chain_id: int, expected: Dict[str, IndexerPosition] | None
+    ) -> bool:
+        """True if the replica indexer_state read through connection() is at or past the expected positions"""
+        if not expected:
+            return True
+        try:
+            positions = _indexer_positions(connection(), chain_id)
+        except Exception as e:
+            logging.warning(f"Read replica {cls._replica_engines[replica].url.host} unavailable: {e}")
+            return False
+        for token_address, position in expected.items():
+            replica_position = positions.get((chain_id, address_to_bytes(token_address)))
+            if replica_position is None or not _is_at(replica_position, position):
+                logging.debug(f"Read replica {cls._replica_engines[replica].url.host} behind {token_address} {position}")
+                return False
+        return True
+
+    @classmethod
+    def _is_caught_up(cls, replica: int, chain_id: int, token: bytes | None) -> bool:
+        positions = cls._replica_positions[replica]
+        if positions is None:
+            return False
+        for (position_chain_id, position_token), position in cls._primary_positions.items():
+            if position_chain_id != chain_id or (token is not None and position_token != token):
+                continue
+            replica_position = positions.get((position_chain_id, position_token))
+            if replica_position is None or not _is_at(replica_position, position, settings.POSTGRES_REPLICA_MAX_LAG):
+                return False
+        return True
+
+    @classmethod
+    def _check_positions(cls) -> None:
+        """Refreshes the indexer positions of the primary and the replicas, at most every
+        REPLICA_LAG_CHECK_INTERVAL seconds"""
+        if time.monotonic() - cls._positions_checked_at < REPLICA_LAG_CHECK_INTERVAL:
+            return
+        with cls._positions_lock:
+            if time.monotonic() - cls._positions_checked_at < REPLICA_LAG_CHECK_INTERVAL:
+                return
+            # Replicas first: a commit in between makes them look behind, never ahead
+            replica_positions = []
+            for engine in cls._replica_engines:
+                try:
+                    with engine.connect() as conn:
+                        replica_positions.append(_indexer_positions(conn))
+                except Exception as e:
+                    logging.warning(f"Read replica {engine.url.host} unavailable: {e}")
+                    replica_positions.append(None)
+            with cls.get_engine().connect() as conn:
+                cls._primary_positions = _indexer_positions(conn)
+            cls._replica_positions = replica_positions
+            cls._positions_checked_at = time.monotonic()
 
 
 def create_tables(metadata: MetaData) -> None:
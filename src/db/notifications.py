@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import logging
+import select
+from decimal import Decimal
+from typing import Dict, Iterator, Set, Tuple
+
+from sqlalchemy import text
+
+from .db_utils import DBSession
+
+from src.models import BalanceChangeModel
+from src.utils.balance_feed import encode_balance_changes, decode_balance_changes
+from src.constants import BALANCE_CHANNEL
+
+LISTEN_POLL = 5  # Seconds waiting for notifications before checking the connection again
+
+
+def publish_balance_changes(
+        chain_id: int,
+        token_address: str,
+        changes: Dict[str, Tuple[Decimal, int]],
+        channel: str = BALANCE_CHANNEL,
+) -> None:
+    """SQLTransaction sending the balance changes of a token with pg_notify, batched in as few payloads as
+    possible. Listeners receive them when the transaction commits, so call it after the balances are committed
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param changes: {wallet_address: (new balance, block_num)}
+    :param channel: Optional. notification channel
+    :return : None
+    """
+    if not changes:
+        return
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        try:
+            conn.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                [
+                    {"channel": channel, "payload": payload}
+                    for payload in encode_balance_changes(chain_id, token_address, changes)
+                ],
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.warning(f"did not publish balance changes")
+            raise e
+
+
+def listen_balance_changes(
+        token_addresses: Set[str] | None = None,
+        channel: str = BALANCE_CHANNEL,
+) -> Iterator[BalanceChangeModel]:
+    """Yields the balance changes published by the indexers as they are committed, with no polling query.
+
+    Uses a dedicated connection in autocommit mode with LISTEN, waiting on its socket.
+
+    :param token_addresses: Optional. only yield the changes of these tokens (lowercase)
+    :param channel: Optional. notification channel
+    :return : Iterator of BalanceChangeModel, endless
+    """
+    conn = DBSession.get_engine().raw_connection()
+    # The connection is left in autocommit mode, it must not go back to the pool
+    conn.detach()
+    try:
+        dbapi_conn = conn.driver_connection
+        dbapi_conn.autocommit = True
+        with dbapi_conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{channel}"')
+        while True:
+            if select.select([dbapi_conn], [], [], LISTEN_POLL) == ([], [], []):
+                continue
+            dbapi_conn.poll()
+            while dbapi_conn.notifies:
+                notify = dbapi_conn.notifies.pop(0)
+                for change in decode_balance_changes(notify.payload):
+                    if token_addresses is None or change.token_address.lower() in token_addresses:
+                        yield change
+    finally:
+        conn.close()
@@ -1,2 +1,7 @@
 from .balance import *
 from .transfer import *
+from .indexer_state import *
+from .token_stats import *
+from .transfer_rollup import *
+from .token_metadata import *
+from .retention import *
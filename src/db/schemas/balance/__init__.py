@@ -1,3 +1,4 @@
 from .balance_schema import Balance
 from .balance_intake import *
 from .balance_queries import *
+from .balance_rebuild import *
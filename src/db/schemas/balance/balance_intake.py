@@ -1,23 +1,29 @@
 from __future__ import annotations
 
 import logging
-from typing import List, Dict
+from typing import List, Dict, Tuple
 from decimal import Decimal
 
-from sqlalchemy import delete, insert
+from sqlalchemy import delete, insert, update, bindparam
 
 from ...db_utils import DBSession
 from . import Balance
+from ..token_stats.token_stats_intake import _upsert_token_stats_delta
+from ..transfer.transfer_intake import _insert_new_transfers
+from ..transfer_rollup.transfer_rollup_intake import _apply_transfer_rollups
+from ..indexer_state.indexer_state_intake import _upsert_indexer_state
 
-from src.models import BalanceModel
+from src.models import BalanceModel, TransferModel
+from src.utils.address_utils import address_to_bytes
+from src.utils.holder_stats import balance_increments, holder_deltas
 
 
 def _balance_model_to_dict(balance: BalanceModel) -> Dict:
     """Low overhead pydantic BalanceModel to dict"""
     return {
         "chain_id": balance.chain_id,
-        "wallet_address": balance.wallet_address.lower(),
-        "token_address": balance.token_address.lower(),
+        "wallet_address": address_to_bytes(balance.wallet_address),
+        "token_address": address_to_bytes(balance.token_address),
         "balance": balance.balance,
     }
 
@@ -48,44 +54,131 @@ def insert_balances(chain_id: int, balances: List[BalanceModel]) -> None:
             raise e
 
 
-def increment_balance(chain_id: int, token_address: str, wallet_address: str, value: Decimal) -> None:
+def increment_balance(chain_id: int, token_address: str, wallet_address: str, value: Decimal) -> Decimal:
     """SQLTransaction containing UPDATE of balance
 
     :param chain_id: chain ID
     :param token_address: Token Address
     :param wallet_address: Wallet Address
     :param value: increment value, can be negative
-    :return : None
+    :return : the new balance
     """
     session_maker = DBSession.get_db()
     with session_maker.begin() as session:
         try:
-            object = (
-                session
-                .query(Balance)
-                .filter_by(
-                    chain_id=chain_id,
-                    token_address=token_address.lower(),
-                    wallet_address=wallet_address.lower()
-                )
-                .first()
+            new_balance = _increment_balance(session, chain_id, token_address, wallet_address, value)
+            session.commit()
+            return new_balance
+        except Exception as e:
+            logging.warning(f"did not increment balance")
+            raise e
+
+
+def apply_transfer_batch(
+    chain_id: int,
+    token_address: str,
+    transfers: List[TransferModel],
+    last_block: int,
+) -> Tuple[int, Dict[str, Tuple[Decimal, int]]]:
+    """SQLTransaction containing the INSERT of a batch of transfers of the token, the UPDATE of the balances,
+    token stats and rollups moved by the ones not stored before, and the UPSERT of its last indexed block.
+
+    Transfers already stored are skipped by the unique (chain_id, token_address, block_num, log_index), so
+    an interrupted or replayed batch is applied exactly once
+
+    :param chain_id: chain ID
+    :param token_address: Token Address of the transfers
+    :param transfers: List of TransferModel with block_time, ordered by (block_num, log_index)
+    :param last_block: last block whose transfers are all committed with this batch
+    :return : (number of transfers applied, {wallet_address: (new balance, block_num)})
+    """
+    token_address_bytes = address_to_bytes(token_address)
+    session_maker = DBSession.get_db()
+    with session_maker.begin() as session:
+        try:
+            transfers = _insert_new_transfers(session, transfers) if transfers else []
+            increments, minted, burned = balance_increments(transfers)
+            new_balances = [
+                _increment_balance(session, chain_id, token_address, wallet_address, value)
+                for wallet_address, value, _ in increments
+            ]
+            holders_delta, bucket_deltas = holder_deltas(
+                (new_balance - value, new_balance) for (_, value, _), new_balance in zip(increments, new_balances)
             )
-            if object:
-                object.balance += value
-            else:
-                object = Balance(
-                    chain_id=chain_id,
-                    token_address=token_address.lower(),
-                    wallet_address=wallet_address.lower(),
-                    balance=value
+            if holders_delta or minted or burned or bucket_deltas:
+                _upsert_token_stats_delta(
+                    session, chain_id, token_address_bytes, holders_delta, minted, burned, bucket_deltas
                 )
-                session.add(object)
+            _apply_transfer_rollups(session, chain_id, token_address_bytes, transfers)
+            _upsert_indexer_state(session, chain_id, token_address_bytes, last_block)
             session.commit()
         except Exception as e:
-            logging.warning(f"did not increment balance")
+            logging.warning(f"did not apply transfer batch")
             raise e
 
+    changes = {
+        wallet_address: (new_balance, block_num)
+        for (wallet_address, _, block_num), new_balance in zip(increments, new_balances)
+    }
+    return len(transfers), changes
+
+
+def _increment_balance(session, chain_id: int, token_address: str, wallet_address: str, value: Decimal) -> Decimal:
+    object = (
+        session
+        .query(Balance)
+        .filter_by(
+            chain_id=chain_id,
+            token_address=address_to_bytes(token_address),
+            wallet_address=address_to_bytes(wallet_address)
+        )
+        .first()
+    )
+    if object:
+        object.balance += value
+    else:
+        object = Balance(
+            chain_id=chain_id,
+            token_address=address_to_bytes(token_address),
+            wallet_address=address_to_bytes(wallet_address),
+            balance=value
+        )
+        session.add(object)
+    return object.balance
+
+
+def update_balances(chain_id: int, balances: List[BalanceModel]) -> None:
+    """SQLTransaction containing the UPDATE of existing balances to the given values
 
+    :param chain_id: chain ID
+    :param balances: List of balances with their new value
+    :return : None
+    """
+    if len(balances) == 0:
+        return
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        try:
+            update_stmt = (
+                update(Balance)
+                .where(Balance.chain_id == chain_id)
+                .where(Balance.token_address == bindparam("b_token_address"))
+                .where(Balance.wallet_address == bindparam("b_wallet_address"))
+                .values(balance=bindparam("b_balance"))
+            )
+            conn.execute(update_stmt, [
+                {
+                    "b_token_address": address_to_bytes(balance.token_address),
+                    "b_wallet_address": address_to_bytes(balance.wallet_address),
+                    "b_balance": balance.balance,
+                }
+                for balance in balances
+            ])
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.warning(f"did not update balances")
+            raise e
 
 
 def delete_token_balances(chain_id: int, token_address: str) -> None:
@@ -102,7 +195,7 @@ def delete_token_balances(chain_id: int, token_address: str) -> None:
             del_stmt = (
                 delete(Balance)
                 .where(Balance.chain_id == chain_id)
-                .where(Balance.token_address == token_address.lower())
+                .where(Balance.token_address == address_to_bytes(token_address))
             )
             conn.execute(del_stmt)
             conn.commit()
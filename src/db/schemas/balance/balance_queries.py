@@ -1,21 +1,24 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Sequence, Tuple
 
 from sqlalchemy import select
-from sqlalchemy.sql import and_, or_
-from ...db_utils import DBSession
+from sqlalchemy.sql import and_, or_, func
+from ...db_utils import DBSession, IndexerPosition
 
 from . import Balance
-from src.models import BalanceModel
+from ..token_metadata import TokenMetadata
+from src.models import BalanceModel, PortfolioEntryModel
+from src.utils.address_utils import address_to_bytes, bytes_to_address
+from src.constants import EXPORT_CHUNK_SIZE, DECIMALS_DEFAULT, PORTFOLIO_BATCH_SIZE
 
 
 def _balance_orm_to_model(balance: Dict) -> BalanceModel:
     """Low overhead ORM Balance to pydantic BalanceModel"""
     model = BalanceModel(
         chain_id=balance.chain_id,
-        token_address=balance.token_address,
-        wallet_address=balance.wallet_address,
+        token_address=bytes_to_address(balance.token_address),
+        wallet_address=bytes_to_address(balance.wallet_address),
         balance=balance.balance
     )
     return model
@@ -25,20 +28,21 @@ def get_token_top_holders(
     chain_id: int,
     token_address: str,
     limit: int = 100,
+    expected: Dict[str, IndexerPosition] | None = None,
 ) -> List[BalanceModel]:
     """Returns the list of top Balances for the specified chain_id-token_address
 
     :param chain_id: chain ID
     :param token_address: Token Address
     :param limit: Optional. limit of holders to retrieve
+    :param expected: Optional. indexer positions {token_address: (last_block, version)} the read must reflect
     :return : List of Transfers"""
     try:
-        session_maker = DBSession.get_db()
-        with session_maker.begin() as session:
+        with DBSession.read_session(chain_id, token_address, expected) as session:
             statement = (
                 select(Balance)
                 .filter_by(chain_id=chain_id)
-                .filter_by(token_address=token_address.lower())
+                .filter_by(token_address=address_to_bytes(token_address))
                 .order_by(Balance.balance.desc())
                 .limit(limit)
             )
@@ -52,3 +56,152 @@ def get_token_top_holders(
     except Exception as e:
         raise e
 
+
+def get_wallet_balance(
+    chain_id: int,
+    token_address: str,
+    wallet_address: str,
+    expected: Dict[str, IndexerPosition] | None = None,
+) -> BalanceModel | None:
+    """Returns the Balance of wallet_address for the specified chain_id-token_address
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param wallet_address: Wallet Address
+    :param expected: Optional. indexer positions {token_address: (last_block, version)} the read must reflect
+    :return : BalanceModel or None if the wallet never held the token"""
+    with DBSession.read_session(chain_id, token_address, expected) as session:
+        statement = (
+            select(Balance)
+            .filter_by(chain_id=chain_id)
+            .filter_by(token_address=address_to_bytes(token_address))
+            .filter_by(wallet_address=address_to_bytes(wallet_address))
+        )
+        balance_orm = session.execute(statement).scalars().first()
+
+        return _balance_orm_to_model(balance_orm) if balance_orm else None
+
+
+def get_wallets_portfolios(
+    chain_id: int,
+    wallet_addresses: List[str],
+    expected: Dict[str, IndexerPosition] | None = None,
+) -> Dict[str, List[PortfolioEntryModel]]:
+    """Returns the non zero balances of each wallet across all the indexed tokens, with the token metadata.
+
+    One query per PORTFOLIO_BATCH_SIZE wallets over the (chain_id, wallet_address) index
+
+    :param chain_id: chain ID
+    :param wallet_addresses: Wallet Addresses
+    :param expected: Optional. indexer positions {token_address: (last_block, version)} the read must reflect
+    :return : {wallet_address: List of PortfolioEntryModel ordered by balance}, [] for wallets holding nothing"""
+    portfolios = {wallet_address: [] for wallet_address in wallet_addresses}
+    wallets = list(portfolios)
+    # The db returns lowercase addresses
+    wallet_portfolios = {wallet_address.lower(): portfolio for wallet_address, portfolio in portfolios.items()}
+    # Every token of the chain is read
+    with DBSession.read_session(chain_id, expected=expected) as session:
+        for i in range(0, len(wallets), PORTFOLIO_BATCH_SIZE):
+            statement = (
+                select(
+                    Balance.wallet_address,
+                    Balance.token_address,
+                    Balance.balance,
+                    TokenMetadata.decimals,
+                    TokenMetadata.symbol,
+                    TokenMetadata.name,
+                )
+                .outerjoin(TokenMetadata, and_(
+                    TokenMetadata.chain_id == Balance.chain_id,
+                    TokenMetadata.token_address == Balance.token_address,
+                ))
+                .where(Balance.chain_id == chain_id)
+                .where(Balance.wallet_address.in_([address_to_bytes(wallet) for wallet in wallets[i: i + PORTFOLIO_BATCH_SIZE]]))
+                .where(Balance.balance != 0)
+                .order_by(Balance.wallet_address, Balance.balance.desc())
+            )
+            for wallet_address, token_address, balance, decimals, symbol, name in session.execute(statement):
+                wallet_address = bytes_to_address(wallet_address)
+                # Tokens indexed before their metadata was resolved
+                decimals = decimals if decimals is not None else DECIMALS_DEFAULT
+                wallet_portfolios[wallet_address].append(PortfolioEntryModel(
+                    chain_id=chain_id,
+                    wallet_address=wallet_address,
+                    token_address=bytes_to_address(token_address),
+                    symbol=symbol,
+                    name=name,
+                    decimals=decimals,
+                    balance=balance,
+                    raw_balance=int(balance.scaleb(decimals)),
+                ))
+
+    return portfolios
+
+
+def get_wallet_portfolio(
+    chain_id: int,
+    wallet_address: str,
+    expected: Dict[str, IndexerPosition] | None = None,
+) -> List[PortfolioEntryModel]:
+    """Returns the non zero balances of the wallet across all the indexed tokens, with the token metadata
+
+    :param chain_id: chain ID
+    :param wallet_address: Wallet Address
+    :param expected: Optional. indexer positions {token_address: (last_block, version)} the read must reflect
+    :return : List of PortfolioEntryModel ordered by balance"""
+    return get_wallets_portfolios(chain_id, [wallet_address], expected)[wallet_address]
+
+
+BALANCE_EXPORT_COLUMNS = [
+    ("wallet_address", "address"),
+    ("balance", "decimal"),
+]
+
+
+def stream_token_balances(
+    chain_id: int,
+    token_address: str,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[Sequence[Sequence]]:
+    """Yields chunks of raw balance rows (BALANCE_EXPORT_COLUMNS) of the token through a server-side cursor,
+    so memory stays constant whatever the number of rows
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param chunk_size: Optional. rows per chunk
+    :return : Iterator of row chunks"""
+    statement = (
+        select(*[getattr(Balance, name) for name, _ in BALANCE_EXPORT_COLUMNS])
+        .where(Balance.chain_id == chain_id)
+        .where(Balance.token_address == address_to_bytes(token_address))
+        .order_by(Balance.id)
+    )
+
+    with DBSession.read_connection(chain_id, token_address) as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(statement)
+        for rows in result.partitions(chunk_size):
+            yield rows
+
+
+def get_token_sample_balances(
+    chain_id: int,
+    token_address: str,
+    size: int,
+) -> List[BalanceModel]:
+    """Returns a random sample of the Balances of the specified chain_id-token_address
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param size: number of balances to sample
+    :return : List of Balances"""
+    with DBSession.read_session(chain_id, token_address) as session:
+        statement = (
+            select(Balance)
+            .filter_by(chain_id=chain_id)
+            .filter_by(token_address=address_to_bytes(token_address))
+            .order_by(func.random())
+            .limit(size)
+        )
+        balances_orm = session.execute(statement).scalars().all()
+
+        return [_balance_orm_to_model(balance_orm) for balance_orm in balances_orm]
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import case, cast, delete, insert, literal, select, union_all, update
+from sqlalchemy.sql import func
+from sqlalchemy.types import Integer, LargeBinary
+
+from ...db_utils import DBSession
+from . import Balance
+from ..transfer import Transfer
+from ..token_stats import TokenStats, TokenHolderBucket
+from ..indexer_state import IndexerState
+from ..retention import TransferRetention, BalanceCheckpoint
+
+from src.utils.address_utils import address_to_bytes
+from src.constants import NULL_ADDRESS, HOLDER_BUCKET_MIN, HOLDER_BUCKET_MAX
+
+
+def rebuild_token_balances(chain_id: int, token_address: str) -> int:
+    """SQLTransaction recomputing the balances and holder stats of the token from its transfers, set-based
+    inside Postgres: each transfer is a +value delta for tx_to and a -value delta for tx_from, summed per wallet
+    with a single INSERT ... SELECT ... GROUP BY. Transfers compacted by the retention policy of the token count
+    through its balance checkpoint and compacted mint and burn totals.
+
+    The old rows are deleted in the same transaction, so readers keep seeing the old balances until the new
+    ones are committed. Stop the real-time indexer of the token while rebuilding, its increments would wait
+    for the rebuild locks and apply over the new balances.
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :return : number of balances written
+    """
+    token_address = address_to_bytes(token_address)
+    null_address = address_to_bytes(NULL_ADDRESS)
+    token_transfers = (Transfer.chain_id == chain_id, Transfer.token_address == token_address)
+    token_balances = (Balance.chain_id == chain_id, Balance.token_address == token_address)
+
+    token_checkpoint = (BalanceCheckpoint.chain_id == chain_id, BalanceCheckpoint.token_address == token_address)
+    token_retention = (TransferRetention.chain_id == chain_id, TransferRetention.token_address == token_address)
+
+    deltas = union_all(
+        select(Transfer.tx_to.label("wallet_address"), Transfer.value.label("delta")).where(*token_transfers),
+        select(Transfer.tx_from.label("wallet_address"), (-Transfer.value).label("delta")).where(*token_transfers),
+        select(BalanceCheckpoint.wallet_address, BalanceCheckpoint.balance).where(*token_checkpoint),
+    ).subquery()
+    balances_select = (
+        select(
+            literal(chain_id),
+            literal(token_address, LargeBinary),
+            deltas.c.wallet_address,
+            func.sum(deltas.c.delta),
+        )
+        .where(deltas.c.wallet_address != null_address)
+        .group_by(deltas.c.wallet_address)
+    )
+
+    holder_count = select(func.count()).where(*token_balances, Balance.balance > 0).scalar_subquery()
+    stats_select = select(
+        literal(chain_id),
+        literal(token_address, LargeBinary),
+        holder_count,
+        func.coalesce(func.sum(case((Transfer.tx_from == null_address, Transfer.value), else_=0)), 0)
+        + func.coalesce(select(TransferRetention.minted).where(*token_retention).scalar_subquery(), 0),
+        func.coalesce(func.sum(case((Transfer.tx_to == null_address, Transfer.value), else_=0)), 0)
+        + func.coalesce(select(TransferRetention.burned).where(*token_retention).scalar_subquery(), 0),
+    ).where(*token_transfers)
+
+    # floor(log10(balance)) clamped, as holder_stats.balance_bucket
+    bucket = cast(
+        func.least(func.greatest(func.floor(func.log(Balance.balance)), HOLDER_BUCKET_MIN), HOLDER_BUCKET_MAX), Integer
+    )
+    buckets_select = (
+        select(literal(chain_id), literal(token_address, LargeBinary), bucket, func.count())
+        .where(*token_balances, Balance.balance > 0)
+        .group_by(bucket)
+    )
+
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        try:
+            conn.execute(delete(Balance).where(*token_balances))
+            result = conn.execute(
+                insert(Balance).from_select(["chain_id", "token_address", "wallet_address", "balance"], balances_select)
+            )
+            for table in (TokenStats, TokenHolderBucket):
+                conn.execute(delete(table).where(table.chain_id == chain_id, table.token_address == token_address))
+            conn.execute(insert(TokenStats).from_select(
+                ["chain_id", "token_address", "holder_count", "total_minted", "total_burned"], stats_select
+            ))
+            conn.execute(insert(TokenHolderBucket).from_select(
+                ["chain_id", "token_address", "bucket", "holders"], buckets_select
+            ))
+            # Cached API responses of the token are stale
+            conn.execute(
+                update(IndexerState)
+                .where(IndexerState.chain_id == chain_id, IndexerState.token_address == token_address)
+                .values(version=IndexerState.version + 1, updated_at=func.current_timestamp())
+            )
+            conn.commit()
+            return result.rowcount
+        except Exception as e:
+            conn.rollback()
+            logging.warning(f"did not rebuild balances")
+            raise e
@@ -1,7 +1,7 @@
 from sqlalchemy import Column
-from sqlalchemy.types import Integer, String, DateTime, DECIMAL, BIGINT
+from sqlalchemy.types import Integer, String, DateTime, DECIMAL, BIGINT, LargeBinary
 from sqlalchemy.sql import func
-from sqlalchemy.schema import UniqueConstraint
+from sqlalchemy.schema import UniqueConstraint, Index
 
 from ... import Base
 
@@ -11,9 +11,9 @@ class Balance(Base):
 
     id = Column(Integer, primary_key=True)
     chain_id = Column(Integer, nullable=False)
-    wallet_address = Column(String(255), nullable=False)
+    wallet_address = Column(LargeBinary(20), nullable=False)  # 20 bytes address, BYTEA
     balance = Column(DECIMAL(54, 18), nullable=False)
-    token_address = Column(String(255), nullable=False)
+    token_address = Column(LargeBinary(20), nullable=False)
     created_at = Column(DateTime, server_default=func.current_timestamp())
     updated_at = Column(
         DateTime,
@@ -21,3 +21,9 @@ class Balance(Base):
         onupdate=func.current_timestamp(),
     )
     UniqueConstraint('token_address', 'wallet_address', name='token_wallet_1')
+    __table_args__ = (
+        # Top holders and top-10 share read the first rows of this index
+        Index("balances_chain_token_balance", "chain_id", "token_address", "balance"),
+        # Wallet portfolios across tokens
+        Index("balances_chain_wallet", "chain_id", "wallet_address"),
+    )
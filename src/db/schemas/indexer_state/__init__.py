@@ -0,0 +1,3 @@
+from .indexer_state_schema import IndexerState
+from .indexer_state_intake import *
+from .indexer_state_queries import *
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import func
+
+from ...db_utils import DBSession
+from . import IndexerState
+
+from src.utils.address_utils import address_to_bytes
+
+
+def set_last_indexed_block(chain_id: int, token_address: str, block_num: int) -> None:
+    """SQLTransaction containing the UPSERT of the indexer state of token_address
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param block_num: last block whose transfers and balances are committed
+    :return : None
+    """
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        try:
+            _upsert_indexer_state(conn, chain_id, address_to_bytes(token_address), block_num)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.warning(f"did not update indexer state")
+            raise e
+
+
+def _upsert_indexer_state(conn, chain_id: int, token_address: bytes, block_num: int) -> None:
+    insert_stmt = insert(IndexerState).values(
+        chain_id=chain_id,
+        token_address=token_address,
+        last_block=block_num,
+        version=1,
+    )
+    upsert_stmt = insert_stmt.on_conflict_do_update(
+        constraint="indexer_state_chain_token",
+        set_={
+            "last_block": insert_stmt.excluded.last_block,
+            "version": IndexerState.version + 1,
+            "updated_at": func.current_timestamp(),
+        },
+    )
+    conn.execute(upsert_stmt)
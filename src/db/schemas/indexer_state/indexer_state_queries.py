@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from typing import List
+
+from sqlalchemy import select
+from ...db_utils import DBSession
+
+from . import IndexerState
+from src.models import IndexerStateModel
+from src.utils.address_utils import address_to_bytes, bytes_to_address
+
+
+def _indexer_state_orm_to_model(state: IndexerState) -> IndexerStateModel:
+    """Low overhead ORM IndexerState to pydantic IndexerStateModel"""
+    return IndexerStateModel(
+        chain_id=state.chain_id,
+        token_address=bytes_to_address(state.token_address),
+        last_block=state.last_block,
+        version=state.version,
+    )
+
+
+def get_indexer_states(chain_id: int) -> List[IndexerStateModel]:
+    """Returns the indexer state of every token of the chain
+
+    :param chain_id: chain ID
+    :return : List of IndexerStateModel"""
+    session_maker = DBSession.get_db()
+    with session_maker.begin() as session:
+        statement = select(IndexerState).filter_by(chain_id=chain_id)
+        states_orm = session.execute(statement).scalars().all()
+
+        return [_indexer_state_orm_to_model(state_orm) for state_orm in states_orm]
+
+
+def get_last_indexed_block(chain_id: int, token_address: str) -> int | None:
+    """Returns the last indexed block of token_address, None if it was never indexed
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :return : block number or None"""
+    session_maker = DBSession.get_db()
+    with session_maker.begin() as session:
+        statement = (
+            select(IndexerState.last_block)
+            .filter_by(chain_id=chain_id)
+            .filter_by(token_address=address_to_bytes(token_address))
+        )
+        return session.execute(statement).scalar()
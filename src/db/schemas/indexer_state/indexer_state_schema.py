@@ -0,0 +1,24 @@
+from sqlalchemy import Column
+from sqlalchemy.types import Integer, DateTime, BIGINT, LargeBinary
+from sqlalchemy.sql import func
+from sqlalchemy.schema import UniqueConstraint
+
+from ... import Base
+
+
+class IndexerState(Base):
+    """Last block for which transfers and balances of a token are consistent"""
+    __tablename__ = "indexer_state"
+
+    id = Column(Integer, primary_key=True)
+    chain_id = Column(Integer, nullable=False)
+    token_address = Column(LargeBinary(20), nullable=False)
+    last_block = Column(BIGINT, nullable=False)
+    version = Column(BIGINT, nullable=False, default=1)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+    updated_at = Column(
+        DateTime,
+        server_default=func.current_timestamp(),
+        onupdate=func.current_timestamp(),
+    )
+    __table_args__ = (UniqueConstraint("chain_id", "token_address", name="indexer_state_chain_token"),)
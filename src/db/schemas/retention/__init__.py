@@ -0,0 +1,4 @@
+from .retention_schema import TransferRetention, BalanceCheckpoint
+from .retention_intake import *
+from .retention_queries import *
+from .retention_compaction import *
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import logging
+from decimal import Decimal
+from typing import Dict, Iterator, Sequence, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import func
+
+from ...db_utils import DBSession
+from . import TransferRetention, BalanceCheckpoint
+from ..transfer import Transfer
+from ..indexer_state import IndexerState
+
+from src.utils.address_utils import address_to_bytes
+from src.constants import NULL_ADDRESS, EXPORT_CHUNK_SIZE, COMPACTION_BATCH_SIZE
+
+TRANSFER_ARCHIVE_COLUMNS = [
+    ("block_num", "int"),
+    ("log_index", "int"),
+    ("tx_hash", "str"),
+    ("tx_from", "address"),
+    ("tx_to", "address"),
+    ("value", "decimal"),
+    ("type", "str"),
+    ("block_time", "datetime"),
+]
+
+
+def _compactable(chain_id: int, token_address: bytes, cutoff_block: int, max_id: int) -> Tuple:
+    # Rows inserted after max_id was read are left, archived or not
+    return (
+        Transfer.token_address == token_address,
+        Transfer.chain_id == chain_id,
+        Transfer.block_num <= cutoff_block,
+        Transfer.id <= max_id,
+    )
+
+
+def _checkpoint_deltas(rows: Sequence[Sequence]) -> Tuple[Dict[bytes, Decimal], Decimal, Decimal]:
+    """Returns ({wallet_address: balance delta}, minted, burned) of TRANSFER_ARCHIVE_COLUMNS rows. NULL_ADDRESS
+    is not a holder: transfers from it are mints, to it are burns"""
+    null_address = address_to_bytes(NULL_ADDRESS)
+    deltas = {}
+    minted = burned = Decimal(0)
+    for _, _, _, tx_from, tx_to, value, _, _ in rows:
+        tx_from, tx_to = bytes(tx_from), bytes(tx_to)
+        if tx_from == null_address:
+            minted += value
+        else:
+            deltas[tx_from] = deltas.get(tx_from, Decimal(0)) - value
+        if tx_to == null_address:
+            burned += value
+        else:
+            deltas[tx_to] = deltas.get(tx_to, Decimal(0)) + value
+    return deltas, minted, burned
+
+
+def get_last_transfer_id() -> int | None:
+    """Returns the id of the last inserted transfer, None if there is none"""
+    session_maker = DBSession.get_db()
+    with session_maker.begin() as session:
+        return session.execute(select(func.max(Transfer.id))).scalar()
+
+
+def stream_compactable_transfers(
+    chain_id: int,
+    token_address: str,
+    cutoff_block: int,
+    max_id: int,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[Sequence[Sequence]]:
+    """Yields chunks of the TRANSFER_ARCHIVE_COLUMNS rows that compact_token_transfers will delete, oldest first,
+    through a server-side cursor of the primary
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param cutoff_block: last block compacted, inclusive
+    :param max_id: last transfer id compacted, from get_last_transfer_id
+    :param chunk_size: Optional. rows per chunk
+    :return : Iterator of row chunks"""
+    statement = (
+        select(*[getattr(Transfer, name) for name, _ in TRANSFER_ARCHIVE_COLUMNS])
+        .where(*_compactable(chain_id, address_to_bytes(token_address), cutoff_block, max_id))
+        .order_by(Transfer.block_num, Transfer.log_index)
+    )
+
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(statement)
+        for rows in result.partitions(chunk_size):
+            yield rows
+
+
+def compact_token_transfers(
+    chain_id: int,
+    token_address: str,
+    cutoff_block: int,
+    max_id: int,
+    batch_size: int = COMPACTION_BATCH_SIZE,
+) -> int:
+    """Folds the transfers of the token up to cutoff_block (and max_id) into its balance checkpoint and deletes
+    them, oldest first.
+
+    Each batch of batch_size transfers is its own short SQLTransaction, locking the retention row of the token
+    (so compactions of a token run one at a time), the deleted rows and their checkpoint rows only: the indexer
+    keeps writing meanwhile. At every commit balance = checkpoint + remaining transfers, so an interrupted
+    compaction is resumed by running it again. The token must have a retention policy. The last transaction bumps
+    the version of the token in indexer_state, invalidating the responses cached for its position.
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param cutoff_block: last block compacted, inclusive
+    :param max_id: last transfer id compacted, from get_last_transfer_id
+    :param batch_size: Optional. transfers per transaction
+    :return : number of transfers compacted
+    """
+    token_address_bytes = address_to_bytes(token_address)
+    token_retention = (TransferRetention.chain_id == chain_id, TransferRetention.token_address == token_address_bytes)
+    batch_select = (
+        select(Transfer.id, *[getattr(Transfer, name) for name, _ in TRANSFER_ARCHIVE_COLUMNS])
+        .where(*_compactable(chain_id, token_address_bytes, cutoff_block, max_id))
+        .order_by(Transfer.block_num, Transfer.log_index)
+        .limit(batch_size)
+    )
+    checkpoint_insert = insert(BalanceCheckpoint)
+    checkpoint_upsert = checkpoint_insert.on_conflict_do_update(
+        constraint="balance_checkpoints_chain_token_wallet",
+        set_={"balance": BalanceCheckpoint.balance + checkpoint_insert.excluded.balance},
+    )
+
+    compacted = 0
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        try:
+            while True:
+                if conn.execute(select(TransferRetention.id).where(*token_retention).with_for_update()).scalar() is None:
+                    raise Exception(f"Token {token_address} has no retention policy")
+                rows = conn.execute(batch_select).all()
+                if not rows:
+                    break
+                deltas, minted, burned = _checkpoint_deltas([row[1:] for row in rows])
+                if deltas:
+                    conn.execute(checkpoint_upsert, [
+                        {"chain_id": chain_id, "token_address": token_address_bytes, "wallet_address": wallet, "balance": delta}
+                        for wallet, delta in deltas.items()
+                    ])
+                conn.execute(delete(Transfer).where(Transfer.id.in_([row[0] for row in rows])))
+                conn.execute(update(TransferRetention).where(*token_retention).values(
+                    compacted=TransferRetention.compacted + len(rows),
+                    minted=TransferRetention.minted + minted,
+                    burned=TransferRetention.burned + burned,
+                ))
+                conn.commit()
+                compacted += len(rows)
+                logging.info(f"Compacted {compacted} transfers of {token_address}")
+
+            conn.execute(update(TransferRetention).where(*token_retention).values(
+                cutoff_block=func.greatest(func.coalesce(TransferRetention.cutoff_block, cutoff_block), cutoff_block),
+            ))
+            conn.execute(
+                update(IndexerState)
+                .where(IndexerState.chain_id == chain_id, IndexerState.token_address == token_address_bytes)
+                .values(version=IndexerState.version + 1, updated_at=func.current_timestamp())
+            )
+            conn.commit()
+            return compacted
+        except Exception as e:
+            conn.rollback()
+            logging.warning(f"did not compact transfers")
+            raise e
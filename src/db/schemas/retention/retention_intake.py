@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.postgresql import insert
+
+from ...db_utils import DBSession
+from . import TransferRetention, BalanceCheckpoint
+
+from src.utils.address_utils import address_to_bytes
+
+
+def set_transfer_retention(chain_id: int, token_address: str, retain_blocks: int, archive_dir: str | None = None) -> None:
+    """SQLTransaction containing the UPSERT of the retention policy of token_address. Its checkpoint is kept
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param retain_blocks: blocks of transfers kept behind the last indexed block
+    :param archive_dir: Optional. directory of the archives of the compacted transfers, deleted if None
+    :return : None
+    """
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        try:
+            insert_stmt = insert(TransferRetention).values(
+                chain_id=chain_id,
+                token_address=address_to_bytes(token_address),
+                retain_blocks=retain_blocks,
+                archive_dir=archive_dir,
+                compacted=0,
+                minted=0,
+                burned=0,
+            )
+            conn.execute(insert_stmt.on_conflict_do_update(
+                constraint="transfer_retention_chain_token",
+                set_={
+                    "retain_blocks": insert_stmt.excluded.retain_blocks,
+                    "archive_dir": insert_stmt.excluded.archive_dir,
+                },
+            ))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.warning(f"did not set transfer retention")
+            raise e
+
+
+def delete_balance_checkpoints(chain_id: int, token_address: str) -> None:
+    """SQLTransaction containing DELETE the balance checkpoint of token_address, resetting the compacted totals
+    of its retention policy. Done when all its transfers are deleted, e.g. before a backfill
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :return : None
+    """
+    token_address = address_to_bytes(token_address)
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        try:
+            conn.execute(
+                delete(BalanceCheckpoint)
+                .where(BalanceCheckpoint.chain_id == chain_id)
+                .where(BalanceCheckpoint.token_address == token_address)
+            )
+            conn.execute(
+                update(TransferRetention)
+                .where(TransferRetention.chain_id == chain_id)
+                .where(TransferRetention.token_address == token_address)
+                .values(cutoff_block=None, compacted=0, minted=0, burned=0)
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
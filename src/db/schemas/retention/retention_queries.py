@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from typing import List
+
+from sqlalchemy import select
+from ...db_utils import DBSession
+
+from . import TransferRetention
+from src.models import TransferRetentionModel
+from src.utils.address_utils import address_to_bytes, bytes_to_address
+
+
+def _transfer_retention_orm_to_model(retention: TransferRetention) -> TransferRetentionModel:
+    """Low overhead ORM TransferRetention to pydantic TransferRetentionModel"""
+    return TransferRetentionModel(
+        chain_id=retention.chain_id,
+        token_address=bytes_to_address(retention.token_address),
+        retain_blocks=retention.retain_blocks,
+        archive_dir=retention.archive_dir,
+        cutoff_block=retention.cutoff_block,
+        compacted=retention.compacted,
+        minted=retention.minted,
+        burned=retention.burned,
+    )
+
+
+def get_transfer_retentions(chain_id: int) -> List[TransferRetentionModel]:
+    """Returns the retention policy of every token of the chain that has one
+
+    :param chain_id: chain ID
+    :return : List of TransferRetentionModel"""
+    session_maker = DBSession.get_db()
+    with session_maker.begin() as session:
+        statement = select(TransferRetention).filter_by(chain_id=chain_id).order_by(TransferRetention.id)
+        return [_transfer_retention_orm_to_model(retention) for retention in session.execute(statement).scalars().all()]
+
+
+def get_transfer_retention(chain_id: int, token_address: str) -> TransferRetentionModel | None:
+    """Returns the retention policy of token_address, None if it keeps its whole history
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :return : TransferRetentionModel or None"""
+    session_maker = DBSession.get_db()
+    with session_maker.begin() as session:
+        statement = (
+            select(TransferRetention)
+            .filter_by(chain_id=chain_id)
+            .filter_by(token_address=address_to_bytes(token_address))
+        )
+        retention = session.execute(statement).scalars().first()
+
+        return _transfer_retention_orm_to_model(retention) if retention else None
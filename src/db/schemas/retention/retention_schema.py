@@ -0,0 +1,42 @@
+from sqlalchemy import Column
+from sqlalchemy.types import Integer, String, DateTime, DECIMAL, BIGINT, LargeBinary
+from sqlalchemy.sql import func
+from sqlalchemy.schema import UniqueConstraint
+
+from ... import Base
+
+
+class TransferRetention(Base):
+    """Retention policy of the transfers of a token and totals of the transfers compacted into its checkpoint"""
+    __tablename__ = "transfer_retention"
+
+    id = Column(Integer, primary_key=True)
+    chain_id = Column(Integer, nullable=False)
+    token_address = Column(LargeBinary(20), nullable=False)
+    retain_blocks = Column(BIGINT, nullable=False)  # Blocks of history kept behind the last indexed block
+    archive_dir = Column(String, nullable=True)  # Where compacted transfers are archived, deleted if NULL
+    cutoff_block = Column(BIGINT, nullable=True)  # Every transfer up to this block is in the checkpoint
+    compacted = Column(BIGINT, nullable=False, default=0)
+    minted = Column(DECIMAL(54, 18), nullable=False, default=0)
+    burned = Column(DECIMAL(54, 18), nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+    updated_at = Column(
+        DateTime,
+        server_default=func.current_timestamp(),
+        onupdate=func.current_timestamp(),
+    )
+    __table_args__ = (UniqueConstraint("chain_id", "token_address", name="transfer_retention_chain_token"),)
+
+
+class BalanceCheckpoint(Base):
+    """Sum of the compacted transfers of a wallet: balance = checkpoint + remaining transfers"""
+    __tablename__ = "balance_checkpoints"
+
+    id = Column(Integer, primary_key=True)
+    chain_id = Column(Integer, nullable=False)
+    token_address = Column(LargeBinary(20), nullable=False)
+    wallet_address = Column(LargeBinary(20), nullable=False)
+    balance = Column(DECIMAL(54, 18), nullable=False)
+    __table_args__ = (
+        UniqueConstraint("chain_id", "token_address", "wallet_address", name="balance_checkpoints_chain_token_wallet"),
+    )
@@ -0,0 +1,3 @@
+from .token_metadata_schema import TokenMetadata
+from .token_metadata_intake import *
+from .token_metadata_queries import *
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import logging
+from typing import List
+
+from sqlalchemy.dialects.postgresql import insert
+
+from ...db_utils import DBSession
+from . import TokenMetadata
+
+from src.models import TokenMetadataModel
+from src.utils.address_utils import address_to_bytes
+
+
+def insert_token_metadata(metadata: List[TokenMetadataModel]) -> None:
+    """SQLTransaction containing the INSERT of the token metadata. Tokens already stored are left unchanged
+
+    :param metadata: List of TokenMetadataModel
+    :return : None
+    """
+    if not metadata:
+        return
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        try:
+            conn.execute(
+                insert(TokenMetadata).on_conflict_do_nothing(constraint="token_metadata_chain_token"),
+                [
+                    {
+                        "chain_id": token.chain_id,
+                        "token_address": address_to_bytes(token.token_address),
+                        "decimals": token.decimals,
+                        "symbol": token.symbol,
+                        "name": token.name,
+                    }
+                    for token in metadata
+                ],
+            )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.warning(f"did not add token metadata")
+            raise e
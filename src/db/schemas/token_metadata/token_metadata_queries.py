@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from typing import Dict, List
+
+from sqlalchemy import select
+from ...db_utils import DBSession
+
+from . import TokenMetadata
+from src.models import TokenMetadataModel
+from src.utils.address_utils import address_to_bytes, bytes_to_address
+
+
+def _token_metadata_orm_to_model(metadata: TokenMetadata) -> TokenMetadataModel:
+    """Low overhead ORM TokenMetadata to pydantic TokenMetadataModel"""
+    return TokenMetadataModel(
+        chain_id=metadata.chain_id,
+        token_address=bytes_to_address(metadata.token_address),
+        decimals=metadata.decimals,
+        symbol=metadata.symbol,
+        name=metadata.name,
+    )
+
+
+def get_tokens_metadata(chain_id: int, token_addresses: List[str]) -> Dict[str, TokenMetadataModel]:
+    """Returns the stored metadata of the tokens, keyed by lowercase address. Unknown tokens are left out
+
+    :param chain_id: chain ID
+    :param token_addresses: Token Addresses
+    :return : {token_address: TokenMetadataModel}"""
+    if not token_addresses:
+        return {}
+    session_maker = DBSession.get_db()
+    with session_maker.begin() as session:
+        statement = (
+            select(TokenMetadata)
+            .filter_by(chain_id=chain_id)
+            .where(TokenMetadata.token_address.in_([address_to_bytes(token) for token in token_addresses]))
+        )
+        metadata_orm = session.execute(statement).scalars().all()
+
+        return {
+            metadata.token_address: metadata
+            for metadata in (_token_metadata_orm_to_model(metadata) for metadata in metadata_orm)
+        }
+
+
+def get_token_metadata(chain_id: int, token_address: str) -> TokenMetadataModel | None:
+    """Returns the stored metadata of token_address, None if it was never resolved
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :return : TokenMetadataModel or None"""
+    return get_tokens_metadata(chain_id, [token_address]).get(token_address.lower())
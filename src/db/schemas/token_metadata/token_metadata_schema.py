@@ -0,0 +1,20 @@
+from sqlalchemy import Column
+from sqlalchemy.types import Integer, DateTime, LargeBinary, String
+from sqlalchemy.sql import func
+from sqlalchemy.schema import UniqueConstraint
+
+from ... import Base
+
+
+class TokenMetadata(Base):
+    """decimals(), symbol() and name() of a token, resolved once on-chain"""
+    __tablename__ = "token_metadata"
+
+    id = Column(Integer, primary_key=True)
+    chain_id = Column(Integer, nullable=False)
+    token_address = Column(LargeBinary(20), nullable=False)
+    decimals = Column(Integer, nullable=False)
+    symbol = Column(String, nullable=True)
+    name = Column(String, nullable=True)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+    __table_args__ = (UniqueConstraint("chain_id", "token_address", name="token_metadata_chain_token"),)
@@ -0,0 +1,3 @@
+from .token_stats_schema import TokenStats, TokenHolderBucket
+from .token_stats_intake import *
+from .token_stats_queries import *
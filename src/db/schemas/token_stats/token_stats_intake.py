@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import logging
+from decimal import Decimal
+from typing import Dict
+
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.sql import func
+
+from ...db_utils import DBSession
+from . import TokenStats, TokenHolderBucket
+
+from src.models import TokenStatsModel
+from src.utils.address_utils import address_to_bytes
+
+
+def insert_token_stats(stats: TokenStatsModel) -> None:
+    """SQLTransaction replacing the stats and holder buckets of the token
+
+    :param stats: TokenStatsModel computed from the full balances
+    :return : None
+    """
+    token_address = address_to_bytes(stats.token_address)
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        try:
+            _delete_token_stats(conn, stats.chain_id, token_address)
+            conn.execute(
+                insert(TokenStats),
+                [{
+                    "chain_id": stats.chain_id,
+                    "token_address": token_address,
+                    "holder_count": stats.holder_count,
+                    "total_minted": stats.total_minted,
+                    "total_burned": stats.total_burned,
+                }],
+            )
+            if stats.buckets:
+                conn.execute(
+                    insert(TokenHolderBucket),
+                    [
+                        {"chain_id": stats.chain_id, "token_address": token_address, "bucket": bucket, "holders": holders}
+                        for bucket, holders in stats.buckets.items()
+                    ],
+                )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.warning(f"did not add token stats")
+            raise e
+
+
+def apply_token_stats_delta(
+    chain_id: int,
+    token_address: str,
+    holders_delta: int,
+    minted: Decimal,
+    burned: Decimal,
+    bucket_deltas: Dict[int, int],
+) -> None:
+    """SQLTransaction containing the incremental UPSERT of the token stats
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param holders_delta: change of the holder count (zero-crossings of balances)
+    :param minted: value minted (transfer from NULL_ADDRESS)
+    :param burned: value burned (transfer to NULL_ADDRESS)
+    :param bucket_deltas: change of holders per balance bucket
+    :return : None
+    """
+    if not holders_delta and not minted and not burned and not bucket_deltas:
+        return
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        try:
+            _upsert_token_stats_delta(conn, chain_id, address_to_bytes(token_address), holders_delta, minted, burned, bucket_deltas)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.warning(f"did not update token stats")
+            raise e
+
+
+def _upsert_token_stats_delta(
+    conn,
+    chain_id: int,
+    token_address: bytes,
+    holders_delta: int,
+    minted: Decimal,
+    burned: Decimal,
+    bucket_deltas: Dict[int, int],
+) -> None:
+    stats_stmt = pg_insert(TokenStats).values(
+        chain_id=chain_id,
+        token_address=token_address,
+        holder_count=holders_delta,
+        total_minted=minted,
+        total_burned=burned,
+    )
+    conn.execute(
+        stats_stmt.on_conflict_do_update(
+            constraint="token_stats_chain_token",
+            set_={
+                "holder_count": TokenStats.holder_count + stats_stmt.excluded.holder_count,
+                "total_minted": TokenStats.total_minted + stats_stmt.excluded.total_minted,
+                "total_burned": TokenStats.total_burned + stats_stmt.excluded.total_burned,
+                "updated_at": func.current_timestamp(),
+            },
+        )
+    )
+    for bucket, delta in bucket_deltas.items():
+        bucket_stmt = pg_insert(TokenHolderBucket).values(
+            chain_id=chain_id, token_address=token_address, bucket=bucket, holders=delta
+        )
+        conn.execute(
+            bucket_stmt.on_conflict_do_update(
+                constraint="token_holder_buckets_chain_token_bucket",
+                set_={"holders": TokenHolderBucket.holders + bucket_stmt.excluded.holders},
+            )
+        )
+
+
+def _delete_token_stats(conn, chain_id: int, token_address: bytes) -> None:
+    conn.execute(
+        delete(TokenStats)
+        .where(TokenStats.chain_id == chain_id)
+        .where(TokenStats.token_address == token_address)
+    )
+    conn.execute(
+        delete(TokenHolderBucket)
+        .where(TokenHolderBucket.chain_id == chain_id)
+        .where(TokenHolderBucket.token_address == token_address)
+    )
+
+
+def delete_token_stats(chain_id: int, token_address: str) -> None:
+    """SQLTransaction containing DELETE the stats of the token_address
+
+    :param chain_id: chain ID
+    :param token_address: Token Address to delete the stats from
+    :return : None
+    """
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        try:
+            _delete_token_stats(conn, chain_id, address_to_bytes(token_address))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
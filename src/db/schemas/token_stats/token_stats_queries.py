@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import Dict
+
+from sqlalchemy import select
+
+from ...db_utils import DBSession, IndexerPosition
+from ..balance import Balance
+from . import TokenStats, TokenHolderBucket
+
+from src.models import TokenStatsModel
+from src.utils.address_utils import address_to_bytes
+
+
+def get_token_stats(
+        chain_id: int,
+        token_address: str,
+        expected: Dict[str, IndexerPosition] | None = None,
+) -> TokenStatsModel | None:
+    """Returns the holder statistics of the token, None if not indexed.
+
+    Stats and buckets are single row reads; top10_share reads the first 10 rows of the
+    balances (chain_id, token_address, balance) index
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param expected: Optional. indexer positions {token_address: (last_block, version)} the read must reflect
+    :return : TokenStatsModel or None"""
+    token_address_bytes = address_to_bytes(token_address)
+    with DBSession.read_session(chain_id, token_address, expected) as session:
+        stats = session.execute(
+            select(TokenStats).filter_by(chain_id=chain_id, token_address=token_address_bytes)
+        ).scalars().first()
+        if stats is None:
+            return None
+
+        buckets = session.execute(
+            select(TokenHolderBucket.bucket, TokenHolderBucket.holders)
+            .filter_by(chain_id=chain_id, token_address=token_address_bytes)
+            .filter(TokenHolderBucket.holders > 0)
+        ).all()
+        top10 = session.execute(
+            select(Balance.balance)
+            .filter_by(chain_id=chain_id, token_address=token_address_bytes)
+            .order_by(Balance.balance.desc())
+            .limit(10)
+        ).scalars().all()
+
+        total_supply = stats.total_minted - stats.total_burned
+        return TokenStatsModel(
+            chain_id=chain_id,
+            token_address=token_address,
+            holder_count=stats.holder_count,
+            total_supply=total_supply,
+            total_minted=stats.total_minted,
+            total_burned=stats.total_burned,
+            buckets={bucket: holders for bucket, holders in buckets},
+            top10_share=sum(top10) / total_supply if total_supply > 0 else None,
+        )
@@ -0,0 +1,39 @@
+from sqlalchemy import Column
+from sqlalchemy.types import Integer, DateTime, DECIMAL, BIGINT, LargeBinary
+from sqlalchemy.sql import func
+from sqlalchemy.schema import UniqueConstraint
+
+from ... import Base
+
+
+class TokenStats(Base):
+    """Per token holder statistics, maintained incrementally by the indexer"""
+    __tablename__ = "token_stats"
+
+    id = Column(Integer, primary_key=True)
+    chain_id = Column(Integer, nullable=False)
+    token_address = Column(LargeBinary(20), nullable=False)
+    holder_count = Column(BIGINT, nullable=False, default=0)
+    total_minted = Column(DECIMAL(54, 18), nullable=False, default=0)
+    total_burned = Column(DECIMAL(54, 18), nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+    updated_at = Column(
+        DateTime,
+        server_default=func.current_timestamp(),
+        onupdate=func.current_timestamp(),
+    )
+    __table_args__ = (UniqueConstraint("chain_id", "token_address", name="token_stats_chain_token"),)
+
+
+class TokenHolderBucket(Base):
+    """Holders per balance bucket, floor(log10(balance))"""
+    __tablename__ = "token_holder_buckets"
+
+    id = Column(Integer, primary_key=True)
+    chain_id = Column(Integer, nullable=False)
+    token_address = Column(LargeBinary(20), nullable=False)
+    bucket = Column(Integer, nullable=False)
+    holders = Column(BIGINT, nullable=False, default=0)
+    __table_args__ = (
+        UniqueConstraint("chain_id", "token_address", "bucket", name="token_holder_buckets_chain_token_bucket"),
+    )
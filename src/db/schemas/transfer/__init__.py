@@ -1,2 +1,3 @@
 from .transfer_schema import Transfer
 from .transfer_intake import *
+from .transfer_queries import *
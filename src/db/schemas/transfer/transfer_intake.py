@@ -4,11 +4,13 @@ import logging
 from typing import List, Dict
 
 from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
 
 from ...db_utils import DBSession
 from . import Transfer
 
 from src.models import TransferModel
+from src.utils.address_utils import address_to_bytes
 
 
 def _transfer_model_to_dict(transfer: TransferModel) -> Dict:
@@ -16,18 +18,22 @@ def _transfer_model_to_dict(transfer: TransferModel) -> Dict:
     return {
         "chain_id": transfer.chain_id,
         "block_num": transfer.block_num,
+        "log_index": transfer.log_index or 0,
         "tx_hash": transfer.tx_hash,
-        "tx_from": transfer.tx_from.lower(),
-        "tx_to": transfer.tx_to.lower(),
+        "tx_from": address_to_bytes(transfer.tx_from),
+        "tx_to": address_to_bytes(transfer.tx_to),
         "value": transfer.value,
         "type": transfer.type,
-        "token_address": transfer.token_address.lower(),
+        "token_address": address_to_bytes(transfer.token_address),
         "block_time": transfer.block_time,
     }
 
 
+TRANSFERS_INSERT_BATCH = 5000  # Rows per multi-row INSERT, under the Postgres bind parameters limit
+
+
 def insert_transfers(transfers: List[TransferModel]) -> None:
-    """SQLTransaction containing List[TransferModel] INSERT
+    """SQLTransaction containing List[TransferModel] INSERT. Transfers already stored are skipped
 
     :param transfers: List of transfers to insert
     :return : None
@@ -40,7 +46,7 @@ def insert_transfers(transfers: List[TransferModel]) -> None:
     engine = DBSession.get_engine()
     with engine.connect() as conn:
         try:
-            insert_obj = Transfer.__table__.insert()
+            insert_obj = insert(Transfer.__table__).on_conflict_do_nothing(constraint="transfers_chain_token_block_log")
             conn.execute(insert_obj, transfers_dict)
             conn.commit()
         except Exception as e:
@@ -48,6 +54,22 @@ def insert_transfers(transfers: List[TransferModel]) -> None:
             raise e
 
 
+def _insert_new_transfers(conn, transfers: List[TransferModel]) -> List[TransferModel]:
+    """INSERTs the transfers, of a single token, not stored yet and returns them"""
+    inserted = set()
+    rows = [_transfer_model_to_dict(transfer) for transfer in transfers]
+    for i in range(0, len(rows), TRANSFERS_INSERT_BATCH):
+        # multi-row VALUES, so RETURNING lists the rows actually inserted
+        insert_stmt = (
+            insert(Transfer)
+            .values(rows[i: i + TRANSFERS_INSERT_BATCH])
+            .on_conflict_do_nothing(constraint="transfers_chain_token_block_log")
+            .returning(Transfer.block_num, Transfer.log_index)
+        )
+        inserted.update(tuple(row) for row in conn.execute(insert_stmt))
+    return [transfer for transfer in transfers if (transfer.block_num, transfer.log_index or 0) in inserted]
+
+
 def delete_token_transfers(chain_id: int, token_address: str) -> None:
     """SQLTransaction containing DELETE transfers for a token_address
 
@@ -62,7 +84,7 @@ def delete_token_transfers(chain_id: int, token_address: str) -> None:
             del_stmt = (
                 delete(Transfer)
                 .where(Transfer.chain_id == chain_id)
-                .where(Transfer.token_address == token_address.lower())
+                .where(Transfer.token_address == address_to_bytes(token_address))
             )
 
             conn.execute(del_stmt)
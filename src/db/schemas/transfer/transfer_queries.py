@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from sqlalchemy import select, tuple_, union_all
+from ...db_utils import DBSession, IndexerPosition
+
+from . import Transfer
+from src.models import TransferModel
+from src.utils.address_utils import address_to_bytes, bytes_to_address
+from src.constants import EXPORT_CHUNK_SIZE
+
+
+def _transfer_orm_to_model(transfer: Transfer) -> TransferModel:
+    """Low overhead ORM Transfer to pydantic TransferModel"""
+    return TransferModel(
+        chain_id=transfer.chain_id,
+        block_num=transfer.block_num,
+        log_index=transfer.log_index,
+        tx_hash=transfer.tx_hash,
+        tx_from=bytes_to_address(transfer.tx_from),
+        tx_to=bytes_to_address(transfer.tx_to),
+        value=transfer.value,
+        type=transfer.type,
+        token_address=bytes_to_address(transfer.token_address),
+        block_time=transfer.block_time,
+    )
+
+
+def get_token_latest_transfers(
+    chain_id: int,
+    token_address: str,
+    limit: int = 100,
+    expected: Dict[str, IndexerPosition] | None = None,
+) -> List[TransferModel]:
+    """Returns the most recent Transfers of the specified chain_id-token_address
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param limit: Optional. limit of transfers to retrieve
+    :param expected: Optional. indexer positions {token_address: (last_block, version)} the read must reflect
+    :return : List of Transfers"""
+    with DBSession.read_session(chain_id, token_address, expected) as session:
+        statement = (
+            select(Transfer)
+            .filter_by(chain_id=chain_id)
+            .filter_by(token_address=address_to_bytes(token_address))
+            .order_by(Transfer.block_num.desc(), Transfer.log_index.desc())
+            .limit(limit)
+        )
+        transfers_orm = session.execute(statement).scalars().all()
+
+        return [_transfer_orm_to_model(transfer_orm) for transfer_orm in transfers_orm]
+
+
+TransferCursor = Tuple[int, int]  # (block_num, log_index) of the last transfer of a page
+
+
+def _page(transfers_orm: List[Transfer], limit: int) -> Tuple[List[TransferModel], TransferCursor | None]:
+    transfers = [_transfer_orm_to_model(transfer_orm) for transfer_orm in transfers_orm]
+    if len(transfers) < limit:
+        return transfers, None
+    return transfers, (transfers[-1].block_num, transfers[-1].log_index)
+
+
+def _keyset(statement, before: TransferCursor | None, limit: int):
+    """Newest first page of statement strictly before the cursor. Reads limit index entries whatever the depth"""
+    if before is not None:
+        statement = statement.where(tuple_(Transfer.block_num, Transfer.log_index) < tuple_(*before))
+    return statement.order_by(Transfer.block_num.desc(), Transfer.log_index.desc()).limit(limit)
+
+
+def get_token_transfers(
+    chain_id: int,
+    token_address: str,
+    limit: int = 100,
+    before: TransferCursor | None = None,
+    expected: Dict[str, IndexerPosition] | None = None,
+) -> Tuple[List[TransferModel], TransferCursor | None]:
+    """Returns a page of the Transfers of the token, newest first, using the (token_address, block_num,
+    log_index) index
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param limit: Optional. page size
+    :param before: Optional. cursor returned with the previous page
+    :param expected: Optional. indexer positions {token_address: (last_block, version)} the read must reflect
+    :return : (List of Transfers, cursor of the next page or None if it was the last one)"""
+    with DBSession.read_session(chain_id, token_address, expected) as session:
+        statement = _keyset(
+            select(Transfer)
+            .where(Transfer.token_address == address_to_bytes(token_address))
+            .where(Transfer.chain_id == chain_id),
+            before,
+            limit,
+        )
+        return _page(session.execute(statement).scalars().all(), limit)
+
+
+def get_wallet_transfers(
+    chain_id: int,
+    token_address: str,
+    wallet_address: str,
+    limit: int = 100,
+    before: TransferCursor | None = None,
+    expected: Dict[str, IndexerPosition] | None = None,
+) -> Tuple[List[TransferModel], TransferCursor | None]:
+    """Returns a page of the Transfers of the token sent or received by the wallet, newest first.
+
+    Instead of tx_from = X OR tx_to = X, each side is a keyset page of its own (token_address, tx_*, block_num,
+    log_index) index, merged with UNION ALL. Self transfers are only taken from the sender side
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param wallet_address: Wallet Address
+    :param limit: Optional. page size
+    :param before: Optional. cursor returned with the previous page
+    :param expected: Optional. indexer positions {token_address: (last_block, version)} the read must reflect
+    :return : (List of Transfers, cursor of the next page or None if it was the last one)"""
+    token_address_bytes = address_to_bytes(token_address)
+    wallet_address_bytes = address_to_bytes(wallet_address)
+
+    def side(*conditions):
+        return _keyset(
+            select(Transfer.id)
+            .where(Transfer.token_address == token_address_bytes)
+            .where(Transfer.chain_id == chain_id)
+            .where(*conditions),
+            before,
+            limit,
+        ).subquery().select()
+
+    ids = union_all(
+        side(Transfer.tx_from == wallet_address_bytes),
+        side(Transfer.tx_to == wallet_address_bytes, Transfer.tx_from != wallet_address_bytes),
+    ).subquery()
+    with DBSession.read_session(chain_id, token_address, expected) as session:
+        statement = (
+            select(Transfer)
+            .join(ids, Transfer.id == ids.c.id)
+            .order_by(Transfer.block_num.desc(), Transfer.log_index.desc())
+            .limit(limit)
+        )
+        return _page(session.execute(statement).scalars().all(), limit)
+
+
+TRANSFER_EXPORT_COLUMNS = [
+    ("block_num", "int"),
+    ("tx_hash", "str"),
+    ("tx_from", "address"),
+    ("tx_to", "address"),
+    ("value", "decimal"),
+    ("type", "str"),
+    ("block_time", "datetime"),
+]
+
+
+def stream_token_transfers(
+    chain_id: int,
+    token_address: str,
+    from_block: int | None = None,
+    to_block: int | None = None,
+    chunk_size: int = EXPORT_CHUNK_SIZE,
+) -> Iterator[Sequence[Sequence]]:
+    """Yields chunks of raw transfer rows (TRANSFER_EXPORT_COLUMNS) of the token, oldest first, through a
+    server-side cursor, so memory stays constant whatever the number of rows. The (token_address, block_num,
+    log_index) index returns them in order, without sorting the token history first
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param from_block: Optional. first block, inclusive
+    :param to_block: Optional. last block, inclusive
+    :param chunk_size: Optional. rows per chunk
+    :return : Iterator of row chunks"""
+    statement = (
+        select(*[getattr(Transfer, name) for name, _ in TRANSFER_EXPORT_COLUMNS])
+        .where(Transfer.chain_id == chain_id)
+        .where(Transfer.token_address == address_to_bytes(token_address))
+        .order_by(Transfer.block_num, Transfer.log_index)
+    )
+    if from_block is not None:
+        statement = statement.where(Transfer.block_num >= from_block)
+    if to_block is not None:
+        statement = statement.where(Transfer.block_num <= to_block)
+
+    with DBSession.read_connection(chain_id, token_address) as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(statement)
+        for rows in result.partitions(chunk_size):
+            yield rows
@@ -1,6 +1,7 @@
 from sqlalchemy import Column
-from sqlalchemy.types import Integer, String, DateTime, DECIMAL, BIGINT
+from sqlalchemy.types import Integer, String, DateTime, DECIMAL, BIGINT, LargeBinary
 from sqlalchemy.sql import func
+from sqlalchemy.schema import Index, UniqueConstraint
 
 from ... import Base
 
@@ -11,12 +12,13 @@ class Transfer(Base):
     id = Column(Integer, primary_key=True)
     chain_id = Column(Integer, nullable=False)
     block_num = Column(Integer, nullable=False)
+    log_index = Column(Integer, nullable=False, default=0)
     tx_hash = Column(String(255), nullable=False)
-    tx_from = Column(String(255), nullable=False)
-    tx_to = Column(String(255), nullable=False)
+    tx_from = Column(LargeBinary(20), nullable=False)  # 20 bytes address, BYTEA
+    tx_to = Column(LargeBinary(20), nullable=False)
     value = Column(DECIMAL(54, 18), nullable=False)
     type = Column(String(255), nullable=False)
-    token_address = Column(String(255), nullable=False)
+    token_address = Column(LargeBinary(20), nullable=False)
     block_time = Column(DateTime)
     created_at = Column(DateTime, server_default=func.current_timestamp())
     updated_at = Column(
@@ -24,3 +26,11 @@ class Transfer(Base):
         server_default=func.current_timestamp(),
         onupdate=func.current_timestamp(),
     )
+    # A log is stored once, so replaying a batch is idempotent. Keyset pagination of the token and wallet
+    # histories by (block_num, log_index)
+    __table_args__ = (
+        UniqueConstraint("chain_id", "token_address", "block_num", "log_index", name="transfers_chain_token_block_log"),
+        Index("transfers_token_block", "token_address", "block_num", "log_index"),
+        Index("transfers_token_from_block", "token_address", "tx_from", "block_num", "log_index"),
+        Index("transfers_token_to_block", "token_address", "tx_to", "block_num", "log_index"),
+    )
@@ -0,0 +1,3 @@
+from .transfer_rollup_schema import TransferRollup, TransferRollupWallet
+from .transfer_rollup_intake import *
+from .transfer_rollup_queries import *
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import logging
+from typing import List
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ...db_utils import DBSession
+from . import TransferRollup, TransferRollupWallet
+
+from src.models import TransferModel
+from src.utils.address_utils import address_to_bytes
+from src.utils.rollups import rollup_transfers
+
+WALLETS_INSERT_BATCH = 5000  # Rows per multi-row INSERT, under the Postgres bind parameters limit
+
+
+def apply_transfer_rollups(chain_id: int, token_address: str, transfers: List[TransferModel]) -> None:
+    """SQLTransaction adding a batch of transfers of the token to its hour and day rollups.
+
+    Sender and receiver days not seen before are inserted in transfer_rollup_wallets; only the inserted rows
+    increment the unique counts of the day rollups
+
+    :param chain_id: chain ID
+    :param token_address: Token Address of the transfers
+    :param transfers: List of TransferModel with block_time
+    :return : None
+    """
+    if not transfers:
+        return
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        try:
+            _apply_transfer_rollups(conn, chain_id, address_to_bytes(token_address), transfers)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logging.warning(f"did not update transfer rollups")
+            raise e
+
+
+def _apply_transfer_rollups(conn, chain_id: int, token_address: bytes, transfers: List[TransferModel]) -> None:
+    buckets, wallet_days = rollup_transfers(transfers)
+    if not buckets:
+        return
+    new_wallets = []
+    wallet_rows = [
+        {
+            "chain_id": chain_id,
+            "token_address": token_address,
+            "day": day,
+            "is_sender": is_sender,
+            "wallet_address": address_to_bytes(wallet_address),
+        }
+        for day, is_sender, wallet_address in wallet_days
+    ]
+    for i in range(0, len(wallet_rows), WALLETS_INSERT_BATCH):
+        # multi-row VALUES, so RETURNING lists the rows actually inserted
+        wallet_stmt = (
+            pg_insert(TransferRollupWallet)
+            .values(wallet_rows[i: i + WALLETS_INSERT_BATCH])
+            .on_conflict_do_nothing(constraint="transfer_rollup_wallets_chain_token_day_wallet")
+            .returning(TransferRollupWallet.day, TransferRollupWallet.is_sender)
+        )
+        new_wallets.extend(conn.execute(wallet_stmt).all())
+
+    unique = {}
+    for day, is_sender in new_wallets:
+        counts = unique.setdefault(day, [0, 0])
+        counts[0 if is_sender else 1] += 1
+
+    rollup_stmt = pg_insert(TransferRollup)
+    rollup_stmt = rollup_stmt.on_conflict_do_update(
+        constraint="transfer_rollups_chain_token_period_bucket",
+        set_={
+            "volume": TransferRollup.volume + rollup_stmt.excluded.volume,
+            "transfer_count": TransferRollup.transfer_count + rollup_stmt.excluded.transfer_count,
+            "unique_senders": TransferRollup.unique_senders + rollup_stmt.excluded.unique_senders,
+            "unique_receivers": TransferRollup.unique_receivers + rollup_stmt.excluded.unique_receivers,
+        },
+    )
+    conn.execute(rollup_stmt, [
+        {
+            "chain_id": chain_id,
+            "token_address": token_address,
+            "period": period,
+            "bucket_start": start,
+            "volume": volume,
+            "transfer_count": count,
+            "unique_senders": unique.get(start, (0, 0))[0] if period == "day" else 0,
+            "unique_receivers": unique.get(start, (0, 0))[1] if period == "day" else 0,
+        }
+        for (period, start), (volume, count) in buckets.items()
+    ])
+
+
+def delete_transfer_rollups(chain_id: int, token_address: str) -> None:
+    """SQLTransaction containing DELETE the rollups of the token_address
+
+    :param chain_id: chain ID
+    :param token_address: Token Address to delete the rollups from
+    :return : None
+    """
+    token_address = address_to_bytes(token_address)
+    engine = DBSession.get_engine()
+    with engine.connect() as conn:
+        try:
+            for table in (TransferRollup, TransferRollupWallet):
+                conn.execute(
+                    delete(table)
+                    .where(table.chain_id == chain_id)
+                    .where(table.token_address == token_address)
+                )
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import select
+
+from ...db_utils import DBSession, IndexerPosition
+from . import TransferRollup
+
+from src.models import TransferRollupModel
+from src.utils.address_utils import address_to_bytes
+
+
+def get_transfer_rollups(
+        chain_id: int,
+        token_address: str,
+        period: str,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        expected: Dict[str, IndexerPosition] | None = None,
+) -> List[TransferRollupModel]:
+    """Returns the pre-aggregated rollups of the token ordered by bucket_start. Reads a range of the
+    (chain_id, token_address, period, bucket_start) unique index, independent of the transfers table size
+
+    :param chain_id: chain ID
+    :param token_address: Token Address
+    :param period: hour or day
+    :param start: Optional. first bucket_start included
+    :param end: Optional. bucket_start excluded
+    :param expected: Optional. indexer positions {token_address: (last_block, version)} the read must reflect
+    :return : List of TransferRollupModel"""
+    with DBSession.read_session(chain_id, token_address, expected) as session:
+        statement = (
+            select(TransferRollup)
+            .filter_by(chain_id=chain_id, token_address=address_to_bytes(token_address), period=period)
+            .order_by(TransferRollup.bucket_start)
+        )
+        if start is not None:
+            statement = statement.filter(TransferRollup.bucket_start >= start)
+        if end is not None:
+            statement = statement.filter(TransferRollup.bucket_start < end)
+
+        return [
+            TransferRollupModel(
+                chain_id=chain_id,
+                token_address=token_address,
+                period=period,
+                bucket_start=rollup.bucket_start,
+                volume=rollup.volume,
+                transfer_count=rollup.transfer_count,
+                unique_senders=rollup.unique_senders if period == "day" else None,
+                unique_receivers=rollup.unique_receivers if period == "day" else None,
+            )
+            for rollup in session.execute(statement).scalars()
+        ]
@@ -0,0 +1,43 @@
+from sqlalchemy import Column
+from sqlalchemy.types import Integer, DateTime, DECIMAL, BIGINT, Boolean, LargeBinary, String
+from sqlalchemy.schema import UniqueConstraint
+
+from ... import Base
+
+
+class TransferRollup(Base):
+    """Transfer volume and count per token per hour or day of block time, maintained as transfers are ingested"""
+    __tablename__ = "transfer_rollups"
+
+    id = Column(Integer, primary_key=True)
+    chain_id = Column(Integer, nullable=False)
+    token_address = Column(LargeBinary(20), nullable=False)
+    period = Column(String(8), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    volume = Column(DECIMAL(54, 18), nullable=False, default=0)
+    transfer_count = Column(BIGINT, nullable=False, default=0)
+    unique_senders = Column(BIGINT, nullable=False, default=0)
+    unique_receivers = Column(BIGINT, nullable=False, default=0)
+    __table_args__ = (
+        UniqueConstraint(
+            "chain_id", "token_address", "period", "bucket_start", name="transfer_rollups_chain_token_period_bucket"
+        ),
+    )
+
+
+class TransferRollupWallet(Base):
+    """Senders and receivers seen per token per day, so the unique counts of the day rollups are exact"""
+    __tablename__ = "transfer_rollup_wallets"
+
+    id = Column(Integer, primary_key=True)
+    chain_id = Column(Integer, nullable=False)
+    token_address = Column(LargeBinary(20), nullable=False)
+    day = Column(DateTime, nullable=False)
+    is_sender = Column(Boolean, nullable=False)
+    wallet_address = Column(LargeBinary(20), nullable=False)
+    __table_args__ = (
+        UniqueConstraint(
+            "chain_id", "token_address", "day", "is_sender", "wallet_address",
+            name="transfer_rollup_wallets_chain_token_day_wallet",
+        ),
+    )
@@ -0,0 +1,414 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Dict, Iterator, List, Tuple
+
+from src.models import TransferModel, BalanceModel, TokenStatsModel, TokenMetadataModel
+from src.utils.address_utils import address_to_bytes, bytes_to_address
+from src.utils.holder_stats import balance_increments, holder_deltas
+from src.utils.rollups import rollup_transfers
+from .storage import Storage
+
+# Bulk ingest tuning. WAL lets readers run during writes and, with synchronous=NORMAL, a commit does not
+# wait for an fsync
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -64000,  # KiB
+}
+
+# Amounts are stored as exact decimal TEXT. balance_rank, its REAL approximation, orders the top holders
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfers (
+    id INTEGER PRIMARY KEY,
+    chain_id INTEGER NOT NULL,
+    block_num INTEGER NOT NULL,
+    log_index INTEGER NOT NULL DEFAULT 0,
+    tx_hash TEXT NOT NULL,
+    tx_from BLOB NOT NULL,
+    tx_to BLOB NOT NULL,
+    value TEXT NOT NULL,
+    type TEXT NOT NULL,
+    token_address BLOB NOT NULL,
+    block_time TEXT
+);
+CREATE INDEX IF NOT EXISTS transfers_token_block ON transfers (token_address, block_num, log_index);
+CREATE UNIQUE INDEX IF NOT EXISTS transfers_chain_token_block_log ON transfers (chain_id, token_address, block_num, log_index);
+CREATE TABLE IF NOT EXISTS balances (
+    chain_id INTEGER NOT NULL,
+    token_address BLOB NOT NULL,
+    wallet_address BLOB NOT NULL,
+    balance TEXT NOT NULL,
+    balance_rank REAL NOT NULL,
+    PRIMARY KEY (chain_id, token_address, wallet_address)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS balances_chain_token_rank ON balances (chain_id, token_address, balance_rank);
+CREATE TABLE IF NOT EXISTS token_stats (
+    chain_id INTEGER NOT NULL,
+    token_address BLOB NOT NULL,
+    holder_count INTEGER NOT NULL,
+    total_minted TEXT NOT NULL,
+    total_burned TEXT NOT NULL,
+    PRIMARY KEY (chain_id, token_address)
+);
+CREATE TABLE IF NOT EXISTS token_holder_buckets (
+    chain_id INTEGER NOT NULL,
+    token_address BLOB NOT NULL,
+    bucket INTEGER NOT NULL,
+    holders INTEGER NOT NULL,
+    PRIMARY KEY (chain_id, token_address, bucket)
+);
+CREATE TABLE IF NOT EXISTS transfer_rollups (
+    chain_id INTEGER NOT NULL,
+    token_address BLOB NOT NULL,
+    period TEXT NOT NULL,
+    bucket_start TEXT NOT NULL,
+    volume TEXT NOT NULL,
+    transfer_count INTEGER NOT NULL,
+    unique_senders INTEGER NOT NULL,
+    unique_receivers INTEGER NOT NULL,
+    PRIMARY KEY (chain_id, token_address, period, bucket_start)
+);
+CREATE TABLE IF NOT EXISTS transfer_rollup_wallets (
+    chain_id INTEGER NOT NULL,
+    token_address BLOB NOT NULL,
+    day TEXT NOT NULL,
+    is_sender INTEGER NOT NULL,
+    wallet_address BLOB NOT NULL,
+    PRIMARY KEY (chain_id, token_address, day, is_sender, wallet_address)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS token_metadata (
+    chain_id INTEGER NOT NULL,
+    token_address BLOB NOT NULL,
+    decimals INTEGER NOT NULL,
+    symbol TEXT,
+    name TEXT,
+    PRIMARY KEY (chain_id, token_address)
+);
+CREATE TABLE IF NOT EXISTS indexer_state (
+    chain_id INTEGER NOT NULL,
+    token_address BLOB NOT NULL,
+    last_block INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (chain_id, token_address)
+);
+"""
+
+# Statements are kept constant so the sqlite3 statement cache reuses the prepared upserts
+INSERT_TRANSFER = """
+INSERT INTO transfers (chain_id, block_num, log_index, tx_hash, tx_from, tx_to, value, type, token_address, block_time)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT DO NOTHING
+"""
+UPSERT_BALANCE = """
+INSERT INTO balances (chain_id, token_address, wallet_address, balance, balance_rank) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (chain_id, token_address, wallet_address)
+DO UPDATE SET balance = excluded.balance, balance_rank = excluded.balance_rank
+"""
+SELECT_BALANCE = "SELECT balance FROM balances WHERE chain_id = ? AND token_address = ? AND wallet_address = ?"
+UPSERT_BUCKET = """
+INSERT INTO token_holder_buckets (chain_id, token_address, bucket, holders) VALUES (?, ?, ?, ?)
+ON CONFLICT (chain_id, token_address, bucket) DO UPDATE SET holders = holders + excluded.holders
+"""
+INSERT_ROLLUP_WALLET = """
+INSERT OR IGNORE INTO transfer_rollup_wallets (chain_id, token_address, day, is_sender, wallet_address)
+VALUES (?, ?, ?, ?, ?)
+"""
+SELECT_ROLLUP = """
+SELECT volume FROM transfer_rollups WHERE chain_id = ? AND token_address = ? AND period = ? AND bucket_start = ?
+"""
+UPSERT_ROLLUP = """
+INSERT INTO transfer_rollups
+    (chain_id, token_address, period, bucket_start, volume, transfer_count, unique_senders, unique_receivers)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (chain_id, token_address, period, bucket_start) DO UPDATE SET
+    volume = excluded.volume,
+    transfer_count = transfer_count + excluded.transfer_count,
+    unique_senders = unique_senders + excluded.unique_senders,
+    unique_receivers = unique_receivers + excluded.unique_receivers
+"""
+UPSERT_STATE = """
+INSERT INTO indexer_state (chain_id, token_address, last_block, version) VALUES (?, ?, ?, 1)
+ON CONFLICT (chain_id, token_address) DO UPDATE SET last_block = excluded.last_block, version = version + 1
+"""
+
+
+class SQLiteStorage(Storage):
+    """Embedded Storage in a single SQLite file, tuned for bulk ingest.
+
+    Every call is one transaction with executemany over prepared statements. A single connection is shared by
+    the threads of the process behind a lock, SQLite serializes the writers anyway
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, cached_statements=64)
+        self._lock = threading.Lock()
+        for pragma, value in PRAGMAS.items():
+            self._conn.execute(f"PRAGMA {pragma} = {value}")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                yield self._conn
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def create_tables(self) -> None:
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+    def _delete_token(self, table: str, chain_id: int, token_address: str) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                f"DELETE FROM {table} WHERE chain_id = ? AND token_address = ?",
+                (chain_id, address_to_bytes(token_address)),
+            )
+
+    # Transfers
+    @staticmethod
+    def _transfer_row(transfer: TransferModel) -> Tuple:
+        return (
+            transfer.chain_id,
+            transfer.block_num,
+            transfer.log_index or 0,
+            transfer.tx_hash,
+            address_to_bytes(transfer.tx_from),
+            address_to_bytes(transfer.tx_to),
+            str(transfer.value),
+            transfer.type,
+            address_to_bytes(transfer.token_address),
+            transfer.block_time.isoformat() if transfer.block_time else None,
+        )
+
+    def insert_transfers(self, transfers: List[TransferModel]) -> None:
+        with self._transaction() as conn:
+            conn.executemany(INSERT_TRANSFER, [self._transfer_row(transfer) for transfer in transfers])
+
+    def delete_token_transfers(self, chain_id: int, token_address: str) -> None:
+        self._delete_token("transfers", chain_id, token_address)
+
+    # Balances
+    def insert_balances(self, chain_id: int, balances: List[BalanceModel]) -> None:
+        with self._transaction() as conn:
+            conn.executemany(UPSERT_BALANCE, [
+                (
+                    chain_id,
+                    address_to_bytes(balance.token_address),
+                    address_to_bytes(balance.wallet_address),
+                    str(balance.balance),
+                    float(balance.balance),
+                )
+                for balance in balances
+            ])
+
+    def increment_balance(self, chain_id: int, token_address: str, wallet_address: str, value: Decimal) -> Decimal:
+        with self._transaction() as conn:
+            return self._increment_balance(conn, chain_id, token_address, wallet_address, value)
+
+    def apply_transfer_batch(
+            self, chain_id: int, token_address: str, transfers: List[TransferModel], last_block: int
+    ) -> Tuple[int, Dict[str, Tuple[Decimal, int]]]:
+        with self._transaction() as conn:
+            # Transfers already stored are ignored by the unique index
+            transfers = [
+                transfer for transfer in transfers if conn.execute(INSERT_TRANSFER, self._transfer_row(transfer)).rowcount
+            ]
+            increments, minted, burned = balance_increments(transfers)
+            new_balances = [
+                self._increment_balance(conn, chain_id, token_address, wallet_address, value)
+                for wallet_address, value, _ in increments
+            ]
+            holders_delta, bucket_deltas = holder_deltas(
+                (new_balance - value, new_balance) for (_, value, _), new_balance in zip(increments, new_balances)
+            )
+            self._apply_token_stats_delta(conn, chain_id, token_address, holders_delta, minted, burned, bucket_deltas)
+            self._apply_transfer_rollups(conn, chain_id, token_address, transfers)
+            conn.execute(UPSERT_STATE, (chain_id, address_to_bytes(token_address), last_block))
+
+        changes = {
+            wallet_address: (new_balance, block_num)
+            for (wallet_address, _, block_num), new_balance in zip(increments, new_balances)
+        }
+        return len(transfers), changes
+
+    @staticmethod
+    def _increment_balance(
+            conn: sqlite3.Connection, chain_id: int, token_address: str, wallet_address: str, value: Decimal
+    ) -> Decimal:
+        key = (chain_id, address_to_bytes(token_address), address_to_bytes(wallet_address))
+        row = conn.execute(SELECT_BALANCE, key).fetchone()
+        new_balance = (Decimal(row[0]) if row else Decimal(0)) + value
+        conn.execute(UPSERT_BALANCE, (*key, str(new_balance), float(new_balance)))
+        return new_balance
+
+    def delete_token_balances(self, chain_id: int, token_address: str) -> None:
+        self._delete_token("balances", chain_id, token_address)
+
+    def get_token_top_holders(self, chain_id: int, token_address: str, limit: int = 100) -> List[BalanceModel]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT wallet_address, balance FROM balances WHERE chain_id = ? AND token_address = ? "
+                "ORDER BY balance_rank DESC LIMIT ?",
+                (chain_id, address_to_bytes(token_address), limit),
+            ).fetchall()
+        return [
+            BalanceModel(
+                chain_id=chain_id,
+                token_address=token_address,
+                wallet_address=bytes_to_address(wallet_address),
+                balance=Decimal(balance),
+            )
+            for wallet_address, balance in rows
+        ]
+
+    # Token stats
+    def insert_token_stats(self, stats: TokenStatsModel) -> None:
+        token_address = address_to_bytes(stats.token_address)
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM token_stats WHERE chain_id = ? AND token_address = ?", (stats.chain_id, token_address))
+            conn.execute(
+                "DELETE FROM token_holder_buckets WHERE chain_id = ? AND token_address = ?", (stats.chain_id, token_address)
+            )
+            conn.execute(
+                "INSERT INTO token_stats (chain_id, token_address, holder_count, total_minted, total_burned) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (stats.chain_id, token_address, stats.holder_count, str(stats.total_minted), str(stats.total_burned)),
+            )
+            conn.executemany(UPSERT_BUCKET, [
+                (stats.chain_id, token_address, bucket, holders) for bucket, holders in stats.buckets.items()
+            ])
+
+    def apply_token_stats_delta(
+            self,
+            chain_id: int,
+            token_address: str,
+            holders_delta: int,
+            minted: Decimal,
+            burned: Decimal,
+            bucket_deltas: Dict[int, int],
+    ) -> None:
+        with self._transaction() as conn:
+            self._apply_token_stats_delta(conn, chain_id, token_address, holders_delta, minted, burned, bucket_deltas)
+
+    @staticmethod
+    def _apply_token_stats_delta(
+            conn: sqlite3.Connection,
+            chain_id: int,
+            token_address: str,
+            holders_delta: int,
+            minted: Decimal,
+            burned: Decimal,
+            bucket_deltas: Dict[int, int],
+    ) -> None:
+        if not holders_delta and not minted and not burned and not bucket_deltas:
+            return
+        key = (chain_id, address_to_bytes(token_address))
+        row = conn.execute(
+            "SELECT holder_count, total_minted, total_burned FROM token_stats WHERE chain_id = ? AND token_address = ?",
+            key,
+        ).fetchone()
+        holder_count, total_minted, total_burned = (row[0], Decimal(row[1]), Decimal(row[2])) if row else (0, 0, 0)
+        conn.execute(
+            "INSERT OR REPLACE INTO token_stats (chain_id, token_address, holder_count, total_minted, total_burned) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (*key, holder_count + holders_delta, str(total_minted + minted), str(total_burned + burned)),
+        )
+        conn.executemany(UPSERT_BUCKET, [(*key, bucket, delta) for bucket, delta in bucket_deltas.items()])
+
+    def delete_token_stats(self, chain_id: int, token_address: str) -> None:
+        self._delete_token("token_stats", chain_id, token_address)
+        self._delete_token("token_holder_buckets", chain_id, token_address)
+
+    # Transfer rollups
+    def apply_transfer_rollups(self, chain_id: int, token_address: str, transfers: List[TransferModel]) -> None:
+        with self._transaction() as conn:
+            self._apply_transfer_rollups(conn, chain_id, token_address, transfers)
+
+    @staticmethod
+    def _apply_transfer_rollups(
+            conn: sqlite3.Connection, chain_id: int, token_address: str, transfers: List[TransferModel]
+    ) -> None:
+        buckets, wallet_days = rollup_transfers(transfers)
+        if not buckets:
+            return
+        key = (chain_id, address_to_bytes(token_address))
+        unique = {}
+        for day, is_sender, wallet_address in wallet_days:
+            cursor = conn.execute(
+                INSERT_ROLLUP_WALLET, (*key, day.isoformat(), is_sender, address_to_bytes(wallet_address))
+            )
+            if cursor.rowcount:
+                counts = unique.setdefault(day, [0, 0])
+                counts[0 if is_sender else 1] += 1
+
+        for (period, start), (volume, count) in buckets.items():
+            row = conn.execute(SELECT_ROLLUP, (*key, period, start.isoformat())).fetchone()
+            senders, receivers = unique.get(start, (0, 0)) if period == "day" else (0, 0)
+            conn.execute(UPSERT_ROLLUP, (
+                *key,
+                period,
+                start.isoformat(),
+                str(volume + (Decimal(row[0]) if row else 0)),
+                count,
+                senders,
+                receivers,
+            ))
+
+    def delete_transfer_rollups(self, chain_id: int, token_address: str) -> None:
+        self._delete_token("transfer_rollups", chain_id, token_address)
+        self._delete_token("transfer_rollup_wallets", chain_id, token_address)
+
+    # Token metadata
+    def insert_token_metadata(self, metadata: List[TokenMetadataModel]) -> None:
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO token_metadata (chain_id, token_address, decimals, symbol, name) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (token.chain_id, address_to_bytes(token.token_address), token.decimals, token.symbol, token.name)
+                    for token in metadata
+                ],
+            )
+
+    def get_tokens_metadata(self, chain_id: int, token_addresses: List[str]) -> Dict[str, TokenMetadataModel]:
+        metadata = {}
+        with self._lock:
+            for token_address in token_addresses:
+                row = self._conn.execute(
+                    "SELECT decimals, symbol, name FROM token_metadata WHERE chain_id = ? AND token_address = ?",
+                    (chain_id, address_to_bytes(token_address)),
+                ).fetchone()
+                if row:
+                    metadata[token_address.lower()] = TokenMetadataModel(
+                        chain_id=chain_id,
+                        token_address=token_address.lower(),
+                        decimals=row[0],
+                        symbol=row[1],
+                        name=row[2],
+                    )
+        return metadata
+
+    # Indexer state
+    def set_last_indexed_block(self, chain_id: int, token_address: str, block_num: int) -> None:
+        with self._transaction() as conn:
+            conn.execute(UPSERT_STATE, (chain_id, address_to_bytes(token_address), block_num))
+
+    def get_last_indexed_block(self, chain_id: int, token_address: str) -> int | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_block FROM indexer_state WHERE chain_id = ? AND token_address = ?",
+                (chain_id, address_to_bytes(token_address)),
+            ).fetchone()
+        return row[0] if row else None
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from src.models import TransferModel, BalanceModel, TokenStatsModel, TokenMetadataModel
+from . import schemas, notifications
+
+
+class Storage(ABC):
+    """Storage used by the backfill and the real-time indexer.
+
+    Covers the intake functions of src.db and the reads the services need. PostgresStorage runs the src.db
+    functions; SQLiteStorage is an embedded backend with no external service, also used to benchmark the
+    DB layer in isolation (benchmarks/storage_ingest.py)
+    """
+
+    @abstractmethod
+    def create_tables(self) -> None:
+        ...
+
+    # Transfers
+    @abstractmethod
+    def insert_transfers(self, transfers: List[TransferModel]) -> None:
+        ...
+
+    @abstractmethod
+    def delete_token_transfers(self, chain_id: int, token_address: str) -> None:
+        ...
+
+    # Balances
+    @abstractmethod
+    def insert_balances(self, chain_id: int, balances: List[BalanceModel]) -> None:
+        ...
+
+    @abstractmethod
+    def increment_balance(self, chain_id: int, token_address: str, wallet_address: str, value: Decimal) -> Decimal:
+        """Returns the new balance"""
+
+    @abstractmethod
+    def delete_token_balances(self, chain_id: int, token_address: str) -> None:
+        ...
+
+    @abstractmethod
+    def apply_transfer_batch(
+            self, chain_id: int, token_address: str, transfers: List[TransferModel], last_block: int
+    ) -> Tuple[int, Dict[str, Tuple[Decimal, int]]]:
+        """Stores a batch of transfers of the token and, in the same transaction, applies the balance, token stats
+        and rollup changes of the ones not stored before and records last_block as indexed. Transfers already
+        stored are skipped, so a replayed batch is applied once.
+        Returns (number of transfers applied, {wallet_address: (new balance, block_num)})"""
+
+    @abstractmethod
+    def get_token_top_holders(self, chain_id: int, token_address: str, limit: int = 100) -> List[BalanceModel]:
+        ...
+
+    # Token stats
+    @abstractmethod
+    def insert_token_stats(self, stats: TokenStatsModel) -> None:
+        ...
+
+    @abstractmethod
+    def apply_token_stats_delta(
+            self,
+            chain_id: int,
+            token_address: str,
+            holders_delta: int,
+            minted: Decimal,
+            burned: Decimal,
+            bucket_deltas: Dict[int, int],
+    ) -> None:
+        ...
+
+    @abstractmethod
+    def delete_token_stats(self, chain_id: int, token_address: str) -> None:
+        ...
+
+    # Transfer rollups
+    @abstractmethod
+    def apply_transfer_rollups(self, chain_id: int, token_address: str, transfers: List[TransferModel]) -> None:
+        ...
+
+    @abstractmethod
+    def delete_transfer_rollups(self, chain_id: int, token_address: str) -> None:
+        ...
+
+    # Token metadata
+    @abstractmethod
+    def insert_token_metadata(self, metadata: List[TokenMetadataModel]) -> None:
+        ...
+
+    @abstractmethod
+    def get_tokens_metadata(self, chain_id: int, token_addresses: List[str]) -> Dict[str, TokenMetadataModel]:
+        """Returns the stored metadata of the tokens, keyed by lowercase address"""
+
+    # Indexer state
+    @abstractmethod
+    def set_last_indexed_block(self, chain_id: int, token_address: str, block_num: int) -> None:
+        ...
+
+    @abstractmethod
+    def get_last_indexed_block(self, chain_id: int, token_address: str) -> int | None:
+        ...
+
+    # Change feed
+    def publish_balance_changes(
+            self, chain_id: int, token_address: str, changes: Dict[str, Tuple[Decimal, int]]
+    ) -> None:
+        """Notifies the committed balance changes {wallet_address: (new balance, block_num)}. No-op by default"""
+
+
+class PostgresStorage(Storage):
+    """Storage over the Postgres functions of src.db"""
+
+    def create_tables(self) -> None:
+        from . import Base
+        from .db_utils import create_tables
+
+        create_tables(metadata=Base.metadata)
+
+    def insert_transfers(self, transfers: List[TransferModel]) -> None:
+        schemas.insert_transfers(transfers)
+
+    def delete_token_transfers(self, chain_id: int, token_address: str) -> None:
+        schemas.delete_token_transfers(chain_id, token_address)
+        # The compacted transfers go as well
+        schemas.delete_balance_checkpoints(chain_id, token_address)
+
+    def insert_balances(self, chain_id: int, balances: List[BalanceModel]) -> None:
+        schemas.insert_balances(chain_id, balances)
+
+    def increment_balance(self, chain_id: int, token_address: str, wallet_address: str, value: Decimal) -> Decimal:
+        return schemas.increment_balance(chain_id, token_address, wallet_address, value)
+
+    def delete_token_balances(self, chain_id: int, token_address: str) -> None:
+        schemas.delete_token_balances(chain_id, token_address)
+
+    def apply_transfer_batch(
+            self, chain_id: int, token_address: str, transfers: List[TransferModel], last_block: int
+    ) -> Tuple[int, Dict[str, Tuple[Decimal, int]]]:
+        return schemas.apply_transfer_batch(chain_id, token_address, transfers, last_block)
+
+    def get_token_top_holders(self, chain_id: int, token_address: str, limit: int = 100) -> List[BalanceModel]:
+        return schemas.get_token_top_holders(chain_id, token_address, limit)
+
+    def insert_token_stats(self, stats: TokenStatsModel) -> None:
+        schemas.insert_token_stats(stats)
+
+    def apply_token_stats_delta(
+            self,
+            chain_id: int,
+            token_address: str,
+            holders_delta: int,
+            minted: Decimal,
+            burned: Decimal,
+            bucket_deltas: Dict[int, int],
+    ) -> None:
+        schemas.apply_token_stats_delta(chain_id, token_address, holders_delta, minted, burned, bucket_deltas)
+
+    def delete_token_stats(self, chain_id: int, token_address: str) -> None:
+        schemas.delete_token_stats(chain_id, token_address)
+
+    def apply_transfer_rollups(self, chain_id: int, token_address: str, transfers: List[TransferModel]) -> None:
+        schemas.apply_transfer_rollups(chain_id, token_address, transfers)
+
+    def delete_transfer_rollups(self, chain_id: int, token_address: str) -> None:
+        schemas.delete_transfer_rollups(chain_id, token_address)
+
+    def insert_token_metadata(self, metadata: List[TokenMetadataModel]) -> None:
+        schemas.insert_token_metadata(metadata)
+
+    def get_tokens_metadata(self, chain_id: int, token_addresses: List[str]) -> Dict[str, TokenMetadataModel]:
+        return schemas.get_tokens_metadata(chain_id, token_addresses)
+
+    def set_last_indexed_block(self, chain_id: int, token_address: str, block_num: int) -> None:
+        schemas.set_last_indexed_block(chain_id, token_address, block_num)
+
+    def get_last_indexed_block(self, chain_id: int, token_address: str) -> int | None:
+        return schemas.get_last_indexed_block(chain_id, token_address)
+
+    def publish_balance_changes(
+            self, chain_id: int, token_address: str, changes: Dict[str, Tuple[Decimal, int]]
+    ) -> None:
+        notifications.publish_balance_changes(chain_id, token_address, changes)
+
+
+def get_storage(url: str = "") -> Storage:
+    """Returns the Storage of url: 'sqlite:///<path>' for the embedded backend, empty for Postgres (settings)"""
+    if url.startswith("sqlite:///"):
+        from .sqlite_storage import SQLiteStorage
+
+        return SQLiteStorage(url[len("sqlite:///"):])
+    if url:
+        raise ValueError(f"Unsupported storage url {url}")
+    return PostgresStorage()
+
@@ -1,3 +1,13 @@
 from .log_model import LogModel
 from .transfer_model import TransferModel
 from .balance_model import BalanceModel
+from .indexer_state_model import IndexerStateModel
+from .token_stats_model import TokenStatsModel
+from .reconcile_model import BalanceMismatchModel, ReconcileReportModel
+from .transfer_rollup_model import TransferRollupModel
+from .chain_config_model import ChainConfigModel
+from .balance_change_model import BalanceChangeModel
+from .portfolio_model import PortfolioEntryModel
+from .load_test_model import LoadTestReportModel
+from .token_metadata_model import TokenMetadataModel
+from .retention_model import TransferRetentionModel, CompactionReportModel
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from typing_extensions import TypeAlias
+from decimal import Decimal
+from pydantic import BaseModel
+
+Address: TypeAlias = str
+
+
+class BalanceChangeModel(BaseModel):
+    chain_id: int
+    token_address: Address
+    wallet_address: Address
+    balance: Decimal  # New balance
+    block_num: int
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from typing import List
+from typing_extensions import TypeAlias
+from pydantic import BaseModel
+
+from src.constants import COMPUTE_UNITS_PER_SECOND, INIT_BLOCK, FETCH_STRATEGY_DEFAULT
+
+Address: TypeAlias = str
+
+
+class ChainConfigModel(BaseModel):
+    chain_id: int
+    provider_url: str
+    provider_websocket: str
+    provider_key: str
+    provider_endpoints: str = ""  # Comma separated 'url' or 'url|weight'
+    compute_units_per_second: int = COMPUTE_UNITS_PER_SECOND
+    max_concurrency: int = 2  # Tokens of the chain written at the same time
+    tokens: List[Address]
+    backfill: bool = False  # Backfill the tokens never indexed before
+    init_block: int = INIT_BLOCK
+    fetch_strategy: str = FETCH_STRATEGY_DEFAULT  # Backfill calls: 'logs', 'receipts', 'transfers' or 'auto'
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from typing_extensions import TypeAlias
+from pydantic import BaseModel
+
+Address: TypeAlias = str
+
+
+class IndexerStateModel(BaseModel):
+    chain_id: int
+    token_address: Address
+    last_block: int
+    version: int  # Increased on every write, also within the same block
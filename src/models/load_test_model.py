@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+from pydantic import BaseModel
+
+
+class LoadTestReportModel(BaseModel):
+    duration: float  # Seconds the stand-in node produced blocks
+    target_rate: float  # Transfers per second produced
+    catch_up_transfers: int
+    catch_up_seconds: float
+    emitted: int  # Transfers notified by the subscription
+    removed: int  # Logs notified again as removed by the reorgs
+    committed: int  # Notified transfers committed, including after the production stopped
+    throughput: float  # Transfers committed per second while the node was producing
+    latency_p50: Optional[float]  # Seconds from notification to commit
+    latency_p99: Optional[float]
+    memory: List[Tuple[float, int]]  # (seconds since start, RSS bytes)
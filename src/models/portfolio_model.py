@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from typing import Optional
+from typing_extensions import TypeAlias
+from decimal import Decimal
+from pydantic import BaseModel
+
+Address: TypeAlias = str
+
+
+class PortfolioEntryModel(BaseModel):
+    chain_id: int
+    wallet_address: Address
+    token_address: Address
+    symbol: Optional[str]
+    name: Optional[str]
+    decimals: int
+    balance: Decimal  # Scaled by decimals
+    raw_balance: int  # In token base units
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from typing import List, Optional
+from typing_extensions import TypeAlias
+from decimal import Decimal
+from pydantic import BaseModel
+
+Address: TypeAlias = str
+
+
+class BalanceMismatchModel(BaseModel):
+    wallet_address: Address
+    db_balance: Decimal
+    chain_balance: Optional[Decimal]  # None if balanceOf failed
+
+
+class ReconcileReportModel(BaseModel):
+    chain_id: int
+    token_address: Address
+    block_num: Optional[int]
+    checked: int
+    mismatches: List[BalanceMismatchModel]
+    repaired: int
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from typing import List, Optional
+from typing_extensions import TypeAlias
+from decimal import Decimal
+from pydantic import BaseModel
+
+Address: TypeAlias = str
+
+
+class TransferRetentionModel(BaseModel):
+    chain_id: int
+    token_address: Address
+    retain_blocks: int  # Blocks of history kept behind the last indexed block
+    archive_dir: Optional[str]  # None to delete the compacted transfers without archiving them
+    cutoff_block: Optional[int]  # None if never compacted
+    compacted: int = 0
+    minted: Decimal = Decimal(0)
+    burned: Decimal = Decimal(0)
+
+
+class CompactionReportModel(BaseModel):
+    chain_id: int
+    token_address: Address
+    cutoff_block: Optional[int]  # None if the token has no transfers old enough
+    compacted: int
+    files: List[str]
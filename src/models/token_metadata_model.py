@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from typing import Optional
+from typing_extensions import TypeAlias
+from pydantic import BaseModel
+
+Address: TypeAlias = str
+
+
+class TokenMetadataModel(BaseModel):
+    chain_id: int
+    token_address: Address
+    decimals: int
+    symbol: Optional[str]  # None if symbol() failed
+    name: Optional[str]  # None if name() failed
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from typing import Dict, Optional
+from typing_extensions import TypeAlias
+from decimal import Decimal
+from pydantic import BaseModel
+
+Address: TypeAlias = str
+
+
+class TokenStatsModel(BaseModel):
+    chain_id: int
+    token_address: Address
+    holder_count: int
+    total_supply: Decimal
+    total_minted: Decimal
+    total_burned: Decimal
+    buckets: Dict[int, int] = {}  # floor(log10(balance)) -> holders
+    top10_share: Optional[Decimal]
@@ -17,6 +17,7 @@ class TransferModel(BaseModel):
     tx_from: Address
     tx_to: Address
     value: Decimal
+    log_index: Optional[int]  # Position of the log in the block, keyset pagination with block_num
     type: str
     token_address: Address
     token_id: Optional[str]
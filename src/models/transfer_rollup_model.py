@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from typing import Optional
+from typing_extensions import TypeAlias
+from datetime import datetime
+from decimal import Decimal
+from pydantic import BaseModel
+
+Address: TypeAlias = str
+
+
+class TransferRollupModel(BaseModel):
+    chain_id: int
+    token_address: Address
+    period: str  # hour or day
+    bucket_start: datetime
+    volume: Decimal
+    transfer_count: int
+    unique_senders: Optional[int]  # Only for day buckets
+    unique_receivers: Optional[int]
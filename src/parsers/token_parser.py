@@ -1,22 +1,41 @@
+from __future__ import annotations
+
 import logging
 from decimal import Decimal
+from typing import Any, Callable, Dict, List, Tuple
 
 from web3 import Web3
 
 from src.utils import abi_utils
+from src.utils.address_utils import intern_address
 from src.models import LogModel, TransferModel
 
-from src.constants import TRANSFER_TOPIC, TYPE_ERC20, DECIMALS_DEFAULT
+from src.constants import TRANSFER_TOPIC, TYPE_ERC20, DECIMALS_DEFAULT, ERC20_TRANSFER_EVENT, STANDARD_EVENTS
 
 
 logger = logging.getLogger()
 
 web3 = Web3()
 
+erc20_transfer_decoder = abi_utils.compile_event(ERC20_TRANSFER_EVENT)
+
 
 class TokenParser:
     """Token Transfer Parser Class"""
 
+    def __init__(self, events_abi: List[Dict] = None, decimals: Callable[[str], int] | None = None) -> None:
+        """
+        :param events_abi: Optional. custom event ABIs to decode on top of the standard ones
+        :param decimals: Optional. returns the decimals of a token, e.g. TokenMetadataService.decimals.
+            DECIMALS_DEFAULT for every token if not given
+        """
+        self._decoders = abi_utils.EventDecoderRegistry(STANDARD_EVENTS + (events_abi or []))
+        self._decimals = decimals
+
+    def decode_event(self, log: LogModel) -> Tuple[str, Dict[str, Any]]:
+        """Returns the event name and arguments of any registered event"""
+        return self._decoders.decode(log.topics, log.data)
+
     def decode_log(self, log: LogModel) -> TransferModel:
         """Returns a Model of the log data given the contract standard"""
         contract_type = self.decode_token_standard(log.topic, len(log.topics))
@@ -26,25 +45,21 @@ class TokenParser:
         else:
             raise Exception("Wrong Contract Type")
 
-    @staticmethod
-    def _parse_erc20_transfer_log(log: LogModel) -> TransferModel:
-        topics = log.topics + abi_utils.split_to_words(log.data)
-        args = {
-            "from": abi_utils.word_to_address(topics[1]),
-            "to": abi_utils.word_to_address(topics[2]),
-            "value": web3.to_int(hexstr=topics[3]),
-        }
+    def _parse_erc20_transfer_log(self, log: LogModel) -> TransferModel:
+        args = erc20_transfer_decoder.decode(log.topics, log.data)
+        decimals = self._decimals(log.address) if self._decimals else DECIMALS_DEFAULT
 
         result = TransferModel(
             chain_id=log.chain_id,
             block_num=log.block_num,
             block_time=log.block_time,
             tx_hash=log.transaction_hash,
-            tx_from=args["from"],
-            tx_to=args["to"],
-            value=Decimal(args["value"]) / Decimal(10**DECIMALS_DEFAULT),
+            tx_from=intern_address(args["from"]),
+            tx_to=intern_address(args["to"]),
+            value=Decimal(args["value"]) / Decimal(10**decimals),
+            log_index=log.log_index,
             type="Transfer",
-            token_address=log.address.lower(),
+            token_address=intern_address(log.address),
         )
         return result
 
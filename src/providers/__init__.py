@@ -1 +1,4 @@
 from .alchemy import AlchemyProvider
+from .rate_limiter import TokenBucket, RateLimitException
+from .endpoint_pool import Endpoint, EndpointPool, parse_endpoints
+from .fetch_strategies import FetchStrategy, AutoFetchStrategy, get_fetch_strategy
@@ -1,22 +1,248 @@
+from __future__ import annotations
+
 import logging
 import time
-from typing import Dict, List
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Iterable, Tuple
+import requests
+from requests.exceptions import ConnectionError, Timeout, HTTPError
 from web3 import Web3
 
 from src.models import LogModel
+from src.utils.lru_cache import LRUCache
+from src.utils.address_utils import address_to_bytes
+from src.utils.multicall import encode_aggregate3, decode_aggregate3
+from src.utils.abi_utils import decode_abi_string
+from src.constants import (
+    COMPUTE_UNITS,
+    COMPUTE_UNITS_DEFAULT,
+    COMPUTE_UNITS_PER_SECOND,
+    RATE_LIMIT_BACKOFF,
+    RATE_LIMIT_RETRIES,
+    RPC_BATCH_SIZE,
+    RECEIPTS_BATCH_SIZE,
+    ASSET_TRANSFERS_PAGE_SIZE,
+    TRANSFER_TOPIC,
+    RPC_TIMEOUT,
+    BLOCK_TIME_CACHE_SIZE,
+    MULTICALL3_ADDRESS,
+    MULTICALL_BATCH_SIZE,
+    MULTICALL_RPC_BATCH_SIZE,
+    BALANCE_OF_SELECTOR,
+    DECIMALS_SELECTOR,
+    SYMBOL_SELECTOR,
+    NAME_SELECTOR,
+    DECIMALS_MAX,
+)
+from .endpoint_pool import Endpoint, EndpointPool
+from .rate_limiter import RateLimitException, is_rate_limit_error
+from .fetch_strategies import FetchStrategy, LogsStrategy
 
 logger = logging.getLogger()
 
 
+def _http_client(url: str) -> Web3:
+    """Web3 client of url without the web3 HTTP retry middleware, which would retry 429s at once: throttled
+    calls must reach the rate limiter and the endpoint failover"""
+    provider = Web3.HTTPProvider(url)
+    provider.middlewares = ()
+    return Web3(provider)
+
+
 class AlchemyProvider:
     """Alchemy provider Class"""
 
-    def __init__(self, chain_id: int, host: str, websocket: str, api_key: str) -> None:
+    def __init__(
+            self,
+            chain_id: int,
+            host: str,
+            websocket: str,
+            api_key: str,
+            endpoints: List[tuple] | None = None,
+            compute_units_per_second: float = COMPUTE_UNITS_PER_SECOND,
+    ) -> None:
+        """
+        :param endpoints: Optional. extra (url, weight) endpoints or keys to balance the load with
+        :param compute_units_per_second: compute units budget of each endpoint
+        """
         self.chain_id = chain_id
         self._url = host
         self._websocket_url = websocket
         self._key = api_key
-        self._web3 = Web3(Web3.HTTPProvider(self._url + self._key))
+        self._web3 = _http_client(self._url + self._key)
+
+        primary = Endpoint(self._url + self._key, compute_units_per_second)
+        primary.client = self._web3
+        pool_endpoints = [primary]
+        for url, weight in endpoints or []:
+            endpoint = Endpoint(url, compute_units_per_second, weight)
+            endpoint.client = _http_client(url)
+            pool_endpoints.append(endpoint)
+        self._pool = EndpointPool(pool_endpoints)
+        self._session = requests.Session()
+        self._block_times = LRUCache(BLOCK_TIME_CACHE_SIZE)
+
+    @property
+    def compute_units_per_second(self) -> float:
+        """Compute units budget of all the endpoints together"""
+        return sum(endpoint.limiter.rate for endpoint in self._pool.endpoints)
+
+    @property
+    def compute_units_capacity(self) -> float:
+        """Compute units a single request can spend without waiting, the smallest bucket of the endpoints"""
+        return min(endpoint.limiter.capacity for endpoint in self._pool.endpoints)
+
+    def _execute(self, method: str, func: Callable[[Web3], Any], calls: int = 1) -> Any:
+        """Runs func(web3) on the next endpoint of the pool, after paying the compute units of method.
+
+        Throttled calls (429) pause the endpoint and are retried, on the same range, in the next endpoint.
+        Connection errors take the endpoint out of rotation and fail over to the next one.
+        Any other error (e.g. eth_getLogs range too large) is raised to the caller.
+        """
+        cost = COMPUTE_UNITS.get(method, COMPUTE_UNITS_DEFAULT) * calls
+        throttled = 0
+        failovers = 0
+        while True:
+            endpoint = self._pool.next()
+            endpoint.limiter.acquire(cost)
+            try:
+                result = func(endpoint.client)
+                self._pool.mark_success(endpoint)
+                return result
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    throttled += 1
+                    endpoint.limiter.pause(RATE_LIMIT_BACKOFF * throttled)
+                    logger.debug(f"{method} throttled by {endpoint}. attempt {throttled}")
+                    if throttled >= RATE_LIMIT_RETRIES:
+                        raise RateLimitException(f"{method} throttled {throttled} times") from e
+                    continue
+                if isinstance(e, (ConnectionError, Timeout, HTTPError)):
+                    failovers += 1
+                    self._pool.mark_failure(endpoint)
+                    if failovers >= len(self._pool):
+                        raise
+                    continue
+                raise
+
+    def _post_batch(self, w3: Web3, payload: List[Dict]) -> List[Any]:
+        """POSTs a JSON-RPC batch to the endpoint of w3. Returns the results sorted as the payload"""
+        response = self._session.post(w3.provider.endpoint_uri, json=payload, timeout=RPC_TIMEOUT)
+        response.raise_for_status()
+        responses = response.json()
+        if isinstance(responses, dict):
+            # Whole batch rejected
+            raise ValueError(responses.get("error", responses))
+        results = [None] * len(payload)
+        for item in responses:
+            if "error" in item:
+                raise ValueError(item["error"])
+            results[item["id"]] = item["result"]
+        return results
+
+    def batch_call(self, method: str, params_list: List[List], batch_size: int = RPC_BATCH_SIZE) -> List[Any]:
+        """Calls method once per params in params_list, grouped in JSON-RPC batches of batch_size
+
+        :param method: JSON-RPC method
+        :param params_list: list of params, one per call
+        :param batch_size: Optional. calls per JSON-RPC batch request
+        :return : List of raw results, in the same order as params_list
+        """
+        results = []
+        for i in range(0, len(params_list), batch_size):
+            batch = params_list[i: i + batch_size]
+            payload = [
+                {"jsonrpc": "2.0", "id": j, "method": method, "params": params} for j, params in enumerate(batch)
+            ]
+            results.extend(self._execute(method, lambda w3: self._post_batch(w3, payload), calls=len(batch)))
+        return results
+
+    def multicall(self, calls: List[Tuple[str, bytes]], block_num: int | None = None) -> List[Tuple[bool, bytes]]:
+        """Runs the calls through Multicall3 aggregate3, MULTICALL_BATCH_SIZE calls per eth_call and
+        MULTICALL_RPC_BATCH_SIZE eth_calls per JSON-RPC batch request
+
+        :param calls: [(target address, calldata)]
+        :param block_num: Optional. block to run the calls at, latest by default
+        :return : [(success, return data)] in the same order as calls
+        """
+        block = hex(block_num) if block_num is not None else "latest"
+        params_list = []
+        for i in range(0, len(calls), MULTICALL_BATCH_SIZE):
+            calldata = encode_aggregate3(
+                [(address_to_bytes(target), data) for target, data in calls[i: i + MULTICALL_BATCH_SIZE]]
+            )
+            params_list.append([{"to": MULTICALL3_ADDRESS, "data": "0x" + calldata.hex()}, block])
+
+        results = []
+        for raw in self.batch_call("eth_call", params_list, batch_size=MULTICALL_RPC_BATCH_SIZE):
+            results.extend(decode_aggregate3(bytes.fromhex(raw[2:])))
+        return results
+
+    def get_balances_of(
+            self, token_address: str, wallets: List[str], block_num: int | None = None
+    ) -> List[int | None]:
+        """Returns the raw ERC20 balanceOf of every wallet, None where the call failed"""
+        selector = bytes.fromhex(BALANCE_OF_SELECTOR[2:])
+        calls = [(token_address, selector + b"\x00" * 12 + address_to_bytes(wallet)) for wallet in wallets]
+        return [
+            int.from_bytes(data[:32], "big") if success and len(data) >= 32 else None
+            for success, data in self.multicall(calls, block_num)
+        ]
+
+    def get_tokens_metadata(self, token_addresses: List[str]) -> List[Tuple[int | None, str | None, str | None]]:
+        """Returns the (decimals, symbol, name) of every token with decimals(), symbol() and name() batched
+        through multicall. Each value is None where the call failed or returned garbage"""
+        selectors = [bytes.fromhex(selector[2:]) for selector in (DECIMALS_SELECTOR, SYMBOL_SELECTOR, NAME_SELECTOR)]
+        calls = [(token_address, selector) for token_address in token_addresses for selector in selectors]
+        results = self.multicall(calls)
+
+        metadata = []
+        for i in range(0, len(results), len(selectors)):
+            (decimals_ok, decimals), (symbol_ok, symbol), (name_ok, name) = results[i: i + len(selectors)]
+            decimals = int.from_bytes(decimals[:32], "big") if decimals_ok and len(decimals) >= 32 else None
+            metadata.append((
+                decimals if decimals is not None and decimals <= DECIMALS_MAX else None,
+                decode_abi_string(symbol) if symbol_ok else None,
+                decode_abi_string(name) if name_ok else None,
+            ))
+        return metadata
+
+    def get_block_times(self, block_nums: Iterable[int]) -> Dict[int, datetime]:
+        """Returns the UTC block timestamps of block_nums. One batched eth_getBlockByNumber per unique
+        block not in the LRU cache"""
+        block_times = {}
+        missing = []
+        for block_num in set(block_nums):
+            block_time = self._block_times.get(block_num)
+            if block_time is None:
+                missing.append(block_num)
+            else:
+                block_times[block_num] = block_time
+
+        if missing:
+            missing.sort()
+            headers = self.batch_call("eth_getBlockByNumber", [[hex(block_num), False] for block_num in missing])
+            for block_num, header in zip(missing, headers):
+                if header is None:
+                    logger.warning(f"Block {block_num} not found")
+                    continue
+                block_time = datetime.utcfromtimestamp(int(header["timestamp"], 16))
+                self._block_times.put(block_num, block_time)
+                block_times[block_num] = block_time
+
+        return block_times
+
+    def add_block_times(self, logs: List[LogModel]) -> None:
+        """Fills block_time of the logs in place with a single lookup per unique block"""
+        if not logs:
+            return
+        block_times = self.get_block_times(log.block_num for log in logs)
+        for log in logs:
+            log.block_time = block_times.get(log.block_num)
+
+    def health_check(self) -> int:
+        """Probes every endpoint with eth_blockNumber. Returns the number of healthy endpoints"""
+        return self._pool.health_check(lambda endpoint: endpoint.client.eth.block_number)
 
     def parse_log(self, log) -> LogModel:
         """Returns the LogModel of the given log AttrDict"""
@@ -51,7 +277,7 @@ class AlchemyProvider:
                 topics=log["topics"],
                 data=log["data"],
                 log_index=self._web3.to_int(hexstr=log["logIndex"]),
-                deleted=bool(log["removed"]),
+                deleted=bool(log.get("removed", False)),  # Missing in some eth_getBlockReceipts
             )
             return log_model
         except Exception as e:
@@ -60,7 +286,7 @@ class AlchemyProvider:
 
     def get_latest_block_num(self) -> int:
         """Returns last block number"""
-        return self._web3.eth.block_number
+        return self._execute("eth_blockNumber", lambda w3: w3.eth.block_number)
 
     def get_logs(self, start_block: int, end_block: int) -> List[LogModel]:
         """Returns List of logs between the range conformed to LogModel"""
@@ -70,7 +296,7 @@ class AlchemyProvider:
         st = time.time()
 
         event_filter = {"fromBlock": start_block, "toBlock": end_block}
-        logs_provider = self._web3.eth.get_logs(event_filter)
+        logs_provider = self._execute("eth_getLogs", lambda w3: w3.eth.get_logs(event_filter))
         for log in logs_provider:
             logs.append(self.parse_log(log))
         et = time.time()
@@ -83,7 +309,7 @@ class AlchemyProvider:
         logs = []
         st = time.time()
 
-        logs_provider = self._web3.eth.get_logs(filter_dict)
+        logs_provider = self._execute("eth_getLogs", lambda w3: w3.eth.get_logs(filter_dict))
         for log in logs_provider:
             logs.append(self.parse_log(log))
         et = time.time()
@@ -91,5 +317,70 @@ class AlchemyProvider:
 
         return logs
 
+    def get_transfer_logs(
+            self, contract_address: str, start_block: int, end_block: int, strategy: FetchStrategy | None = None
+    ) -> List[LogModel]:
+        """Returns the non removed Transfer logs of contract_address between start_block and end_block, both
+        included, with their block time
+
+        :param strategy: Optional. FetchStrategy making the calls, eth_getLogs by default
+        """
+        return (strategy or LogsStrategy()).fetch(self, contract_address, start_block, end_block)
+
+    def get_block_receipts(self, block_nums: Iterable[int]) -> Dict[int, List[Dict]]:
+        """Returns the raw receipts of every block with batched eth_getBlockReceipts. A batch is charged per block,
+        so it holds at most RECEIPTS_BATCH_SIZE blocks and what fits in the bucket of an endpoint"""
+        block_nums = sorted(set(block_nums))
+        batch_size = max(1, min(
+            RECEIPTS_BATCH_SIZE, int(self.compute_units_capacity // COMPUTE_UNITS["eth_getBlockReceipts"])
+        ))
+        results = self.batch_call(
+            "eth_getBlockReceipts", [[hex(block_num)] for block_num in block_nums], batch_size=batch_size
+        )
+        return {block_num: receipts or [] for block_num, receipts in zip(block_nums, results)}
+
+    def get_asset_transfers(self, contract_address: str, start_block: int, end_block: int) -> List[LogModel]:
+        """Returns the ERC20 Transfer logs of contract_address rebuilt from the alchemy_getAssetTransfers pages,
+        with the block time of their metadata"""
+        params = {
+            "fromBlock": hex(start_block),
+            "toBlock": hex(end_block),
+            "contractAddresses": [contract_address],
+            "category": ["erc20"],
+            "withMetadata": True,
+            "excludeZeroValue": False,
+            "maxCount": hex(ASSET_TRANSFERS_PAGE_SIZE),
+            "order": "asc",
+        }
+        logs = []
+        while True:
+            page = self.batch_call("alchemy_getAssetTransfers", [[params]])[0]
+            logs.extend(self.parse_asset_transfer(transfer) for transfer in page["transfers"])
+            if not page.get("pageKey"):
+                return logs
+            params = dict(params, pageKey=page["pageKey"])
+
+    def parse_asset_transfer(self, transfer: Dict) -> LogModel:
+        """Returns the Transfer LogModel of an alchemy_getAssetTransfers erc20 transfer"""
+        # uniqueId is '<tx hash>:log:<log index>'
+        log_index = transfer["uniqueId"].rpartition(":")[2]
+        return LogModel(
+            chain_id=self.chain_id,
+            block_num=int(transfer["blockNum"], 16),
+            block_hash="0x",  # Not returned
+            address=self.checksum_address(transfer["rawContract"]["address"]),
+            topic=TRANSFER_TOPIC,
+            topics=[
+                TRANSFER_TOPIC,
+                "0x" + transfer["from"][2:].lower().rjust(64, "0"),
+                "0x" + transfer["to"][2:].lower().rjust(64, "0"),
+            ],
+            data="0x" + format(int(transfer["rawContract"]["value"], 16), "064x"),
+            transaction_hash=transfer["hash"],
+            log_index=int(log_index, 16) if log_index.startswith("0x") else int(log_index),
+            deleted=False,
+            block_time=datetime.strptime(transfer["metadata"]["blockTimestamp"], "%Y-%m-%dT%H:%M:%S.%fZ"),
+        )
+
     def checksum_address(self, contract_address: str) -> str:
         return self._web3.to_checksum_address(contract_address)
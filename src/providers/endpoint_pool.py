@@ -0,0 +1,103 @@
+import logging
+import threading
+import time
+from typing import Callable, List
+
+from src.constants import ENDPOINT_COOLDOWN, ENDPOINT_WEIGHT_DEFAULT
+from .rate_limiter import TokenBucket
+
+logger = logging.getLogger()
+
+
+class Endpoint:
+    """JSON-RPC endpoint (URL + key) with its own compute unit budget"""
+
+    def __init__(self, url: str, compute_units_per_second: float, weight: int = ENDPOINT_WEIGHT_DEFAULT) -> None:
+        self.url = url
+        self.weight = weight
+        self.limiter = TokenBucket(compute_units_per_second)
+        self.client = None  # Web3 instance attached by the provider
+        self.healthy = True
+        self.failures = 0
+        self.unhealthy_until = 0.0
+        self._current_weight = 0
+
+    def __repr__(self) -> str:
+        # Never log the full url, it contains the API key
+        return f"Endpoint({self.url[:30]}..., weight={self.weight}, healthy={self.healthy})"
+
+
+def parse_endpoints(endpoints: str) -> List[tuple]:
+    """Parses a comma separated list of 'url' or 'url|weight' into [(url, weight)]"""
+    parsed = []
+    for item in endpoints.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        url, _, weight = item.partition("|")
+        parsed.append((url, int(weight) if weight else ENDPOINT_WEIGHT_DEFAULT))
+    return parsed
+
+
+class EndpointPool:
+    """Smooth weighted round-robin over endpoints, skipping the unhealthy ones until their cooldown ends"""
+
+    def __init__(self, endpoints: List[Endpoint], cooldown: float = ENDPOINT_COOLDOWN) -> None:
+        if not endpoints:
+            raise Exception("EndpointPool requires at least one endpoint")
+        self.endpoints = endpoints
+        self._cooldown = cooldown
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def next(self) -> Endpoint:
+        """Returns the next endpoint to use"""
+        with self._lock:
+            now = time.monotonic()
+            for endpoint in self.endpoints:
+                if not endpoint.healthy and now >= endpoint.unhealthy_until:
+                    # Cooldown over, give it another chance
+                    endpoint.healthy = True
+            candidates = [endpoint for endpoint in self.endpoints if endpoint.healthy]
+            if not candidates:
+                # Everything is down, use the one closest to recovery
+                return min(self.endpoints, key=lambda e: e.unhealthy_until)
+
+            total = 0
+            best = None
+            for endpoint in candidates:
+                endpoint._current_weight += endpoint.weight
+                total += endpoint.weight
+                if best is None or endpoint._current_weight > best._current_weight:
+                    best = endpoint
+            best._current_weight -= total
+            return best
+
+    def mark_success(self, endpoint: Endpoint) -> None:
+        endpoint.failures = 0
+
+    def mark_failure(self, endpoint: Endpoint) -> None:
+        """Takes the endpoint out of rotation for the cooldown period"""
+        with self._lock:
+            endpoint.failures += 1
+            endpoint.healthy = False
+            endpoint.unhealthy_until = time.monotonic() + self._cooldown * endpoint.failures
+        logger.warning(f"{endpoint} marked unhealthy. failures: {endpoint.failures}")
+
+    def health_check(self, probe: Callable[[Endpoint], object]) -> int:
+        """Runs probe(endpoint) on every endpoint, updating their health. Returns the healthy count"""
+        healthy = 0
+        for endpoint in self.endpoints:
+            try:
+                probe(endpoint)
+                with self._lock:
+                    endpoint.healthy = True
+                    endpoint.failures = 0
+                    endpoint.unhealthy_until = 0.0
+                healthy += 1
+            except Exception as e:
+                logger.warning(f"Health check failed for {endpoint}: {e}")
+                self.mark_failure(endpoint)
+        return healthy
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import logging
+import math
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from src.models import LogModel
+from src.constants import (
+    TRANSFER_TOPIC,
+    COMPUTE_UNITS,
+    RPC_BATCH_SIZE,
+    FETCH_STRATEGIES,
+    FETCH_STRATEGY_AUTO,
+    FETCH_SAMPLE_BLOCKS,
+    MAX_LOGS_PER_CALL,
+    ASSET_TRANSFERS_PAGE_SIZE,
+    RECEIPTS_BATCH_SIZE,
+    REQUEST_LATENCY,
+)
+
+if TYPE_CHECKING:
+    from .alchemy import AlchemyProvider
+
+JSONRPC_METHOD_NOT_FOUND = -32601
+
+logger = logging.getLogger()
+
+
+def _block_times_cost(density: float, blocks: int) -> Tuple[float, int]:
+    """(compute units, requests) of the eth_getBlockByNumber lookups of the blocks holding logs (Poisson)"""
+    blocks_with_logs = blocks * (1 - math.exp(-density))
+    return COMPUTE_UNITS["eth_getBlockByNumber"] * blocks_with_logs, math.ceil(blocks_with_logs / RPC_BATCH_SIZE)
+
+
+def is_unsupported_method_error(error: Exception) -> bool:
+    """Returns True if the provider does not implement the JSON-RPC method, e.g. eth_getBlockReceipts"""
+    if error.args and isinstance(error.args[0], dict):
+        rpc_error = error.args[0]
+        message = str(rpc_error.get("message", "")).lower()
+        return (
+            rpc_error.get("code") == JSONRPC_METHOD_NOT_FOUND
+            or "not supported" in message
+            or "does not exist" in message
+        )
+    return False
+
+
+class FetchStrategy(ABC):
+    """Fetches the non removed Transfer logs of a token in a block range, with their block time.
+
+    Every strategy returns the same logs; they differ in the calls they make, so in compute units and round
+    trips depending on the log density of the token.
+    """
+
+    name = ""
+    call_units = 0  # Compute units of its most expensive single call
+
+    @abstractmethod
+    def fetch(self, provider: AlchemyProvider, contract_address: str, start_block: int, end_block: int) -> List[LogModel]:
+        ...
+
+    @abstractmethod
+    def cost(self, density: float, blocks: int) -> Tuple[float, int]:
+        """Returns the estimated (compute units, requests) to fetch blocks with density logs per block"""
+
+    def estimate(self, density: float, blocks: int, compute_units_per_second: float) -> float:
+        """Returns the estimated seconds to fetch the range: compute units at the provider budget plus round trips"""
+        compute_units, requests = self.cost(density, blocks)
+        return compute_units / compute_units_per_second + requests * REQUEST_LATENCY
+
+
+class LogsStrategy(FetchStrategy):
+    """eth_getLogs filtered by address and Transfer topic. A single call for sparse tokens, whatever the range"""
+
+    name = "logs"
+    call_units = COMPUTE_UNITS["eth_getLogs"]
+
+    def fetch(self, provider: AlchemyProvider, contract_address: str, start_block: int, end_block: int) -> List[LogModel]:
+        logs = provider.get_logs_filtered({
+            "fromBlock": start_block,
+            "toBlock": end_block,
+            "address": contract_address,
+            "topics": [TRANSFER_TOPIC],
+        })
+        logs = [log for log in logs if not log.deleted]
+        provider.add_block_times(logs)
+        return logs
+
+    def cost(self, density: float, blocks: int) -> Tuple[float, int]:
+        calls = max(1, math.ceil(density * blocks / MAX_LOGS_PER_CALL))
+        compute_units, requests = _block_times_cost(density, blocks)
+        return COMPUTE_UNITS["eth_getLogs"] * calls + compute_units, calls + requests
+
+
+class ReceiptsStrategy(FetchStrategy):
+    """Batched eth_getBlockReceipts, filtered locally. Charged per block, but a round trip covers
+    RECEIPTS_BATCH_SIZE blocks whatever their logs, so it pays off for dense tokens on cheap endpoints"""
+
+    name = "receipts"
+    call_units = COMPUTE_UNITS["eth_getBlockReceipts"]
+
+    def fetch(self, provider: AlchemyProvider, contract_address: str, start_block: int, end_block: int) -> List[LogModel]:
+        address = contract_address.lower()
+        logs = []
+        for block_num, receipts in sorted(provider.get_block_receipts(range(start_block, end_block + 1)).items()):
+            for receipt in receipts:
+                for log in receipt["logs"]:
+                    if log["address"].lower() == address and log["topics"] and log["topics"][0] == TRANSFER_TOPIC:
+                        # Checksummed like the eth_getLogs logs
+                        logs.append(provider.parse_log_dict(dict(log, address=provider.checksum_address(log["address"]))))
+        logs = [log for log in logs if not log.deleted]
+        provider.add_block_times(logs)
+        return logs
+
+    def cost(self, density: float, blocks: int) -> Tuple[float, int]:
+        compute_units, requests = _block_times_cost(density, blocks)
+        return (
+            COMPUTE_UNITS["eth_getBlockReceipts"] * blocks + compute_units,
+            math.ceil(blocks / RECEIPTS_BATCH_SIZE) + requests,
+        )
+
+
+class AssetTransfersStrategy(FetchStrategy):
+    """Alchemy alchemy_getAssetTransfers pages. The transfers carry their block timestamp, so no block header
+    is fetched, which pays off for tokens with transfers in most of the blocks but not too many per block"""
+
+    name = "transfers"
+    call_units = COMPUTE_UNITS["alchemy_getAssetTransfers"]
+
+    def fetch(self, provider: AlchemyProvider, contract_address: str, start_block: int, end_block: int) -> List[LogModel]:
+        return provider.get_asset_transfers(contract_address, start_block, end_block)
+
+    def cost(self, density: float, blocks: int) -> Tuple[float, int]:
+        pages = max(1, math.ceil(density * blocks / ASSET_TRANSFERS_PAGE_SIZE))
+        return COMPUTE_UNITS["alchemy_getAssetTransfers"] * pages, pages
+
+
+class AutoFetchStrategy(FetchStrategy):
+    """Picks the cheapest strategy for each range given the log density of the token.
+
+    The density is first measured with eth_getLogs on a sample of FETCH_SAMPLE_BLOCKS blocks, then updated with
+    the logs of every range. Strategies the provider does not implement are dropped on their first failure, and
+    those whose single call does not fit in the bucket of an endpoint are skipped.
+    Keeps state, so use one instance per token.
+    """
+
+    name = FETCH_STRATEGY_AUTO
+
+    def __init__(self, candidates: List[FetchStrategy] | None = None, sample_blocks: int = FETCH_SAMPLE_BLOCKS) -> None:
+        self.candidates = candidates or [LogsStrategy(), ReceiptsStrategy(), AssetTransfersStrategy()]
+        self.sample_blocks = sample_blocks
+        self.density: float | None = None  # Logs per block of the last range
+        self.ranges: Dict[str, int] = {}  # Ranges fetched per strategy
+        self._fallback = LogsStrategy()
+        self._current = None
+
+    def fetch(self, provider: AlchemyProvider, contract_address: str, start_block: int, end_block: int) -> List[LogModel]:
+        logs = []
+        if self.density is None:
+            sample_end = min(end_block, start_block + self.sample_blocks - 1)
+            logs = self._fallback.fetch(provider, contract_address, start_block, sample_end)
+            self.density = len(logs) / (sample_end - start_block + 1)
+            logger.info(f"Sampled {len(logs)} logs in {sample_end - start_block + 1} blocks. density: {self.density:.3f} logs/block")
+            start_block = sample_end + 1
+            if start_block > end_block:
+                return logs
+
+        strategy = self.choose(
+            end_block - start_block + 1, provider.compute_units_per_second, provider.compute_units_capacity
+        )
+        try:
+            fetched = strategy.fetch(provider, contract_address, start_block, end_block)
+        except Exception as e:
+            if strategy is self._fallback or not is_unsupported_method_error(e):
+                raise
+            logger.warning(f"Fetch strategy '{strategy.name}' is not supported by the provider: {e}")
+            self.candidates = [candidate for candidate in self.candidates if candidate is not strategy]
+            strategy = self._fallback
+            fetched = strategy.fetch(provider, contract_address, start_block, end_block)
+
+        self.density = len(fetched) / (end_block - start_block + 1)
+        self.ranges[strategy.name] = self.ranges.get(strategy.name, 0) + 1
+        return logs + fetched
+
+    def choose(
+            self, blocks: int, compute_units_per_second: float, compute_units_capacity: float = math.inf
+    ) -> FetchStrategy:
+        """Returns the candidate with the lowest estimate for blocks at the current density, among those whose
+        single call fits in compute_units_capacity, the bucket of an endpoint"""
+        candidates = [candidate for candidate in self.candidates if candidate.call_units <= compute_units_capacity]
+        strategy = min(
+            candidates or [self._fallback],
+            key=lambda candidate: candidate.estimate(self.density, blocks, compute_units_per_second),
+        )
+        if strategy is not self._current:
+            logger.info(f"Fetch strategy '{strategy.name}' for density {self.density:.3f} logs/block")
+            self._current = strategy
+        return strategy
+
+    def cost(self, density: float, blocks: int) -> Tuple[float, int]:
+        return min((candidate.cost(density, blocks) for candidate in self.candidates), key=lambda cost: cost[0])
+
+
+STRATEGIES = {
+    LogsStrategy.name: LogsStrategy,
+    ReceiptsStrategy.name: ReceiptsStrategy,
+    AssetTransfersStrategy.name: AssetTransfersStrategy,
+    AutoFetchStrategy.name: AutoFetchStrategy,
+}
+
+
+def get_fetch_strategy(name: str) -> FetchStrategy:
+    """Returns a new strategy of name: one of FETCH_STRATEGIES or FETCH_STRATEGY_AUTO"""
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown fetch strategy '{name}', expected one of {FETCH_STRATEGIES + (FETCH_STRATEGY_AUTO,)}")
+    return STRATEGIES[name]()
@@ -0,0 +1,77 @@
+import threading
+import time
+
+from requests.exceptions import HTTPError
+
+from src.constants import RATE_LIMIT_STATUS
+
+
+class RateLimitException(Exception):
+    """Raised when the provider keeps throttling a call after all the retries"""
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Returns True if the exception comes from a provider throttling response (HTTP 429 or JSON-RPC 429)"""
+    if isinstance(error, RateLimitException):
+        return True
+    if isinstance(error, HTTPError) and error.response is not None:
+        return error.response.status_code == RATE_LIMIT_STATUS
+    # web3 raises ValueError(rpc_error_dict) for JSON-RPC errors
+    if error.args and isinstance(error.args[0], dict):
+        rpc_error = error.args[0]
+        if rpc_error.get("code") == RATE_LIMIT_STATUS:
+            return True
+        return "compute units" in str(rpc_error.get("message", "")).lower()
+    return False
+
+
+class TokenBucket:
+    """Thread safe token bucket. Tokens model the compute units available per second.
+
+    A cost above the capacity is taken from a full bucket, which goes negative: the next acquire waits until the
+    debt is paid off, so the average rate holds whatever the cost of each call
+    """
+
+    def __init__(self, rate: float, capacity: float = None) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, cost: float) -> float:
+        """Takes cost tokens if available, or a full bucket if cost is above the capacity. Returns 0 on success
+        or the seconds to wait otherwise"""
+        needed = min(cost, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            if self._tokens >= needed:
+                self._tokens -= cost
+                return 0.0
+            return (needed - self._tokens) / self.rate
+
+    def acquire(self, cost: float) -> float:
+        """Blocks until cost tokens are available. Returns the seconds waited"""
+        waited = 0.0
+        wait = self.try_acquire(cost)
+        while wait > 0:
+            time.sleep(wait)
+            waited += wait
+            wait = self.try_acquire(cost)
+        return waited
+
+    def pause(self, seconds: float) -> None:
+        """Stops handing out tokens for the given seconds and empties the bucket, e.g. after a 429"""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = min(self._tokens, 0.0)  # Keeps the debt
+            self._last = self._paused_until
@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Set, Any
+
+from aiohttp import web, WSMsgType
+
+from src.utils.abi_utils import encode_abi_string
+from src.utils.multicall import decode_aggregate3_calls, encode_aggregate3_results
+from src.constants import (
+    TRANSFER_TOPIC,
+    DECIMALS_DEFAULT,
+    MULTICALL3_ADDRESS,
+    AGGREGATE3_SELECTOR,
+    DECIMALS_SELECTOR,
+    SYMBOL_SELECTOR,
+    NAME_SELECTOR,
+)
+
+STAND_IN_CHAIN_ID = 1337
+STAND_IN_START_BLOCK = 1000000
+RETAINED_BLOCKS = 10000  # Blocks kept for eth_getLogs and eth_getBlockByNumber
+MAX_LOGS_PER_REQUEST = 10000  # eth_getLogs results above this fail, like Alchemy
+TRANSFER_VALUE_MAX = 10**24
+JSONRPC_METHOD_NOT_FOUND = -32601
+JSONRPC_LIMIT_EXCEEDED = -32005
+JSONRPC_EXECUTION_REVERTED = 3
+
+logger = logging.getLogger()
+
+
+class StandInNode:
+    """Local stand-in of the JSON-RPC node (HTTP and websocket on the same port) with synthetic ERC20 Transfers.
+
+    Blocks are mined every block_interval with transfers_per_second random Transfers of the tokens on average.
+    Supports eth_blockNumber, eth_chainId, eth_getLogs, eth_getBlockByNumber,
+    eth_getBlockReceipts, alchemy_getAssetTransfers (erc20), eth_call of the tokens decimals(), symbol() and
+    name(), also through Multicall3 aggregate3, and eth_subscribe/eth_unsubscribe 'logs'. Every reorg_every blocks the head is replaced: its logs are notified
+    again with removed=True, then the logs of the new head. Only the last retained_blocks are kept.
+
+    emitted maps the tx_hash of every log notified to the perf_counter time it was sent, so a caller running
+    in the same process can measure the notification to commit latency.
+    """
+
+    def __init__(
+            self,
+            tokens: List[str],
+            transfers_per_second: float,
+            block_interval: float = 1.0,
+            reorg_every: int = 0,
+            wallets: int = 1000,
+            history_blocks: int = 0,
+            decimals: int = DECIMALS_DEFAULT,
+            chain_id: int = STAND_IN_CHAIN_ID,
+            start_block: int = STAND_IN_START_BLOCK,
+            retained_blocks: int = RETAINED_BLOCKS,
+            seed: int = 0,
+    ) -> None:
+        """
+        :param tokens: token addresses emitting the Transfers
+        :param transfers_per_second: average Transfers per second, of all the tokens
+        :param block_interval: Optional. seconds between blocks
+        :param reorg_every: Optional. blocks between head reorgs, 0 to disable them
+        :param wallets: Optional. distinct senders and receivers
+        :param history_blocks: Optional. blocks mined up front, served by the JSON-RPC methods, not notified
+        :param decimals: Optional. decimals() of every token
+        :param retained_blocks: Optional. blocks kept in memory
+        """
+        self.tokens = [token.lower() for token in tokens]
+        self.transfers_per_second = transfers_per_second
+        self.block_interval = block_interval
+        self.reorg_every = reorg_every
+        self.decimals = decimals
+        self.chain_id = chain_id
+        self.retained_blocks = retained_blocks
+        self._rng = random.Random(seed)
+        self._wallets = ["0x" + format(i, "064x") for i in range(1, wallets + 1)]  # As topics
+        self._blocks: OrderedDict[int, Dict] = OrderedDict()
+        self._head = start_block - 1
+        self._pending_transfers = 0.0
+        self._tx_count = 0
+        self._subscription_count = 0
+        self._subscriptions: Dict[str, tuple] = {}  # subscription id -> (ws, addresses, topics)
+        self.subscribed = asyncio.Event()
+        self.emitted: Dict[str, float] = {}
+        self.notified = 0
+        self.removed = 0
+
+        start_time = int(time.time() - history_blocks * block_interval)
+        for i in range(history_blocks):
+            self._add_block(self._new_block(self._head + 1, start_time + int(i * block_interval), self._next_count()))
+
+    @property
+    def head(self) -> int:
+        return self._head
+
+    @property
+    def first_block(self) -> int:
+        """First block still retained, head + 1 if none was mined"""
+        return next(iter(self._blocks), self._head + 1)
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.post("/", self.handle_http),
+            web.get("/", self.handle_websocket),
+        ])
+        return app
+
+    async def produce(self, duration: float | None = None) -> None:
+        """Mines a block every block_interval, for duration seconds or until cancelled"""
+        started = time.perf_counter()
+        mined = 0
+        while duration is None or time.perf_counter() - started < duration:
+            await self.mine_block()
+            mined += 1
+            if self.reorg_every and mined % self.reorg_every == 0:
+                await self.reorg()
+            # Absolute schedule, so slow notifications don't lower the rate
+            await asyncio.sleep(max(0.0, started + mined * self.block_interval - time.perf_counter()))
+
+    async def mine_block(self) -> Dict:
+        """Mines the next block and notifies its logs"""
+        block = self._new_block(self._head + 1, int(time.time()), self._next_count())
+        self._add_block(block)
+        await self._notify(block["logs"])
+        return block
+
+    async def reorg(self) -> Dict:
+        """Replaces the head block: notifies its logs as removed, then the logs of the new block"""
+        orphan = self._blocks.pop(self._head)
+        self._head -= 1
+        await self._notify([dict(log, removed=True) for log in orphan["logs"]])
+        self.removed += len(orphan["logs"])
+        block = self._new_block(orphan["number"], orphan["timestamp"], len(orphan["logs"]))
+        self._add_block(block)
+        await self._notify(block["logs"])
+        return block
+
+    def _next_count(self) -> int:
+        """Returns the Transfers of the next block, carrying the fractions so the average rate is exact"""
+        self._pending_transfers += self.transfers_per_second * self.block_interval
+        count = int(self._pending_transfers)
+        self._pending_transfers -= count
+        return count
+
+    def _new_block(self, block_num: int, timestamp: int, count: int) -> Dict:
+        block_hash = "0x" + format(self._rng.getrandbits(256), "064x")
+        logs = []
+        for log_index in range(count):
+            self._tx_count += 1
+            token = self._rng.choice(self.tokens)
+            topics = [TRANSFER_TOPIC, self._rng.choice(self._wallets), self._rng.choice(self._wallets)]
+            logs.append({
+                "address": token,
+                "blockHash": block_hash,
+                "blockNumber": hex(block_num),
+                "data": "0x" + format(self._rng.randint(1, TRANSFER_VALUE_MAX), "064x"),
+                "logIndex": hex(log_index),
+                "removed": False,
+                "topics": topics,
+                "transactionHash": "0x" + format(self._tx_count, "064x"),
+                "transactionIndex": hex(log_index),
+            })
+
+        return {
+            "number": block_num,
+            "hash": block_hash,
+            "timestamp": timestamp,
+            "logs": logs,
+        }
+
+    def _add_block(self, block: Dict) -> None:
+        self._blocks[block["number"]] = block
+        self._head = block["number"]
+        while len(self._blocks) > self.retained_blocks:
+            self._blocks.popitem(last=False)
+
+    async def _notify(self, logs: List[Dict]) -> None:
+        for subscription_id, (ws, addresses, topics) in list(self._subscriptions.items()):
+            for log in logs:
+                if not self._log_matches(log, addresses, topics):
+                    continue
+                if not log["removed"]:
+                    self.emitted[log["transactionHash"]] = time.perf_counter()
+                try:
+                    await ws.send_str(json.dumps({
+                        "jsonrpc": "2.0",
+                        "method": "eth_subscription",
+                        "params": {"subscription": subscription_id, "result": log},
+                    }))
+                except ConnectionResetError:
+                    self._subscriptions.pop(subscription_id, None)
+                    break
+                self.notified += 1
+
+    @staticmethod
+    def _log_matches(log: Dict, addresses: Set[str] | None, topics: List[Set[str] | None]) -> bool:
+        if addresses is not None and log["address"] not in addresses:
+            return False
+        for i, accepted in enumerate(topics):
+            if accepted is not None and (i >= len(log["topics"]) or log["topics"][i] not in accepted):
+                return False
+        return True
+
+    @staticmethod
+    def _parse_filter(filter_dict: Dict) -> tuple:
+        """Returns the (addresses, topics) of an eth_getLogs or eth_subscribe filter, as lowercase sets.
+        None matches anything"""
+
+        def accepted(values: Any) -> Set[str] | None:
+            if values is None:
+                return None
+            return {value.lower() for value in (values if isinstance(values, list) else [values])}
+
+        return accepted(filter_dict.get("address")), [accepted(topic) for topic in filter_dict.get("topics") or []]
+
+    def _block_param(self, block: Any) -> int:
+        if block is None or block in ("latest", "safe", "finalized", "pending"):
+            return self._head
+        if block == "earliest":
+            return 0
+        return int(block, 16) if isinstance(block, str) else int(block)
+
+    def call(self, method: str, params: List) -> Any:
+        """Returns the result of a JSON-RPC method. Raises ValueError(rpc error dict) if it fails"""
+        if method == "eth_blockNumber":
+            return hex(self._head)
+        if method == "eth_chainId":
+            return hex(self.chain_id)
+        if method == "eth_getBlockByNumber":
+            block = self._blocks.get(self._block_param(params[0]))
+            if block is None:
+                return None
+            return {
+                "number": hex(block["number"]),
+                "hash": block["hash"],
+                "timestamp": hex(block["timestamp"]),
+            }
+        if method == "eth_getLogs":
+            return self._get_logs(params[0])
+        if method == "eth_getBlockReceipts":
+            block = self._blocks.get(self._block_param(params[0]))
+            if block is None:
+                return None
+            return [
+                {
+                    "transactionHash": log["transactionHash"],
+                    "transactionIndex": log["transactionIndex"],
+                    "blockHash": log["blockHash"],
+                    "blockNumber": log["blockNumber"],
+                    "status": "0x1",
+                    "logs": [log],
+                }
+                for log in block["logs"]
+            ]
+        if method == "alchemy_getAssetTransfers":
+            return self._get_asset_transfers(params[0])
+        if method == "eth_call":
+            return self._eth_call(params[0])
+        raise ValueError({"code": JSONRPC_METHOD_NOT_FOUND, "message": f"the method {method} does not exist"})
+
+    def _get_logs(self, filter_dict: Dict, limit: int | None = MAX_LOGS_PER_REQUEST) -> List[Dict]:
+        from_block = self._block_param(filter_dict.get("fromBlock"))
+        to_block = self._block_param(filter_dict.get("toBlock"))
+        addresses, topics = self._parse_filter(filter_dict)
+        logs = []
+        for block_num in range(max(from_block, self._head - len(self._blocks) + 1), min(to_block, self._head) + 1):
+            block = self._blocks.get(block_num)
+            if block is None:
+                continue
+            logs.extend(log for log in block["logs"] if self._log_matches(log, addresses, topics))
+            if limit is not None and len(logs) > limit:
+                raise ValueError({
+                    "code": JSONRPC_LIMIT_EXCEEDED,
+                    "message": f"Log response size exceeded. You can make eth_getLogs requests with up to a "
+                               f"{limit} results",
+                })
+        return logs
+
+    def _get_asset_transfers(self, params: Dict) -> Dict:
+        """alchemy_getAssetTransfers of the erc20 category, pageKey is the offset of the page"""
+        logs = self._get_logs({
+            "fromBlock": params.get("fromBlock", "0x0"),
+            "toBlock": params.get("toBlock"),
+            "address": params.get("contractAddresses"),
+            "topics": [TRANSFER_TOPIC],
+        }, limit=None)
+        if params.get("excludeZeroValue", True):
+            logs = [log for log in logs if int(log["data"], 16)]
+        offset = int(params.get("pageKey", 0))
+        page_size = int(params.get("maxCount", hex(1000)), 16)
+        transfers = []
+        for log in logs[offset: offset + page_size]:
+            block = self._blocks[int(log["blockNumber"], 16)]
+            transfers.append({
+                "blockNum": log["blockNumber"],
+                "uniqueId": f"{log['transactionHash']}:log:{int(log['logIndex'], 16)}",
+                "hash": log["transactionHash"],
+                "from": "0x" + log["topics"][1][26:],
+                "to": "0x" + log["topics"][2][26:],
+                "asset": f"TKN{self.tokens.index(log['address'])}",
+                "category": "erc20",
+                "rawContract": {"value": hex(int(log["data"], 16)), "address": log["address"], "decimal": hex(self.decimals)},
+                "metadata": {
+                    "blockTimestamp": datetime.utcfromtimestamp(block["timestamp"]).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                },
+            })
+        page = {"transfers": transfers}
+        if offset + page_size < len(logs):
+            page["pageKey"] = str(offset + page_size)
+        return page
+
+    def _eth_call(self, tx: Dict) -> str:
+        to = tx["to"].lower()
+        data = bytes.fromhex((tx.get("data") or tx.get("input") or "0x")[2:])
+        if to == MULTICALL3_ADDRESS.lower() and data[:4] == bytes.fromhex(AGGREGATE3_SELECTOR[2:]):
+            results = [
+                self._token_call("0x" + target.hex(), call_data) for target, call_data in decode_aggregate3_calls(data)
+            ]
+            return "0x" + encode_aggregate3_results(results).hex()
+
+        success, result = self._token_call(to, data)
+        if not success:
+            raise ValueError({"code": JSONRPC_EXECUTION_REVERTED, "message": "execution reverted"})
+        return "0x" + result.hex()
+
+    def _token_call(self, token: str, call_data: bytes) -> tuple:
+        """Returns the (success, return data) of a view call to a token of the node"""
+        if token not in self.tokens:
+            return False, b""
+        selector = "0x" + call_data[:4].hex()
+        index = self.tokens.index(token)
+        if selector == DECIMALS_SELECTOR:
+            return True, self.decimals.to_bytes(32, "big")
+        if selector == SYMBOL_SELECTOR:
+            return True, encode_abi_string(f"TKN{index}")
+        if selector == NAME_SELECTOR:
+            return True, encode_abi_string(f"Stand-in Token {index}")
+        return False, b""
+
+    def _response(self, request: Dict) -> Dict:
+        try:
+            result = self.call(request["method"], request.get("params", []))
+            return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+        except ValueError as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": e.args[0]}
+
+    async def handle_http(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        if isinstance(payload, list):
+            return web.json_response([self._response(item) for item in payload])
+        return web.json_response(self._response(payload))
+
+    async def handle_websocket(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscription_ids = []
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                payload = json.loads(message.data)
+                method = payload.get("method")
+                params = payload.get("params", [])
+                if method == "eth_subscribe" and params and params[0] == "logs":
+                    self._subscription_count += 1
+                    subscription_id = hex(self._subscription_count)
+                    addresses, topics = self._parse_filter(params[1] if len(params) > 1 else {})
+                    self._subscriptions[subscription_id] = (ws, addresses, topics)
+                    subscription_ids.append(subscription_id)
+                    await ws.send_json({"jsonrpc": "2.0", "id": payload.get("id"), "result": subscription_id})
+                    self.subscribed.set()
+                elif method == "eth_unsubscribe":
+                    found = self._subscriptions.pop(params[0], None) is not None
+                    await ws.send_json({"jsonrpc": "2.0", "id": payload.get("id"), "result": found})
+                else:
+                    await ws.send_json(self._response(payload))
+        finally:
+            for subscription_id in subscription_ids:
+                self._subscriptions.pop(subscription_id, None)
+        return ws
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 0) -> web.AppRunner:
+        """Starts serving in the running loop. Returns the runner; the bound port is in runner.addresses"""
+        runner = web.AppRunner(self.build_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Stand-in node listening on {runner.addresses}")
+        return runner
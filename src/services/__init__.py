@@ -1,2 +1,7 @@
 from .backfill_service import BackfillService
 from .indexer_service import IndexerService
+from .export_service import ExportService
+from .reconcile_service import ReconcileService
+from .multi_chain_service import MultiChainService
+from .token_metadata_service import TokenMetadataService
+from .retention_service import RetentionService
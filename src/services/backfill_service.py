@@ -1,14 +1,17 @@
 from __future__ import annotations
 import logging
 import time
-from typing import List, Tuple, Dict, Any
-import pandas as pd
+from decimal import Decimal
+from typing import List, Tuple, Dict, Any, Iterator, Callable
 
-import src.db as db
-from src.providers import AlchemyProvider
+from src.db import Storage, PostgresStorage
+from src.providers import AlchemyProvider, RateLimitException, AutoFetchStrategy, get_fetch_strategy
 from src.parsers import TokenParser
-from src.models import TransferModel, LogModel, BalanceModel
-from src.constants import TRANSFER_TOPIC, NULL_ADDRESS
+from src.models import TransferModel, LogModel, BalanceModel, TokenStatsModel
+from src.utils.holder_stats import holder_buckets
+from src.utils.pipeline import Pipeline
+from src.constants import TRANSFER_TOPIC, NULL_ADDRESS, FETCH_STRATEGY_DEFAULT
+from .token_metadata_service import TokenMetadataService
 
 DEFAULT_CHUNK_SIZE = 2000
 CHUNK_INCREASE = 1.5
@@ -18,6 +21,7 @@ MAX_CHUNK = 50000
 RETRIES_NUM = 7
 RETRY_DELAY = 1
 LOGS_DECREASE_THRESHHOLD = 5000  # Number of logs to trigger chunk decrease
+PIPELINE_QUEUE_SIZE = 4  # Chunks buffered between two backfill stages
 
 logger = logging.getLogger()
 
@@ -25,52 +29,104 @@ logger = logging.getLogger()
 class BackfillService:
     """Backfill Service Class for past indexing"""
 
-    def __init__(self, chain_id: int, provider: AlchemyProvider) -> None:
+    def __init__(
+            self,
+            chain_id: int,
+            provider: AlchemyProvider,
+            storage: Storage | None = None,
+            fetch_strategy: str = FETCH_STRATEGY_DEFAULT,
+    ) -> None:
+        """
+        :param storage: Optional. where transfers and balances are written, Postgres by default
+        :param fetch_strategy: Optional. 'logs', 'receipts', 'transfers' or 'auto', see get_fetch_strategy
+        """
         self.chain_id = chain_id
         self._provider = provider
-        self._parser = TokenParser()
+        self._storage = storage or PostgresStorage()
+        self._metadata = TokenMetadataService(chain_id, provider, self._storage)
+        self._parser = TokenParser(decimals=self._metadata.decimals)
+        self._fetch_strategy_name = fetch_strategy
+        self._fetch_strategy = get_fetch_strategy(fetch_strategy)
 
-    def backfill(self, contract_address: str, start_block: int, end_block: int) -> None:
-        """Backfills the contract_address"""
+    def backfill(
+            self, contract_address: str, start_block: int, end_block: int, on_chunk: Callable[[], None] | None = None
+    ) -> None:
+        """Backfills the contract_address
+
+        :param on_chunk: Optional. called after each chunk is written, e.g. SamplingProfiler.chunk_done
+        """
+        # Its previous transfers and balances are replaced, whatever their units
+        metadata = self._metadata.resolve([contract_address], reindex=True)[contract_address.lower()]
+        logger.info(f"Token {metadata.symbol} ({metadata.name}), {metadata.decimals} decimals")
+        # The auto strategy measures the density of this token from scratch
+        self._fetch_strategy = get_fetch_strategy(self._fetch_strategy_name)
         self._truncate_contract(contract_address)
-        transfers = self._progressive_backfill(contract_address, start_block, end_block)
+        transfers = self._progressive_backfill(contract_address, start_block, end_block, on_chunk=on_chunk)
+        if isinstance(self._fetch_strategy, AutoFetchStrategy):
+            logger.info(f"Ranges per fetch strategy: {self._fetch_strategy.ranges}")
         balances = self._compute_balances(transfers)
-        db.insert_balances(self.chain_id, balances)
+        self._storage.insert_balances(self.chain_id, balances)
+        self._storage.insert_token_stats(self._compute_token_stats(contract_address, transfers, balances))
+        self._storage.set_last_indexed_block(self.chain_id, contract_address, end_block)
 
     def _truncate_contract(self, contract_address: str) -> None:
-        db.delete_token_balances(self.chain_id, token_address=contract_address)
-        db.delete_token_transfers(self.chain_id, token_address=contract_address)
+        self._storage.delete_token_balances(self.chain_id, token_address=contract_address)
+        self._storage.delete_token_transfers(self.chain_id, token_address=contract_address)
+        self._storage.delete_token_stats(self.chain_id, token_address=contract_address)
+        self._storage.delete_transfer_rollups(self.chain_id, token_address=contract_address)
 
     def _progressive_backfill(
-            self, contract_address: str, start_block: int, end_block: int, start_chunk_size: int = DEFAULT_CHUNK_SIZE
+            self,
+            contract_address: str,
+            start_block: int,
+            end_block: int,
+            start_chunk_size: int = DEFAULT_CHUNK_SIZE,
+            on_chunk: Callable[[], None] | None = None,
     ) -> List[TransferModel]:
         """Backfills progressively in order to throatle get_logs calls. for eth_logs method to be called safely,
-        block_range must be under 2k or number of return logs must be under 10k"""
-        current_block = start_block
+        block_range must be under 2k or number of return logs must be under 10k.
 
-        chunk_size = start_chunk_size
+        Runs as a pipeline: fetch (RPC) -> decode (CPU) -> write (DB), each stage in its own thread connected by
+        bounded queues, so the DB commit of chunk N overlaps with the fetch of chunk N+1. The time each stage
+        is busy, idle or blocked is logged at the end to show which one limits the throughput."""
         accum_transfers = []
-        all_processed = 0
+
+        def write(transfers: List[TransferModel]) -> None:
+            self._storage.insert_transfers(transfers)
+            self._storage.apply_transfer_rollups(self.chain_id, contract_address, transfers)
+            accum_transfers.extend(transfers)
+            logger.info(f"Stats. Events found: {len(transfers)}. Accum. events: {len(accum_transfers)}")
+            if on_chunk:
+                on_chunk()
+
+        pipeline = Pipeline(
+            source=self._fetch_chunks(contract_address, start_block, end_block, start_chunk_size),
+            stages=[("decode", self._decode_logs), ("write", write)],
+            queue_size=PIPELINE_QUEUE_SIZE,
+        )
+        for stage_stats in pipeline.run():
+            logger.info(stage_stats.report())
+
+        return accum_transfers
+
+    def _fetch_chunks(
+            self, contract_address: str, start_block: int, end_block: int, chunk_size: int
+    ) -> Iterator[List[LogModel]]:
+        """Yields the logs of consecutive block ranges, adapting the range size to the logs density"""
+        current_block = start_block
 
         while current_block <= end_block:
             estimated_end_block = min(current_block + chunk_size - 1, end_block)
             logger.info(f"Scanning blocks: {current_block} - {estimated_end_block}. chunk size: {chunk_size}")
-            actual_end_block, transfers = self._get_transfers(contract_address, current_block, estimated_end_block)
-            db.insert_transfers(transfers)
-
-            accum_transfers.extend(transfers)
-            current_end = actual_end_block
-            all_processed += len(transfers)
-
-            logger.info(f"Stats. Events found: {len(transfers)}. Accum. events: {all_processed}")
-            chunk_size = self._estimate_next_chunk_size(chunk_size, len(transfers))
+            actual_end_block, logs = self._fetch_logs(contract_address, current_block, estimated_end_block)
+            yield logs
 
+            chunk_size = self._estimate_next_chunk_size(chunk_size, len(logs))
             # Set where the next chunk starts
-            current_block = current_end + 1
+            current_block = actual_end_block + 1
 
-        return accum_transfers
-
-    def _get_transfers(self, contract_address: str, start_block: int, end_block: int) -> Tuple[int,List[TransferModel]]:
+    def _fetch_logs(self, contract_address: str, start_block: int, end_block: int) -> Tuple[int, List[LogModel]]:
+        """Returns the actual end block and the non removed Transfer logs, with their block time"""
         filter_dict = {
             "fromBlock": start_block,
             "toBlock": end_block,
@@ -78,14 +134,18 @@ class BackfillService:
             "topics": [TRANSFER_TOPIC],
         }
         end_block, logs = self._retry_web3_call(
-            func=self._provider.get_logs_filtered,
+            func=lambda params: self._provider.get_transfer_logs(
+                params["address"], params["fromBlock"], params["toBlock"], self._fetch_strategy
+            ),
             filter_params=filter_dict,
             retries=RETRIES_NUM,
             delay=RETRY_DELAY
         )
-        transfers = [self._parser.decode_log(log) for log in logs if not log.deleted]
 
-        return end_block, transfers
+        return end_block, logs
+
+    def _decode_logs(self, logs: List[LogModel]) -> List[TransferModel]:
+        return [self._parser.decode_log(log) for log in logs]
 
     def _compute_balances(self, transfers: List[TransferModel]) -> List[BalanceModel]:
         """Returns a list of Balances given a list of Transfers
@@ -95,6 +155,7 @@ class BackfillService:
         """
         if not len(transfers):
             return []
+        import pandas as pd  # Heavy import, only needed for the final aggregation
 
         balance_list = []
 
@@ -121,6 +182,24 @@ class BackfillService:
 
         return balance_list
 
+    def _compute_token_stats(
+            self, contract_address: str, transfers: List[TransferModel], balances: List[BalanceModel]
+    ) -> TokenStatsModel:
+        """Returns the holder stats given the full list of Transfers and the resulting Balances"""
+        minted = sum((transfer.value for transfer in transfers if transfer.tx_from == NULL_ADDRESS), Decimal(0))
+        burned = sum((transfer.value for transfer in transfers if transfer.tx_to == NULL_ADDRESS), Decimal(0))
+        holder_count, buckets = holder_buckets(balance.balance for balance in balances)
+
+        return TokenStatsModel(
+            chain_id=self.chain_id,
+            token_address=contract_address,
+            holder_count=holder_count,
+            total_supply=minted - burned,
+            total_minted=minted,
+            total_burned=burned,
+            buckets=buckets,
+        )
+
     def _pandas_balance_row_to_model(self, row: List[Any]) -> BalanceModel | None:
         """Returns the TransferModel given a pd row
         :param row: Pandas numpy array
@@ -157,6 +236,13 @@ class BackfillService:
             try:
                 filter_params["toBlock"] = end_block
                 return end_block, func(filter_params)
+            except RateLimitException as e:
+                # Throttling is not a sign of a too large range, retry the same range
+                if i < retries - 1:
+                    logger.warning("Rate limited for block range %d - %d: %s, retrying in %s seconds", start_block, end_block, e, delay)
+                    time.sleep(delay)
+                    continue
+                raise
             except Exception as e:
                 if i < retries - 1:
                     logger.warning(
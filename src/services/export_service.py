@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import List
+
+import src.db as db
+from src.utils.export_writers import WRITERS
+from src.constants import EXPORT_CHUNK_SIZE, EXPORT_ROWS_PER_FILE
+
+logger = logging.getLogger()
+
+EXPORT_TABLES = ["transfers", "balances"]
+
+
+class ExportService:
+    """Export Service Class streaming transfers and balances to chunked Parquet or CSV files"""
+
+    def __init__(self, chain_id: int) -> None:
+        self.chain_id = chain_id
+
+    def export(
+            self,
+            table: str,
+            token_address: str,
+            output_dir: str,
+            file_format: str = "parquet",
+            from_block: int | None = None,
+            to_block: int | None = None,
+            chunk_size: int = EXPORT_CHUNK_SIZE,
+            rows_per_file: int = EXPORT_ROWS_PER_FILE,
+    ) -> List[str]:
+        """Exports the table rows of token_address. Returns the written files
+
+        :param table: 'transfers' or 'balances'
+        :param token_address: Token Address
+        :param output_dir: directory of the files
+        :param file_format: 'parquet' or 'csv'
+        :param from_block: Optional. first block of the transfers, inclusive
+        :param to_block: Optional. last block of the transfers, inclusive
+        :param chunk_size: rows fetched from the server-side cursor per round trip
+        :param rows_per_file: max rows per file
+        """
+        if file_format not in WRITERS:
+            raise Exception(f"Unsupported format {file_format}")
+        if table == "transfers":
+            columns = db.TRANSFER_EXPORT_COLUMNS
+            chunks = db.stream_token_transfers(self.chain_id, token_address, from_block, to_block, chunk_size)
+        elif table == "balances":
+            if from_block is not None or to_block is not None:
+                raise Exception("Block range filters only apply to transfers")
+            columns = db.BALANCE_EXPORT_COLUMNS
+            chunks = db.stream_token_balances(self.chain_id, token_address, chunk_size)
+        else:
+            raise Exception(f"Unsupported table {table}")
+
+        prefix = f"{table}_{self.chain_id}_{token_address.lower()}"
+        writer = WRITERS[file_format](output_dir, prefix, columns, rows_per_file)
+        st = time.time()
+        try:
+            for rows in chunks:
+                writer.write(rows)
+                logger.info(f"Exported {writer.rows} {table} rows. {writer.rows / (time.time() - st):.0f} rows/s")
+        finally:
+            files = writer.close()
+
+        logger.info(f"Export done: {writer.rows} rows in {len(files)} files, {time.time() - st:.1f} seconds")
+        return files
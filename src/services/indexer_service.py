@@ -1,14 +1,23 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import json
-from typing import List, Tuple, Dict, Any
+import math
+from concurrent.futures import Executor
+from typing import List, Tuple, Dict, Any, Callable
 from websockets import connect
 
-import src.db as db
+from src.db import Storage, PostgresStorage
 from src.providers import AlchemyProvider
 from src.parsers import TokenParser
-from src.constants import TRANSFER_TOPIC, NULL_ADDRESS
+from src.models import TransferModel, LogModel
+from src.constants import TRANSFER_TOPIC, MAX_LOGS_PER_CALL
+from .token_metadata_service import TokenMetadataService
+
+CATCH_UP_BATCH = 1000  # Blocks caught up per window, the last indexed block is recorded after each
+LIVE_BATCH_SIZE = 500  # Max subscription logs applied at once when the database falls behind
+LIVE_QUEUE_SIZE = 10000  # Subscription logs buffered before the websocket stops being read
 
 logger = logging.getLogger()
 
@@ -16,12 +25,48 @@ logger = logging.getLogger()
 class IndexerService:
     """Indexer Service Class for real-time indexing"""
 
-    def __init__(self, chain_id: int, provider: AlchemyProvider) -> None:
+    def __init__(
+            self,
+            chain_id: int,
+            provider: AlchemyProvider,
+            storage: Storage | None = None,
+            on_commit: Callable[[List[TransferModel]], None] | None = None,
+    ) -> None:
+        """
+        :param storage: Optional. where transfers and balances are written, Postgres by default
+        :param on_commit: Optional. called with each batch of transfers once committed, e.g. by the load test
+        """
         self.chain_id = chain_id
         self._provider = provider
-        self._parser = TokenParser()
+        self._storage = storage or PostgresStorage()
+        # Resolved on the first transfer of each token
+        self._metadata = TokenMetadataService(chain_id, provider, self._storage)
+        self._parser = TokenParser(decimals=self._metadata.decimals)
+        self._on_commit = on_commit
 
     async def start(self, contract_address: str) -> None:
+        await self.follow([contract_address])
+
+    async def follow(
+            self,
+            contract_addresses: List[str],
+            max_concurrency: int = 1,
+            catch_up_executor: Executor | None = None,
+    ) -> None:
+        """Indexes the new Transfers of several tokens from a single logs subscription.
+
+        Once the subscription is confirmed, the tokens already indexed are caught up to the head, so the blocks
+        mined since their last catch-up are not lost; the subscription logs of those blocks are dropped.
+        Messages are queued as they arrive, up to LIVE_QUEUE_SIZE, and applied in batches, grouped by token, in
+        the default executor. Up to max_concurrency tokens are written in parallel; the batches of a token stay in
+        order. The event loop is never blocked by the database, so several chains can be followed in the same
+        process.
+
+        :param contract_addresses: tokens to index
+        :param max_concurrency: Optional. tokens of the chain written at the same time
+        :param catch_up_executor: Optional. executor of the catch-up to the head, the default executor otherwise
+        :return : None
+        """
         subscription = {
             "jsonrpc": "2.0",
             "id": self.chain_id,
@@ -29,26 +74,138 @@ class IndexerService:
             "params": [
                 "logs",
                 {
-                    "address": contract_address,
+                    "address": contract_addresses,
                     "topics": [TRANSFER_TOPIC]
                 }
             ]
         }
+        queue = asyncio.Queue(maxsize=LIVE_QUEUE_SIZE)
         async with self._get_connection() as ws:
             await ws.send(json.dumps(subscription))
             subs_resp = await ws.recv()
-            while True:
-                response_str = await ws.recv()
-                response = json.loads(response_str)
-                log_dict = response["params"]["result"]
-                log = self._provider.parse_log_dict(log_dict)
-                if not log.deleted:
-                    transfer = self._parser.decode_log(log)
-                    logger.info(f"New transfer: block_num={transfer.block_num}, tx_hash={transfer.tx_hash}, tx_from={transfer.tx_from}, tx_to={transfer.tx_to}, value={transfer.value}")
-                    db.insert_transfers(transfers=[transfer])
-                    db.increment_balance(self.chain_id, transfer.token_address, transfer.tx_to, transfer.value)
-                    db.increment_balance(self.chain_id, transfer.token_address, transfer.tx_from, -transfer.value)
 
+            async def read() -> None:
+                while True:
+                    response = json.loads(await ws.recv())
+                    # Waits while the queue is full, the node then buffers the logs on its side
+                    await queue.put(response["params"]["result"])
+
+            tasks = [asyncio.create_task(read())]
+            try:
+                caught_up = await asyncio.get_running_loop().run_in_executor(
+                    catch_up_executor, self._catch_up_to_head, contract_addresses
+                )
+                tasks.append(
+                    asyncio.create_task(self._apply_queued(queue, asyncio.Semaphore(max_concurrency), caught_up))
+                )
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    task.result()
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    def _catch_up_to_head(self, contract_addresses: List[str]) -> Dict[str, int]:
+        """Catches up the tokens already indexed to the current head. Returns the caught up block per token"""
+        # Refuses to resume tokens indexed in other units before any write
+        self._metadata.resolve(contract_addresses)
+        head = self._provider.get_latest_block_num()
+        caught_up = {}
+        for contract_address in contract_addresses:
+            last_block = self._storage.get_last_indexed_block(self.chain_id, contract_address)
+            if last_block is None:
+                continue
+            if last_block < head:
+                logger.info(f"Catching up '{contract_address}' from block {last_block + 1} up to block {head} before applying the subscription")
+                self.catch_up(contract_address, last_block + 1, head)
+            caught_up[contract_address.lower()] = max(last_block, head)
+        return caught_up
+
+    async def _apply_queued(self, queue: asyncio.Queue, semaphore: asyncio.Semaphore, caught_up: Dict[str, int]) -> None:
+        while True:
+            log_dicts = [await queue.get()]
+            while not queue.empty() and len(log_dicts) < LIVE_BATCH_SIZE:
+                log_dicts.append(queue.get_nowait())
+
+            logs = [self._provider.parse_log_dict(log_dict) for log_dict in log_dicts]
+            # Logs arrive in block order, so the blocks before the newest one of the batch are complete
+            newest_block = max(log.block_num for log in logs)
+            token_logs = {}
+            for log in logs:
+                token = log.address.lower()
+                if not log.deleted and log.block_num > caught_up.get(token, -1):
+                    token_logs.setdefault(token, []).append(log)
+            await asyncio.gather(*(
+                self._apply_logs(logs, semaphore, logs[-1].block_num < newest_block) for logs in token_logs.values()
+            ))
+
+    async def _apply_logs(self, logs: List[LogModel], semaphore: asyncio.Semaphore, ends_block: bool) -> None:
+        async with semaphore:
+            await asyncio.get_running_loop().run_in_executor(None, self._decode_and_apply, logs, ends_block)
+
+    def _decode_and_apply(self, logs: List[LogModel], ends_block: bool) -> None:
+        # Logs of the same block hit the block time cache
+        self._provider.add_block_times(logs)
+        transfers = [self._parser.decode_log(log) for log in logs]
+        for transfer in transfers:
+            logger.info(f"New transfer: chain_id={self.chain_id}, block_num={transfer.block_num}, tx_hash={transfer.tx_hash}, tx_from={transfer.tx_from}, tx_to={transfer.tx_to}, value={transfer.value}")
+        self._apply_transfers(transfers, ends_block)
+
+    def catch_up(self, contract_address: str, start_block: int, end_block: int) -> int:
+        """Indexes the blocks between start_block and end_block, both included, before following the head.
+
+        Blocks are caught up in windows of CATCH_UP_BATCH, each with as many eth_getLogs calls as its expected
+        logs need. The density is measured on the previous window, the first one uses a single call.
+        The transfers already stored, e.g. of a start_block partially applied before, are skipped.
+
+        :return : Number of Transfers applied
+        """
+        # Raises before any write if the token was indexed in other units, see TokenMetadataService
+        self._metadata.get(contract_address)
+        applied = 0
+        density = None
+        for batch_start in range(start_block, end_block + 1, CATCH_UP_BATCH):
+            batch_end = min(batch_start + CATCH_UP_BATCH - 1, end_block)
+            blocks = batch_end - batch_start + 1
+            calls = 1 if density is None else max(1, math.ceil(density * blocks / MAX_LOGS_PER_CALL))
+            step = math.ceil(blocks / calls)
+            ranges = [(range_start, min(range_start + step - 1, batch_end)) for range_start in range(batch_start, batch_end + 1, step)]
+            logger.info(f"Catching up blocks: {batch_start} - {batch_end}. eth_getLogs calls: {len(ranges)}")
+
+            fetched = 0
+            for range_start, range_end in ranges:
+                logs = self._provider.get_logs_filtered({
+                    "fromBlock": range_start,
+                    "toBlock": range_end,
+                    "address": contract_address,
+                    "topics": [TRANSFER_TOPIC],
+                })
+                logs = [log for log in logs if not log.deleted]
+                fetched += len(logs)
+                self._provider.add_block_times(logs)
+                if logs:
+                    applied += self._apply_transfers([self._parser.decode_log(log) for log in logs])
+
+            density = fetched / blocks
+            self._storage.set_last_indexed_block(self.chain_id, contract_address, batch_end)
+
+        return applied
+
+    def _apply_transfers(self, transfers: List[TransferModel], ends_block: bool = True) -> int:
+        """Stores a batch of transfers of one token with the balances, token stats and rollups it moves and its
+        last indexed block, in a single transaction. Transfers already stored are skipped, so a batch interrupted
+        or replayed is applied once. Unless ends_block, more transfers of its last block may follow, so the block
+        before is the last indexed
+
+        :return : Number of Transfers applied"""
+        token_address = transfers[0].token_address
+        last_block = transfers[-1].block_num if ends_block else transfers[-1].block_num - 1
+        applied, changes = self._storage.apply_transfer_batch(self.chain_id, token_address, transfers, last_block)
+        # Once everything is committed, so listeners never read older balances than notified
+        self._storage.publish_balance_changes(self.chain_id, token_address, changes)
+        if self._on_commit:
+            self._on_commit(transfers)
+        return applied
 
     def _get_connection(self):
         return connect(self._provider._websocket_url+self._provider._key)
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import List, Tuple
+
+from src.db import Storage
+from src.providers import AlchemyProvider
+from src.providers.stand_in_node import StandInNode
+from src.models import TransferModel, LoadTestReportModel
+from .indexer_service import IndexerService
+
+LOAD_TEST_CU_PER_SECOND = 1e9  # The stand-in node is not rate limited
+MEMORY_SAMPLE_INTERVAL = 1  # Seconds between RSS samples
+SUBSCRIBE_TIMEOUT = 10  # Seconds for the indexer to subscribe
+DRAIN_TIMEOUT = 30  # Seconds to commit the notified transfers once the node stops producing
+
+logger = logging.getLogger()
+
+
+def rss_bytes() -> int:
+    """Returns the resident memory of the process. Falls back to the peak if /proc is not available"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux
+
+
+def percentile(values: List[float], q: float) -> float | None:
+    """Returns the nearest-rank q percentile (0-1) of values, None if empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+class LoadTestService:
+    """Load Test Service Class driving IndexerService against a local StandInNode, fully offline.
+
+    The node and the indexer share the process: the node records when each log is notified and the indexer
+    reports each committed batch, which gives the notification to commit latency of every transfer. The
+    resident memory of the process (indexer and node) is sampled along the run.
+    """
+
+    def __init__(self, node: StandInNode, storage: Storage, max_concurrency: int = 1) -> None:
+        """
+        :param node: stand-in node producing the transfers
+        :param storage: where the indexer writes, e.g. a temporary SQLiteStorage
+        :param max_concurrency: Optional. tokens written at the same time
+        """
+        self._node = node
+        self._storage = storage
+        self._max_concurrency = max_concurrency
+        self._commits: List[Tuple[float, float]] = []  # (commit time, latency)
+        self._lock = threading.Lock()
+
+    def _on_commit(self, transfers: List[TransferModel]) -> None:
+        now = time.perf_counter()
+        commits = []
+        for transfer in transfers:
+            emitted = self._node.emitted.pop(transfer.tx_hash, None)
+            if emitted is not None:
+                commits.append((now, now - emitted))
+        with self._lock:
+            self._commits.extend(commits)
+
+    async def run(self, duration: float, drain_timeout: float = DRAIN_TIMEOUT) -> LoadTestReportModel:
+        """Catches up the history of the node, then follows it while it produces blocks for duration seconds
+
+        :param duration: seconds of block production
+        :param drain_timeout: Optional. max seconds to commit the notified transfers after the production
+        :return : LoadTestReportModel
+        """
+        started = time.perf_counter()
+        memory = []
+        runner = await self._node.serve()
+        host, port = runner.addresses[0][:2]
+        provider = AlchemyProvider(
+            self._node.chain_id,
+            f"http://{host}:{port}/",
+            f"ws://{host}:{port}/",
+            "",
+            compute_units_per_second=LOAD_TEST_CU_PER_SECOND,
+        )
+        indexer_service = IndexerService(self._node.chain_id, provider, self._storage, on_commit=self._on_commit)
+        tokens = [provider.checksum_address(token) for token in self._node.tokens]
+        loop = asyncio.get_running_loop()
+
+        async def sample_memory() -> None:
+            while True:
+                memory.append((round(time.perf_counter() - started, 3), rss_bytes()))
+                await asyncio.sleep(MEMORY_SAMPLE_INTERVAL)
+
+        sampler = asyncio.create_task(sample_memory())
+        follow = None
+        try:
+            st = time.perf_counter()
+            catch_up_transfers = 0
+            if self._node.head >= self._node.first_block:
+                for token in tokens:
+                    catch_up_transfers += await loop.run_in_executor(
+                        None, indexer_service.catch_up, token, self._node.first_block, self._node.head
+                    )
+            catch_up_seconds = time.perf_counter() - st
+            logger.info(f"Caught up {catch_up_transfers} transfers in {catch_up_seconds:.1f} seconds")
+
+            follow = asyncio.create_task(indexer_service.follow(tokens, self._max_concurrency))
+            await asyncio.wait_for(self._node.subscribed.wait(), SUBSCRIBE_TIMEOUT)
+
+            production_start = time.perf_counter()
+            await self._node.produce(duration)
+            production_end = time.perf_counter()
+            while self._node.emitted and time.perf_counter() - production_end < drain_timeout:
+                if follow.done():
+                    follow.result()
+                await asyncio.sleep(0.05)
+            memory.append((round(time.perf_counter() - started, 3), rss_bytes()))
+        finally:
+            for task in (follow, sampler):
+                if task:
+                    task.cancel()
+            await asyncio.gather(*(task for task in (follow, sampler) if task), return_exceptions=True)
+            await runner.cleanup()
+
+        with self._lock:
+            commits = list(self._commits)
+        latencies = [latency for _, latency in commits]
+        return LoadTestReportModel(
+            duration=production_end - production_start,
+            target_rate=self._node.transfers_per_second,
+            catch_up_transfers=catch_up_transfers,
+            catch_up_seconds=catch_up_seconds,
+            emitted=len(commits) + len(self._node.emitted),
+            removed=self._node.removed,
+            committed=len(commits),
+            throughput=sum(1 for commit_time, _ in commits if commit_time <= production_end) / (production_end - production_start),
+            latency_p50=percentile(latencies, 0.5),
+            latency_p99=percentile(latencies, 0.99),
+            memory=memory,
+        )
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import List
+
+from src.db import Storage, PostgresStorage
+from src.providers import AlchemyProvider, parse_endpoints
+from src.models import ChainConfigModel
+from .backfill_service import BackfillService
+from .indexer_service import IndexerService
+
+RECONNECT_DELAY = 5  # Seconds before following a chain again after a failure
+CATCH_UP_WORKERS = 2  # Threads, out of max_workers, catching up or backfilling chains at the same time
+
+logger = logging.getLogger()
+
+
+class MultiChainService:
+    """Runs the indexers of several chains in a single asyncio process.
+
+    Each chain has its own provider, so its own compute units budget and endpoints, one logs subscription for
+    all its tokens and a limit of tokens written at the same time. The database engine and the executors running
+    the blocking work are shared, sized to the connection pool, so threads and connections depend on the
+    total event volume and not on the number of chains. Catch-ups and backfills, which can take hours, run in
+    their own executor of catch_up_workers threads, so they queue behind each other instead of taking the
+    threads of the live writes of the chains already followed.
+    """
+
+    def __init__(
+            self,
+            chains: List[ChainConfigModel],
+            max_workers: int,
+            storage: Storage | None = None,
+            catch_up_workers: int = CATCH_UP_WORKERS,
+    ) -> None:
+        """
+        :param chains: chains to index
+        :param max_workers: threads for provider and database calls, at most the DB connection pool size
+        :param storage: Optional. storage shared by the chains, Postgres by default
+        :param catch_up_workers: Optional. threads of max_workers kept for catch-ups and backfills
+        """
+        if not 0 < catch_up_workers < max_workers:
+            raise Exception(f"catch_up_workers must be between 1 and max_workers - 1 ({max_workers - 1}), got {catch_up_workers}")
+        self._chains = chains
+        self._max_workers = max_workers
+        self._catch_up_workers = catch_up_workers
+        self._storage = storage or PostgresStorage()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self._max_workers - self._catch_up_workers))
+        with ThreadPoolExecutor(max_workers=self._catch_up_workers) as catch_up_executor:
+            await asyncio.gather(*(self._run_chain(chain, catch_up_executor) for chain in self._chains))
+
+    async def _run_chain(self, chain: ChainConfigModel, catch_up_executor: Executor) -> None:
+        """Catches up the tokens of the chain and follows them, catching up again after any failure"""
+        provider = AlchemyProvider(
+            chain.chain_id,
+            chain.provider_url,
+            chain.provider_websocket,
+            chain.provider_key,
+            endpoints=parse_endpoints(chain.provider_endpoints),
+            compute_units_per_second=chain.compute_units_per_second,
+        )
+        indexer_service = IndexerService(chain.chain_id, provider, self._storage)
+        backfill_service = BackfillService(chain.chain_id, provider, self._storage, chain.fetch_strategy)
+        tokens = [provider.checksum_address(token) for token in chain.tokens]
+        loop = asyncio.get_running_loop()
+
+        while True:
+            try:
+                await loop.run_in_executor(
+                    catch_up_executor, self._catch_up, chain, indexer_service, backfill_service, provider, tokens
+                )
+                logger.info(f"Real-Time Indexing starting for chain ID {chain.chain_id}, {len(tokens)} tokens")
+                await indexer_service.follow(tokens, chain.max_concurrency, catch_up_executor)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A failing chain must not stop the others
+                logger.warning(f"Chain ID {chain.chain_id} failed with {e}, restarting in {RECONNECT_DELAY} seconds")
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    def _catch_up(
+            self,
+            chain: ChainConfigModel,
+            indexer_service: IndexerService,
+            backfill_service: BackfillService,
+            provider: AlchemyProvider,
+            tokens: List[str],
+    ) -> None:
+        current_block = provider.get_latest_block_num()
+        for token in tokens:
+            last_block = self._storage.get_last_indexed_block(chain.chain_id, token)
+            if last_block is None:
+                if chain.backfill:
+                    logger.info(f"Backfilling Transfers for '{token}' on chain ID {chain.chain_id} up to block {current_block}")
+                    backfill_service.backfill(token, chain.init_block, current_block)
+                continue
+            if last_block < current_block:
+                logger.info(f"Catching up '{token}' on chain ID {chain.chain_id} from block {last_block + 1} up to block {current_block}")
+                indexer_service.catch_up(token, last_block + 1, current_block)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import logging
+import time
+from decimal import Decimal
+from typing import Iterator, List
+
+import src.db as db
+from src.providers import AlchemyProvider
+from src.models import BalanceModel, BalanceMismatchModel, ReconcileReportModel
+from src.utils.address_utils import bytes_to_address
+from src.utils.holder_stats import holder_delta
+from src.constants import MULTICALL_BATCH_SIZE, MULTICALL_RPC_BATCH_SIZE
+from .token_metadata_service import TokenMetadataService
+
+RECONCILE_CHUNK_SIZE = MULTICALL_BATCH_SIZE * MULTICALL_RPC_BATCH_SIZE  # Wallets per JSON-RPC request
+
+logger = logging.getLogger()
+
+
+class ReconcileService:
+    """Reconcile Service Class verifying the indexed balances against the on-chain balanceOf"""
+
+    def __init__(self, chain_id: int, provider: AlchemyProvider) -> None:
+        self.chain_id = chain_id
+        self._provider = provider
+        self._metadata = TokenMetadataService(chain_id, provider)
+
+    def reconcile(
+            self, token_address: str, sample: int | None = None, repair: bool = False
+    ) -> ReconcileReportModel:
+        """Compares the db balances of token_address with balanceOf at the last indexed block
+
+        :param token_address: Token Address
+        :param sample: Optional. number of random holders to check, all the holders if None
+        :param repair: if True, overwrite the mismatched balances with the on-chain ones
+        :return : ReconcileReportModel
+        """
+        # Compare at the block the db is consistent with, so later transfers are not reported
+        block_num = db.get_last_indexed_block(self.chain_id, token_address)
+        decimals = self._metadata.decimals(token_address)
+        checked = 0
+        mismatches = []
+        st = time.time()
+
+        for balances in self._holder_chunks(token_address, sample):
+            wallets = [balance.wallet_address for balance in balances]
+            chain_balances = self._provider.get_balances_of(token_address, wallets, block_num)
+            for balance, raw_balance in zip(balances, chain_balances):
+                chain_balance = Decimal(raw_balance).scaleb(-decimals) if raw_balance is not None else None
+                if chain_balance != balance.balance:
+                    mismatches.append(BalanceMismatchModel(
+                        wallet_address=balance.wallet_address,
+                        db_balance=balance.balance,
+                        chain_balance=chain_balance,
+                    ))
+            checked += len(balances)
+            logger.info(f"Reconciled {checked} holders. mismatches: {len(mismatches)}. {checked / (time.time() - st):.0f} holders/s")
+
+        repaired = self._repair(token_address, mismatches) if repair else 0
+
+        return ReconcileReportModel(
+            chain_id=self.chain_id,
+            token_address=token_address,
+            block_num=block_num,
+            checked=checked,
+            mismatches=mismatches,
+            repaired=repaired,
+        )
+
+    def _holder_chunks(self, token_address: str, sample: int | None) -> Iterator[List[BalanceModel]]:
+        if sample is not None:
+            balances = db.get_token_sample_balances(self.chain_id, token_address, sample)
+            for i in range(0, len(balances), RECONCILE_CHUNK_SIZE):
+                yield balances[i: i + RECONCILE_CHUNK_SIZE]
+            return
+
+        for rows in db.stream_token_balances(self.chain_id, token_address, chunk_size=RECONCILE_CHUNK_SIZE):
+            yield [
+                BalanceModel(
+                    chain_id=self.chain_id,
+                    token_address=token_address,
+                    wallet_address=bytes_to_address(wallet_address),
+                    balance=balance,
+                )
+                for wallet_address, balance in rows
+            ]
+
+    def _repair(self, token_address: str, mismatches: List[BalanceMismatchModel]) -> int:
+        """Overwrites the mismatched rows only, keeping the token stats in sync. Returns the repaired count"""
+        repairs = [mismatch for mismatch in mismatches if mismatch.chain_balance is not None]
+        db.update_balances(self.chain_id, [
+            BalanceModel(
+                chain_id=self.chain_id,
+                token_address=token_address,
+                wallet_address=mismatch.wallet_address,
+                balance=mismatch.chain_balance,
+            )
+            for mismatch in repairs
+        ])
+
+        holders_delta = 0
+        bucket_deltas = {}
+        for mismatch in repairs:
+            holders, buckets = holder_delta(mismatch.db_balance, mismatch.chain_balance)
+            holders_delta += holders
+            for bucket, delta in buckets.items():
+                bucket_deltas[bucket] = bucket_deltas.get(bucket, 0) + delta
+        db.apply_token_stats_delta(
+            self.chain_id,
+            token_address,
+            holders_delta=holders_delta,
+            minted=Decimal(0),
+            burned=Decimal(0),
+            bucket_deltas={bucket: delta for bucket, delta in bucket_deltas.items() if delta},
+        )
+        logger.info(f"Repaired {len(repairs)} balances")
+
+        return len(repairs)
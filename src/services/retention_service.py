@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import List
+
+import src.db as db
+from src.models import CompactionReportModel
+from src.utils.export_writers import WRITERS
+from src.constants import COMPACTION_BATCH_SIZE, ARCHIVE_FORMAT_DEFAULT, EXPORT_ROWS_PER_FILE
+
+logger = logging.getLogger()
+
+
+class RetentionService:
+    """Retention Service Class bounding the transfers history of the tokens with a retention policy.
+
+    The transfers older than the cutoff block (last indexed block - retain_blocks) are first archived to compressed
+    files if the policy has an archive_dir, then folded into the balance checkpoint of the token and deleted in short
+    batches. Balances, stats and the transfers after the cutoff are not touched, and rebuild_token_balances starts
+    from the checkpoint. Postgres reuses the space of the deleted rows once autovacuum has gone through them, so the
+    table and its indexes stay bounded by the retained history.
+
+    The archive is closed before the first delete, so an interrupted compaction may archive some transfers again
+    on its next run: archived rows are unique by (block_num, log_index).
+    """
+
+    def __init__(
+            self,
+            chain_id: int,
+            batch_size: int = COMPACTION_BATCH_SIZE,
+            file_format: str = ARCHIVE_FORMAT_DEFAULT,
+            rows_per_file: int = EXPORT_ROWS_PER_FILE,
+    ) -> None:
+        """
+        :param batch_size: Optional. transfers compacted per transaction
+        :param file_format: Optional. 'csv.gz' or 'parquet' archives
+        :param rows_per_file: Optional. max rows per archive file
+        """
+        if file_format not in WRITERS:
+            raise Exception(f"Unsupported format {file_format}")
+        self.chain_id = chain_id
+        self._batch_size = batch_size
+        self._file_format = file_format
+        self._rows_per_file = rows_per_file
+
+    def set_policy(self, token_address: str, retain_blocks: int, archive_dir: str | None = None) -> None:
+        """Keeps the transfers of the last retain_blocks indexed blocks of token_address, archiving the older ones
+        to archive_dir, or deleting them if None"""
+        if retain_blocks < 0:
+            raise Exception("retain_blocks can't be negative")
+        db.set_transfer_retention(self.chain_id, token_address, retain_blocks, archive_dir)
+
+    def compact_all(self) -> List[CompactionReportModel]:
+        """Compacts every token of the chain with a retention policy"""
+        return [self.compact(retention.token_address) for retention in db.get_transfer_retentions(self.chain_id)]
+
+    def compact(self, token_address: str) -> CompactionReportModel:
+        """Compacts the transfers of token_address older than its retention policy
+
+        :param token_address: Token Address
+        :return : CompactionReportModel"""
+        retention = db.get_transfer_retention(self.chain_id, token_address)
+        if retention is None:
+            raise Exception(f"Token {token_address} has no retention policy")
+        last_block = db.get_last_indexed_block(self.chain_id, token_address)
+        max_id = db.get_last_transfer_id()
+        if last_block is None or last_block - retention.retain_blocks < 0 or max_id is None:
+            logger.info(f"Token {token_address} has no transfers older than {retention.retain_blocks} blocks")
+            return CompactionReportModel(
+                chain_id=self.chain_id, token_address=token_address, cutoff_block=None, compacted=0, files=[]
+            )
+
+        cutoff_block = last_block - retention.retain_blocks
+        st = time.time()
+        files = []
+        if retention.archive_dir:
+            files = self._archive(token_address, retention.archive_dir, cutoff_block, max_id)
+        compacted = db.compact_token_transfers(self.chain_id, token_address, cutoff_block, max_id, self._batch_size)
+
+        logger.info(f"Compacted {compacted} transfers up to block {cutoff_block} into the checkpoint of {token_address} in {time.time() - st:.1f} seconds")
+        return CompactionReportModel(
+            chain_id=self.chain_id,
+            token_address=token_address,
+            cutoff_block=cutoff_block,
+            compacted=compacted,
+            files=files,
+        )
+
+    def _archive(self, token_address: str, archive_dir: str, cutoff_block: int, max_id: int) -> List[str]:
+        # Runs of the same cutoff don't overwrite each other's files
+        prefix = f"transfers_{self.chain_id}_{token_address.lower()}_to_{cutoff_block}_{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}"
+        writer = WRITERS[self._file_format](archive_dir, prefix, db.TRANSFER_ARCHIVE_COLUMNS, self._rows_per_file)
+        try:
+            for rows in db.stream_compactable_transfers(self.chain_id, token_address, cutoff_block, max_id):
+                writer.write(rows)
+        finally:
+            files = writer.close()
+
+        logger.info(f"Archived {writer.rows} transfers in {len(files)} files")
+        return files
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Dict, List
+
+from src.db import Storage, PostgresStorage
+from src.providers import AlchemyProvider
+from src.models import TokenMetadataModel
+from src.constants import DECIMALS_DEFAULT
+
+logger = logging.getLogger()
+
+
+class TokenMetadataService:
+    """Token Metadata Service Class resolving the decimals, symbol and name of the tokens.
+
+    Lookups go memory -> storage -> chain. The tokens missing from the storage are resolved together, with
+    decimals(), symbol() and name() batched in multicall eth_calls, and stored, so a token costs a single
+    on-chain lookup for its lifetime.
+
+    Tokens indexed before their metadata was stored hold values scaled by DECIMALS_DEFAULT. If such a token has
+    other decimals, resolving it raises unless it is indexed again from scratch (reindex), so a resume never
+    mixes both units.
+    """
+
+    def __init__(self, chain_id: int, provider: AlchemyProvider, storage: Storage | None = None) -> None:
+        """
+        :param storage: Optional. where the metadata is persisted, Postgres by default
+        """
+        self.chain_id = chain_id
+        self._provider = provider
+        self._storage = storage or PostgresStorage()
+        self._cache: Dict[str, TokenMetadataModel] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, token_addresses: List[str], reindex: bool = False) -> Dict[str, TokenMetadataModel]:
+        """Returns the metadata of the tokens, keyed by lowercase address
+
+        :param token_addresses: Token Addresses
+        :param reindex: Optional. True if the tokens are indexed again from scratch, replacing their stored data
+        :return : {token_address: TokenMetadataModel}"""
+        tokens = list(dict.fromkeys(token_address.lower() for token_address in token_addresses))
+        if any(token not in self._cache for token in tokens):
+            # One resolver at a time, so concurrent batches of a new token don't fetch it twice
+            with self._lock:
+                missing = [token for token in tokens if token not in self._cache]
+                if missing:
+                    self._cache.update(self._storage.get_tokens_metadata(self.chain_id, missing))
+                    missing = [token for token in missing if token not in self._cache]
+                if missing:
+                    fetched = self._fetch(missing)
+                    if not reindex:
+                        self._check_units(fetched)
+                    self._storage.insert_token_metadata(fetched)
+                    self._cache.update((metadata.token_address, metadata) for metadata in fetched)
+
+        return {token: self._cache[token] for token in tokens}
+
+    def get(self, token_address: str) -> TokenMetadataModel:
+        metadata = self._cache.get(token_address.lower())
+        if metadata is None:
+            metadata = self.resolve([token_address])[token_address.lower()]
+        return metadata
+
+    def decimals(self, token_address: str) -> int:
+        """Returns the decimals of token_address, the TokenParser scaling"""
+        return self.get(token_address).decimals
+
+    def _check_units(self, fetched: List[TokenMetadataModel]) -> None:
+        """Raises if a token resolved for the first time was already indexed with other decimals than
+        DECIMALS_DEFAULT. Nothing is stored, so it keeps failing until the token is backfilled again"""
+        for metadata in fetched:
+            if metadata.decimals == DECIMALS_DEFAULT:
+                continue
+            if self._storage.get_last_indexed_block(self.chain_id, metadata.token_address) is not None:
+                raise Exception(
+                    f"Token {metadata.token_address} was indexed in units of {DECIMALS_DEFAULT} decimals but has "
+                    f"{metadata.decimals} decimals. Backfill it again instead of resuming it"
+                )
+
+    def _fetch(self, tokens: List[str]) -> List[TokenMetadataModel]:
+        metadata = []
+        for token, (decimals, symbol, name) in zip(tokens, self._provider.get_tokens_metadata(tokens)):
+            if decimals is None:
+                logger.warning(f"Token {token} has no decimals(), using {DECIMALS_DEFAULT}")
+            metadata.append(TokenMetadataModel(
+                chain_id=self.chain_id,
+                token_address=token,
+                decimals=decimals if decimals is not None else DECIMALS_DEFAULT,
+                symbol=symbol,
+                name=name,
+            ))
+        logger.info(f"Resolved the metadata of {len(metadata)} tokens")
+        return metadata
@@ -1,5 +1,8 @@
+from __future__ import annotations
+
+import json
 from datetime import datetime
-from typing import List, Tuple, Any
+from typing import List, Tuple, Any, Dict
 from pydantic import BaseModel
 from web3 import Web3
 
@@ -311,3 +314,280 @@ def decode_struct(data, arguments_abi):
             )
 
     return arguments_list, slot
+
+
+# Precompiled event decoders
+# An event ABI is compiled once into a plan of (name, source, position, converter). Decoding a log is then a
+# plan lookup by (topic0, topics count) plus direct slicing of the topics and data words.
+# Log data is converted once with bytes.fromhex and read through memoryview slices, hex strings are only
+# built for the output values. Topics are already one word each and are read as hex strings.
+
+def hex_to_view(data: str) -> memoryview:
+    """Returns a zero-copy view over the bytes of a 0x prefixed hex string"""
+    return memoryview(bytes.fromhex(data[2:]))
+
+
+def split_to_word_views(data: str) -> List[memoryview]:
+    """Bytes-native split_to_words. Returns 32 bytes views without copying the data"""
+    view = hex_to_view(data) if isinstance(data, str) else memoryview(data)
+    return [view[i: i + 32] for i in range(0, len(view), 32)]
+
+
+def view_to_uint(word: memoryview) -> int:
+    return int.from_bytes(word, "big")
+
+
+def view_to_int(word: memoryview) -> int:
+    return int.from_bytes(word, "big", signed=True)
+
+
+def view_to_address(word: memoryview) -> str:
+    return "0x" + word[12:32].hex()
+
+
+def view_to_bool(word: memoryview) -> bool:
+    return int.from_bytes(word, "big") != 0
+
+
+def decode_abi_string(data: bytes) -> str | None:
+    """Returns the string returned by a call, ABI encoded or as bytes32 (e.g. MKR symbol). None if malformed"""
+    if len(data) == 32:
+        return data.rstrip(b"\x00").decode("utf-8", errors="replace").replace("\x00", "")
+    if len(data) < 64:
+        return None
+    view = memoryview(data)
+    start = view_to_uint(view[0:32])
+    if start + 32 > len(data):
+        return None
+    length = view_to_uint(view[start: start + 32])
+    if start + 32 + length > len(data):
+        return None
+    # Postgres text does not accept NUL characters
+    return bytes(view[start + 32: start + 32 + length]).decode("utf-8", errors="replace").replace("\x00", "")
+
+
+def encode_abi_string(value: str) -> bytes:
+    """Returns the ABI encoding of a single string return value"""
+    encoded = value.encode()
+    return (
+        (32).to_bytes(32, "big") + len(encoded).to_bytes(32, "big") + encoded + b"\x00" * (-len(encoded) % 32)
+    )
+
+
+def _fixed_view_converter(size: int):
+    def view_to_fixed_bytes(word: memoryview) -> str:
+        return "0x" + word[:size].hex()
+
+    return view_to_fixed_bytes
+
+
+def _view_converter(argument_type: str):
+    """Returns the function converting a 32 bytes view to the python value of argument_type"""
+    if argument_type == "address":
+        return view_to_address
+    elif argument_type == "bool":
+        return view_to_bool
+    elif argument_type[:4] == "uint":
+        return view_to_uint
+    elif argument_type[:3] == "int":
+        return view_to_int
+    elif argument_type[:5] == "bytes" and argument_type[5:].isdigit():
+        return _fixed_view_converter(int(argument_type[5:]))
+    raise Exception(f"Unsupported type {argument_type}")
+
+
+def _word_to_uint(word: str) -> int:
+    return int(word, 16)
+
+
+def _word_to_int(word: str) -> int:
+    value = int(word, 16)
+    if value & (1 << 255):
+        value -= 1 << 256
+    return value
+
+
+def _word_to_address(word: str) -> str:
+    return "0x" + word[24:].lower()
+
+
+def _word_to_bool(word: str) -> bool:
+    return int(word, 16) != 0
+
+
+def _word_to_hex(word: str) -> str:
+    return "0x" + word
+
+
+def _fixed_bytes_converter(size: int):
+    def _word_to_fixed_bytes(word: str) -> str:
+        return "0x" + word[: size * 2]
+
+    return _word_to_fixed_bytes
+
+
+def _static_converter(argument_type: str):
+    """Returns the function converting a 64 chars hex word (topic) to the python value of argument_type"""
+    if argument_type == "address":
+        return _word_to_address
+    elif argument_type == "bool":
+        return _word_to_bool
+    elif argument_type[:4] == "uint":
+        return _word_to_uint
+    elif argument_type[:3] == "int":
+        return _word_to_int
+    elif argument_type[:5] == "bytes" and argument_type[5:].isdigit():
+        return _fixed_bytes_converter(int(argument_type[5:]))
+    raise Exception(f"Unsupported type {argument_type}")
+
+
+def _is_dynamic(argument_type: str) -> bool:
+    return argument_type in ("bytes", "string") or argument_type.endswith("[]")
+
+
+def _data_reader(argument_type: str, slot: int):
+    """Returns (reader(view), slots used) for a non indexed argument starting at slot.
+
+    view is a memoryview over the log data bytes
+    """
+    start = slot * 32
+    if argument_type in ("bytes", "string"):
+        as_string = argument_type == "string"
+
+        def read_dynamic(view: memoryview):
+            offset = int.from_bytes(view[start: start + 32], "big")
+            length = int.from_bytes(view[offset: offset + 32], "big")
+            value = view[offset + 32: offset + 32 + length]
+            if as_string:
+                return bytes(value).decode("utf-8", "ignore")
+            return "0x" + value.hex()
+
+        return read_dynamic, 1
+
+    elif argument_type.endswith("[]"):
+        convert = _view_converter(argument_type[:-2])
+
+        def read_dynamic_array(view: memoryview):
+            offset = int.from_bytes(view[start: start + 32], "big")
+            count = int.from_bytes(view[offset: offset + 32], "big")
+            items_start = offset + 32
+            return [
+                convert(view[items_start + i * 32: items_start + (i + 1) * 32]) for i in range(count)
+            ]
+
+        return read_dynamic_array, 1
+
+    elif argument_type.endswith("]"):
+        item_type, size = argument_type[:-1].rsplit("[", 1)
+        size = int(size)
+        convert = _view_converter(item_type)
+
+        def read_static_array(view: memoryview):
+            return [convert(view[start + i * 32: start + (i + 1) * 32]) for i in range(size)]
+
+        return read_static_array, size
+
+    convert = _view_converter(argument_type)
+    end = start + 32
+
+    def read_static(view: memoryview):
+        return convert(view[start:end])
+
+    return read_static, 1
+
+
+def event_signature(event_abi: Dict) -> str:
+    """Returns the canonical signature of the event, e.g. Transfer(address,address,uint256)"""
+    types = ",".join(argument["type"] for argument in event_abi["inputs"])
+    return f"{event_abi['name']}({types})"
+
+
+def event_topic(event_abi: Dict) -> str:
+    """Returns topic0 of the event"""
+    return Web3.to_hex(Web3.keccak(text=event_signature(event_abi)))
+
+
+class EventDecoder:
+    """Compiled decoding plan of an event ABI"""
+
+    def __init__(self, event_abi: Dict) -> None:
+        if event_abi.get("anonymous"):
+            raise Exception("Anonymous events are not supported")
+        self.name = event_abi["name"]
+        self.signature = event_signature(event_abi)
+        self.topic = event_topic(event_abi)
+
+        self._topic_plan = []
+        self._data_plan = []
+        topic_position = 1
+        slot = 0
+        for argument in event_abi["inputs"]:
+            argument_type = argument["type"]
+            if argument.get("indexed"):
+                # Indexed dynamic values are stored as their keccak hash
+                if _is_dynamic(argument_type) or argument_type.endswith("]"):
+                    convert = _word_to_hex
+                else:
+                    convert = _static_converter(argument_type)
+                self._topic_plan.append((argument["name"], topic_position, convert))
+                topic_position += 1
+            else:
+                reader, slots = _data_reader(argument_type, slot)
+                self._data_plan.append((argument["name"], reader))
+                slot += slots
+        self.topics_count = topic_position
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        return self.topic, self.topics_count
+
+    def decode(self, topics: List[str], data: str | bytes) -> Dict[str, Any]:
+        """Returns {argument name: value} of the log topics and data (hex string or raw bytes)"""
+        args = {}
+        for name, position, convert in self._topic_plan:
+            args[name] = convert(topics[position][2:])
+        if self._data_plan:
+            view = hex_to_view(data) if isinstance(data, str) else memoryview(data)
+            for name, reader in self._data_plan:
+                args[name] = reader(view)
+        return args
+
+
+_compiled_decoders: Dict[str, EventDecoder] = {}
+
+
+def compile_event(event_abi: Dict) -> EventDecoder:
+    """Returns the EventDecoder of event_abi, compiling it only the first time"""
+    cache_key = json.dumps(event_abi, sort_keys=True)
+    decoder = _compiled_decoders.get(cache_key)
+    if decoder is None:
+        decoder = EventDecoder(event_abi)
+        _compiled_decoders[cache_key] = decoder
+    return decoder
+
+
+class EventDecoderRegistry:
+    """EventDecoders keyed by (topic0, topics count) so events sharing topic0, like ERC20 and ERC721
+    Transfer, are told apart"""
+
+    def __init__(self, events_abi: List[Dict] = None) -> None:
+        self._decoders: Dict[Tuple[str, int], EventDecoder] = {}
+        for event_abi in events_abi or []:
+            self.register(event_abi)
+
+    def register(self, event_abi: Dict) -> EventDecoder:
+        decoder = compile_event(event_abi)
+        self._decoders[decoder.key] = decoder
+        return decoder
+
+    def get(self, topic: str, topics_count: int) -> EventDecoder | None:
+        return self._decoders.get((topic, topics_count))
+
+    def decode(self, topics: List[str], data: str) -> Tuple[str, Dict[str, Any]]:
+        """Returns (event name, arguments) of the log"""
+        if not topics:
+            raise Exception("Anonymous Event")
+        decoder = self._decoders.get((topics[0], len(topics)))
+        if decoder is None:
+            raise Exception("Topic is not part of the listed signatures")
+        return decoder.name, decoder.decode(topics, data)
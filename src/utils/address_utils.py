@@ -0,0 +1,50 @@
+import sys
+from typing import Tuple
+
+from src.constants import ADDRESS_INTERN_SIZE
+from .lru_cache import LRUCache
+
+
+class AddressInterner:
+    """In-process table of the canonical forms of every address seen: a single lowercase str object and
+    its 20 bytes, as stored in the db. Duplicated addresses share the same objects"""
+
+    def __init__(self, max_size: int = ADDRESS_INTERN_SIZE) -> None:
+        self._cache = LRUCache(max_size)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def get(self, address: str) -> Tuple[str, bytes]:
+        """Returns (lowercase address, address bytes). Raises ValueError if address is not 0x and 40 hex digits"""
+        entry = self._cache.get(address)
+        if entry is None:
+            normalized = address.lower()
+            # fromhex skips whitespace, hence the length check on the bytes as well
+            raw = bytes.fromhex(normalized[2:]) if len(normalized) == 42 and normalized.startswith("0x") else b""
+            if len(raw) != 20:
+                raise ValueError(f"Invalid address {address!r}")
+            normalized = sys.intern(normalized)
+            entry = (normalized, raw)
+            self._cache.put(address, entry)
+            if normalized != address:
+                self._cache.put(normalized, entry)
+        return entry
+
+
+address_interner = AddressInterner()
+
+
+def intern_address(address: str) -> str:
+    """Returns the canonical lowercase str of the address"""
+    return address_interner.get(address)[0]
+
+
+def address_to_bytes(address: str) -> bytes:
+    """Returns the 20 bytes db representation of a hex address"""
+    return address_interner.get(address)[1]
+
+
+def bytes_to_address(raw: bytes) -> str:
+    """Returns the lowercase hex address of the db 20 bytes (bytes or memoryview)"""
+    return intern_address("0x" + raw.hex())
@@ -0,0 +1,49 @@
+import json
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from src.models import BalanceChangeModel
+from src.constants import NOTIFY_PAYLOAD_LIMIT
+
+
+def encode_balance_changes(
+        chain_id: int,
+        token_address: str,
+        changes: Dict[str, Tuple[Decimal, int]],
+        limit: int = NOTIFY_PAYLOAD_LIMIT,
+) -> List[str]:
+    """Returns the compact JSON payloads of the balance changes of a token, each one under limit bytes:
+    {"c": chain_id, "t": token_address, "w": [[wallet_address, balance, block_num], ...]}
+
+    :param changes: {wallet_address: (new balance, block_num)}
+    """
+    header = f'{{"c":{chain_id},"t":"{token_address}","w":['
+    payloads = []
+    entries = []
+    size = len(header) + 2
+    for wallet_address, (balance, block_num) in changes.items():
+        entry = json.dumps([wallet_address, str(balance), block_num], separators=(",", ":"))
+        if entries and size + len(entry) + 1 > limit:
+            payloads.append(header + ",".join(entries) + "]}")
+            entries = []
+            size = len(header) + 2
+        entries.append(entry)
+        size += len(entry) + 1
+    if entries:
+        payloads.append(header + ",".join(entries) + "]}")
+    return payloads
+
+
+def decode_balance_changes(payload: str) -> List[BalanceChangeModel]:
+    """Returns the BalanceChangeModels of a payload of encode_balance_changes"""
+    message = json.loads(payload)
+    return [
+        BalanceChangeModel(
+            chain_id=message["c"],
+            token_address=message["t"],
+            wallet_address=wallet_address,
+            balance=Decimal(balance),
+            block_num=block_num,
+        )
+        for wallet_address, balance, block_num in message["w"]
+    ]
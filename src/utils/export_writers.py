@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import csv
+import gzip
+import os
+from abc import ABC, abstractmethod
+from typing import Callable, List, Sequence, Tuple
+
+# (column name, column type) with types: "int", "str", "address", "decimal", "datetime"
+Column = Tuple[str, str]
+
+
+def _to_str(value):
+    return None if value is None else str(value)
+
+
+def _to_address(value):
+    return None if value is None else "0x" + value.hex()
+
+
+def _identity(value):
+    return value
+
+
+_CONVERTERS = {
+    "int": _identity,
+    "str": _identity,
+    "datetime": _identity,
+    "address": _to_address,  # 20 bytes BYTEA
+    "decimal": _to_str,  # NUMERIC(54, 18) doesn't fit in 64 bits, exported as exact strings
+}
+
+
+class ChunkedWriter(ABC):
+    """Writes rows to numbered files of at most rows_per_file rows: <prefix>_00000.<extension>"""
+
+    extension = ""
+
+    def __init__(self, output_dir: str, prefix: str, columns: Sequence[Column], rows_per_file: int) -> None:
+        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.columns = list(columns)
+        self.rows_per_file = rows_per_file
+        self.files: List[str] = []
+        self.rows = 0
+        self._rows_in_file = 0
+        self._converters: List[Callable] = [_CONVERTERS[column_type] for _, column_type in self.columns]
+
+    def _next_path(self) -> str:
+        path = os.path.join(self.output_dir, f"{self.prefix}_{len(self.files):05d}.{self.extension}")
+        self.files.append(path)
+        return path
+
+    def write(self, rows: Sequence[Sequence]) -> None:
+        """Writes a chunk of rows, splitting it across files when needed"""
+        start = 0
+        while start < len(rows):
+            if self._rows_in_file == 0 or self._rows_in_file >= self.rows_per_file:
+                self._close_file()
+                self._open_file(self._next_path())
+                self._rows_in_file = 0
+            end = min(len(rows), start + self.rows_per_file - self._rows_in_file)
+            self._write_rows(rows[start:end])
+            self._rows_in_file += end - start
+            self.rows += end - start
+            start = end
+
+    def close(self) -> List[str]:
+        """Closes the last file. Returns the written file paths"""
+        self._close_file()
+        return self.files
+
+    @abstractmethod
+    def _open_file(self, path: str) -> None:
+        ...
+
+    @abstractmethod
+    def _write_rows(self, rows: Sequence[Sequence]) -> None:
+        ...
+
+    @abstractmethod
+    def _close_file(self) -> None:
+        ...
+
+
+class CSVChunkedWriter(ChunkedWriter):
+    extension = "csv"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._file = None
+        self._writer = None
+
+    def _open_file(self, path: str) -> None:
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in self.columns])
+
+    def _write_rows(self, rows: Sequence[Sequence]) -> None:
+        converters = self._converters
+        self._writer.writerows(
+            [convert(value) for convert, value in zip(converters, row)] for row in rows
+        )
+
+    def _close_file(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class GzipCSVChunkedWriter(CSVChunkedWriter):
+    """CSV files compressed with gzip, with no extra dependency"""
+
+    extension = "csv.gz"
+
+    def _open_file(self, path: str) -> None:
+        self._file = gzip.open(path, "wt", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in self.columns])
+
+
+class ParquetChunkedWriter(ChunkedWriter):
+    """Parquet files with one row group per written chunk. Requires pyarrow"""
+
+    extension = "parquet"
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise Exception("Parquet export requires pyarrow. pip install pyarrow")
+        self._pa = pa
+        self._pq = pq
+        arrow_types = {
+            "int": pa.int64(),
+            "str": pa.string(),
+            "address": pa.string(),
+            "decimal": pa.string(),
+            "datetime": pa.timestamp("us"),
+        }
+        self._schema = pa.schema([(name, arrow_types[column_type]) for name, column_type in self.columns])
+        self._writer = None
+
+    def _open_file(self, path: str) -> None:
+        self._writer = self._pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def _write_rows(self, rows: Sequence[Sequence]) -> None:
+        arrays = []
+        for i, convert in enumerate(self._converters):
+            arrays.append(self._pa.array([convert(row[i]) for row in rows], type=self._schema.field(i).type))
+        self._writer.write_table(self._pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def _close_file(self) -> None:
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+
+WRITERS = {
+    "csv": CSVChunkedWriter,
+    "csv.gz": GzipCSVChunkedWriter,
+    "parquet": ParquetChunkedWriter,
+}
@@ -0,0 +1,70 @@
+from decimal import Decimal
+from typing import Dict, Iterable, List, Tuple
+
+from src.models import TransferModel
+from src.constants import HOLDER_BUCKET_MIN, HOLDER_BUCKET_MAX, NULL_ADDRESS
+
+
+def balance_bucket(balance: Decimal) -> int:
+    """Returns the distribution bucket of a positive balance: floor(log10(balance)), clamped"""
+    return max(HOLDER_BUCKET_MIN, min(HOLDER_BUCKET_MAX, Decimal(balance).adjusted()))
+
+
+def holder_delta(old_balance: Decimal, new_balance: Decimal) -> Tuple[int, Dict[int, int]]:
+    """Returns the holder count delta and the bucket deltas of a balance change.
+
+    A holder is a wallet with a positive balance, so the count only moves on zero-crossings
+    """
+    holders = 0
+    buckets = {}
+    if old_balance > 0:
+        holders -= 1
+        bucket = balance_bucket(old_balance)
+        buckets[bucket] = buckets.get(bucket, 0) - 1
+    if new_balance > 0:
+        holders += 1
+        bucket = balance_bucket(new_balance)
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+    return holders, {bucket: delta for bucket, delta in buckets.items() if delta}
+
+
+def holder_deltas(changes: Iterable[Tuple[Decimal, Decimal]]) -> Tuple[int, Dict[int, int]]:
+    """Returns the summed holder count delta and bucket deltas of (old balance, new balance) changes"""
+    holders = 0
+    buckets = {}
+    for old_balance, new_balance in changes:
+        change_holders, change_buckets = holder_delta(old_balance, new_balance)
+        holders += change_holders
+        for bucket, delta in change_buckets.items():
+            buckets[bucket] = buckets.get(bucket, 0) + delta
+    return holders, {bucket: delta for bucket, delta in buckets.items() if delta}
+
+
+def holder_buckets(balances: Iterable[Decimal]) -> Tuple[int, Dict[int, int]]:
+    """Returns the holder count and the holders per bucket of a full list of balances"""
+    holders = 0
+    buckets = {}
+    for balance in balances:
+        if balance > 0:
+            holders += 1
+            bucket = balance_bucket(balance)
+            buckets[bucket] = buckets.get(bucket, 0) + 1
+    return holders, buckets
+
+
+def balance_increments(
+        transfers: Iterable[TransferModel],
+) -> Tuple[List[Tuple[str, Decimal, int]], Decimal, Decimal]:
+    """Returns the (wallet_address, value, block_num) balance increments of transfers in order, and the value
+    minted and burned. NULL_ADDRESS is not a holder: transfers from it are mints, to it are burns"""
+    increments = []
+    minted = burned = Decimal(0)
+    for transfer in transfers:
+        for wallet_address, value in ((transfer.tx_to, transfer.value), (transfer.tx_from, -transfer.value)):
+            if wallet_address != NULL_ADDRESS:
+                increments.append((wallet_address, value, transfer.block_num))
+        if transfer.tx_from == NULL_ADDRESS:
+            minted += transfer.value
+        if transfer.tx_to == NULL_ADDRESS:
+            burned += transfer.value
+    return increments, minted, burned
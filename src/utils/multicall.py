@@ -0,0 +1,76 @@
+from typing import List, Sequence, Tuple
+
+from src.constants import AGGREGATE3_SELECTOR
+from .abi_utils import view_to_uint
+
+_AGGREGATE3_SELECTOR = bytes.fromhex(AGGREGATE3_SELECTOR[2:])
+
+
+def _word(value: int) -> bytes:
+    return value.to_bytes(32, "big")
+
+
+def _pad(data: bytes) -> bytes:
+    return data + b"\x00" * (-len(data) % 32)
+
+
+def encode_aggregate3(calls: Sequence[Tuple[bytes, bytes]], allow_failure: bool = True) -> bytes:
+    """Returns the calldata of Multicall3 aggregate3((address target, bool allowFailure, bytes callData)[])
+
+    :param calls: [(20 bytes target, callData)]
+    :param allow_failure: if False, the whole aggregate reverts when a call reverts
+    """
+    tuples = [
+        b"\x00" * 12 + target + _word(int(allow_failure)) + _word(96) + _word(len(call_data)) + _pad(call_data)
+        for target, call_data in calls
+    ]
+    offsets = []
+    offset = 32 * len(tuples)
+    for encoded in tuples:
+        offsets.append(_word(offset))
+        offset += len(encoded)
+    return _AGGREGATE3_SELECTOR + _word(32) + _word(len(tuples)) + b"".join(offsets) + b"".join(tuples)
+
+
+def decode_aggregate3_calls(calldata: bytes) -> List[Tuple[bytes, bytes]]:
+    """Inverse of encode_aggregate3: [(20 bytes target, callData)]. Used by the stand-in node"""
+    view = memoryview(calldata[4:])
+    count = view_to_uint(view[32:64])
+    calls = []
+    for i in range(count):
+        start = 64 + view_to_uint(view[64 + i * 32: 96 + i * 32])
+        target = bytes(view[start + 12: start + 32])
+        data_start = start + view_to_uint(view[start + 64: start + 96])
+        length = view_to_uint(view[data_start: data_start + 32])
+        calls.append((target, bytes(view[data_start + 32: data_start + 32 + length])))
+    return calls
+
+
+def encode_aggregate3_results(results: Sequence[Tuple[bool, bytes]]) -> bytes:
+    """Returns the aggregate3 return data (bool success, bytes returnData)[]. Used by the stand-in node"""
+    tuples = [
+        _word(int(success)) + _word(64) + _word(len(data)) + _pad(data) for success, data in results
+    ]
+    offsets = []
+    offset = 32 * len(tuples)
+    for encoded in tuples:
+        offsets.append(_word(offset))
+        offset += len(encoded)
+    return _word(32) + _word(len(tuples)) + b"".join(offsets) + b"".join(tuples)
+
+
+def decode_aggregate3(data: bytes) -> List[Tuple[bool, bytes]]:
+    """Returns [(success, returnData)] of the aggregate3 return data (bool success, bytes returnData)[]"""
+    view = memoryview(data)
+    array_start = view_to_uint(view[0:32])
+    count = view_to_uint(view[array_start: array_start + 32])
+    base = array_start + 32
+
+    results = []
+    for i in range(count):
+        tuple_start = base + view_to_uint(view[base + i * 32: base + (i + 1) * 32])
+        success = view_to_uint(view[tuple_start: tuple_start + 32]) != 0
+        data_start = tuple_start + view_to_uint(view[tuple_start + 32: tuple_start + 64])
+        length = view_to_uint(view[data_start: data_start + 32])
+        results.append((success, bytes(view[data_start + 32: data_start + 32 + length])))
+    return results
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, List, Tuple
+
+_END = object()  # End of stream marker
+_POLL = 0.1  # Seconds between checks of the stop event while waiting on a queue
+
+
+class StageStats:
+    """Time a pipeline stage spent working, waiting for input (idle) and waiting for output room (blocked)"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.busy = 0.0
+        self.idle = 0.0
+        self.blocked = 0.0
+        self.items = 0
+
+    def report(self) -> str:
+        total = self.busy + self.idle + self.blocked or 1
+        return (
+            f"Stage {self.name}: items={self.items} "
+            f"busy={self.busy:.1f}s ({self.busy / total:.0%}) "
+            f"idle={self.idle:.1f}s ({self.idle / total:.0%}) "
+            f"blocked={self.blocked:.1f}s ({self.blocked / total:.0%})"
+        )
+
+
+class Pipeline:
+    """Runs a source iterator and a chain of stages concurrently, one thread each, connected by bounded queues.
+
+    Items keep their order. The bounded queues give backpressure: a slow stage blocks the previous ones
+    instead of buffering without limit. The first error stops every stage and is raised by run()
+    """
+
+    def __init__(self, source: Iterable, stages: List[Tuple[str, Callable[[Any], Any]]], queue_size: int) -> None:
+        """
+        :param source: iterable producing the items, e.g. the fetcher generator
+        :param stages: [(name, func(item) -> output item)]. The output of the last stage is dropped
+        :param queue_size: max items waiting between two stages
+        """
+        self._source = source
+        self._stages = stages
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+        self.stats = [StageStats("source")] + [StageStats(name) for name, _ in stages]
+
+    def run(self) -> List[StageStats]:
+        threads = [threading.Thread(target=self._guard, args=(self._run_source,), name="pipeline-source")]
+        for i, (name, func) in enumerate(self._stages):
+            out_queue = self._queues[i + 1] if i + 1 < len(self._queues) else None
+            threads.append(threading.Thread(
+                target=self._guard,
+                args=(self._run_stage, func, self._queues[i], out_queue, self.stats[i + 1]),
+                name=f"pipeline-{name}",
+            ))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self._error:
+            raise self._error
+        return self.stats
+
+    def _guard(self, target: Callable, *args) -> None:
+        try:
+            target(*args)
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+
+    def _put(self, out_queue: queue.Queue, item: Any, stats: StageStats) -> bool:
+        """Puts the item, waiting for room. Returns False if the pipeline stopped"""
+        st = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                out_queue.put(item, timeout=_POLL)
+                stats.blocked += time.perf_counter() - st
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, in_queue: queue.Queue, stats: StageStats) -> Any:
+        """Gets the next item, waiting for it. Returns _END if the pipeline stopped"""
+        st = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                item = in_queue.get(timeout=_POLL)
+                stats.idle += time.perf_counter() - st
+                return item
+            except queue.Empty:
+                continue
+        return _END
+
+    def _run_source(self) -> None:
+        stats = self.stats[0]
+        iterator = iter(self._source)
+        while True:
+            st = time.perf_counter()
+            item = next(iterator, _END)
+            stats.busy += time.perf_counter() - st
+            if item is _END:
+                break
+            stats.items += 1
+            if not self._put(self._queues[0], item, stats):
+                return
+        self._put(self._queues[0], _END, stats)
+
+    def _run_stage(self, func: Callable, in_queue: queue.Queue, out_queue: queue.Queue | None, stats: StageStats) -> None:
+        while True:
+            item = self._get(in_queue, stats)
+            if item is _END:
+                break
+            st = time.perf_counter()
+            result = func(item)
+            stats.busy += time.perf_counter() - st
+            stats.items += 1
+            if out_queue is not None and not self._put(out_queue, result, stats):
+                return
+        if out_queue is not None:
+            self._put(out_queue, _END, stats)
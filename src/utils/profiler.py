@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Dict, List
+
+SAMPLE_INTERVAL = 0.01  # Seconds between samples, 100 Hz
+SUMMARY_TOP = 30  # Functions listed in the summary
+ALLOCATIONS_TOP = 20  # Lines listed in the allocation hot spots
+TRACEMALLOC_FRAMES = 1  # Traceback depth kept by tracemalloc, more frames cost more overhead
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler of every thread of the process.
+
+    A background thread reads the stacks of the other threads every interval (sys._current_frames), so the
+    profiled code runs unmodified and the overhead does not depend on the number of calls. Waiting threads are
+    sampled too, so time blocked on the provider or the database shows up in their stacks.
+
+    Profiling stops after max_seconds or after max_chunks calls to chunk_done(), whichever comes first, and
+    the results are written to output_dir:
+        - profile.collapsed: collapsed stacks 'thread;outer;...;inner count', input of flamegraph.pl or speedscope
+        - profile_summary.txt: self and total samples per function and tracemalloc allocation hot spots
+    """
+
+    def __init__(
+            self,
+            output_dir: str,
+            max_seconds: float | None = None,
+            max_chunks: int | None = None,
+            interval: float = SAMPLE_INTERVAL,
+            trace_memory: bool = True,
+    ) -> None:
+        self.output_dir = output_dir
+        self.max_seconds = max_seconds
+        self.max_chunks = max_chunks
+        self.interval = interval
+        self.trace_memory = trace_memory
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.chunks = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._started_at = 0.0
+        self._elapsed = 0.0
+        self._snapshot: tracemalloc.Snapshot | None = None
+
+    def start(self) -> None:
+        if self.trace_memory:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def chunk_done(self) -> None:
+        """Counts a processed chunk, stops once max_chunks are done"""
+        self.chunks += 1
+        if self.max_chunks is not None and self.chunks >= self.max_chunks:
+            self.stop()
+
+    def stop(self) -> None:
+        """Stops sampling and writes the results. Safe to call several times"""
+        with self._lock:
+            if self._stop.is_set():
+                return
+            self._stop.set()
+            self._elapsed = time.perf_counter() - self._started_at
+            if self.trace_memory and tracemalloc.is_tracing():
+                self._snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.write()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            if self.max_seconds is not None and time.perf_counter() - self._started_at >= self.max_seconds:
+                threading.Thread(target=self.stop, name="profiler-stop").start()
+                return
+
+    def function_stats(self) -> List[tuple]:
+        """Returns [(function, self samples, total samples)] sorted by self samples"""
+        self_samples: Dict[str, int] = Counter()
+        total_samples: Dict[str, int] = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]  # Without the thread name
+            if not frames:
+                continue
+            self_samples[frames[-1]] += count
+            for function in set(frames):
+                total_samples[function] += count
+        return sorted(
+            ((function, self_samples[function], total) for function, total in total_samples.items()),
+            key=lambda row: (row[1], row[2]),
+            reverse=True,
+        )
+
+    def summary(self) -> str:
+        total = sum(self.stacks.values()) or 1
+        lines = [
+            f"Profiled {self._elapsed:.1f}s, {self.samples} samples every {self.interval * 1000:.0f}ms, "
+            f"{self.chunks} chunks",
+            "",
+            f"{'self %':>8} {'total %':>8}  function",
+        ]
+        for function, self_count, total_count in self.function_stats()[:SUMMARY_TOP]:
+            lines.append(f"{self_count / total:>8.1%} {total_count / total:>8.1%}  {function}")
+
+        if self._snapshot is not None:
+            lines += ["", "Allocation hot spots (live at the end of the profile)", f"{'size KiB':>10} {'blocks':>9}  line"]
+            snapshot = self._snapshot.filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ])
+            for stat in snapshot.statistics("lineno")[:ALLOCATIONS_TOP]:
+                frame = stat.traceback[0]
+                lines.append(f"{stat.size / 1024:>10.1f} {stat.count:>9}  {frame.filename}:{frame.lineno}")
+        return "\n".join(lines) + "\n"
+
+    def write(self) -> List[str]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        collapsed_path = os.path.join(self.output_dir, "profile.collapsed")
+        summary_path = os.path.join(self.output_dir, "profile_summary.txt")
+        with open(collapsed_path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(summary_path, "w") as f:
+            f.write(self.summary())
+        return [collapsed_path, summary_path]
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Set, Tuple
+
+from src.models import TransferModel
+from src.constants import NULL_ADDRESS
+
+logger = logging.getLogger()
+
+RollupKey = Tuple[str, datetime]  # (period, bucket_start)
+WalletDay = Tuple[datetime, bool, str]  # (day, is_sender, wallet_address)
+
+
+def bucket_start(block_time: datetime, period: str) -> datetime:
+    """Returns the start of the hour or day bucket containing block_time"""
+    if period == "hour":
+        return block_time.replace(minute=0, second=0, microsecond=0)
+    if period == "day":
+        return block_time.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown rollup period {period}")
+
+
+def rollup_transfers(
+        transfers: Iterable[TransferModel], periods: Iterable[str] = ("hour", "day")
+) -> Tuple[Dict[RollupKey, List], Set[WalletDay]]:
+    """Aggregates transfers by block time bucket.
+
+    :param transfers: transfers of a single token
+    :param periods: bucket sizes to aggregate
+    :return : ({(period, bucket_start): [volume, count]}, {(day, is_sender, wallet_address)}). The NULL_ADDRESS
+        of mints and burns is not counted as a sender or receiver
+    """
+    periods = tuple(periods)
+    buckets = {}
+    wallet_days = set()
+    skipped = 0
+    for transfer in transfers:
+        if transfer.block_time is None:
+            skipped += 1
+            continue
+        for period in periods:
+            bucket = buckets.setdefault((period, bucket_start(transfer.block_time, period)), [Decimal(0), 0])
+            bucket[0] += transfer.value
+            bucket[1] += 1
+        day = bucket_start(transfer.block_time, "day")
+        if transfer.tx_from != NULL_ADDRESS:
+            wallet_days.add((day, True, transfer.tx_from))
+        if transfer.tx_to != NULL_ADDRESS:
+            wallet_days.add((day, False, transfer.tx_to))
+
+    if skipped:
+        logger.warning(f"{skipped} transfers without block_time left out of the rollups")
+    return buckets, wallet_days
@@ -0,0 +1,59 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+
+class RPCStub:
+    """Local JSON-RPC server answering every call, batched or not, with answer(method, params).
+
+    posts counts the HTTP requests and calls the JSON-RPC calls received. The first `throttled` requests are
+    answered with a 429. Call close() once done, e.g. with addCleanup
+    """
+
+    def __init__(self, answer: Callable[[str, list], Any], throttled: int = 0) -> None:
+        self.answer = answer
+        self.throttled = throttled
+        self.posts = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                stub._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handle(self, request: BaseHTTPRequestHandler) -> None:
+        payload = json.loads(request.rfile.read(int(request.headers["Content-Length"])))
+        calls = payload if isinstance(payload, list) else [payload]
+        with self._lock:
+            self.posts += 1
+            throttled = self.posts <= self.throttled
+            if not throttled:
+                self.calls += len(calls)
+        if throttled:
+            request.send_response(429)
+            request.end_headers()
+            return
+
+        results = [
+            {"jsonrpc": "2.0", "id": call["id"], "result": self.answer(call["method"], call["params"])}
+            for call in calls
+        ]
+        response = json.dumps(results if isinstance(payload, list) else results[0]).encode()
+        request.send_response(200)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(response)))
+        request.end_headers()
+        request.wfile.write(response)
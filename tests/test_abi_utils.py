@@ -0,0 +1,103 @@
+import unittest
+
+from src.utils import abi_utils
+from src.constants import (
+    TRANSFER_TOPIC,
+    ERC20_TRANSFER_EVENT,
+    ERC721_TRANSFER_EVENT,
+    ERC1155_TRANSFER_BATCH_EVENT,
+    STANDARD_EVENTS,
+)
+
+
+def word(value: int) -> str:
+    return format(value, "064x")
+
+
+class TestEventDecoder(unittest.TestCase):
+    """Test precompiled event decoders"""
+
+    sender = "0x20dc3024213990d0cae48313da541459648a9483"
+    receiver = "0x861ff4c1aa2591dac7b24a0e80631f77f59a06dc"
+
+    def topic_address(self, address: str) -> str:
+        return "0x" + "0" * 24 + address[2:]
+
+    def test_topic(self):
+        self.assertEqual(abi_utils.event_topic(ERC20_TRANSFER_EVENT), TRANSFER_TOPIC)
+        self.assertEqual(abi_utils.event_signature(ERC20_TRANSFER_EVENT), "Transfer(address,address,uint256)")
+
+    def test_compile_is_cached(self):
+        self.assertIs(abi_utils.compile_event(ERC20_TRANSFER_EVENT), abi_utils.compile_event(dict(ERC20_TRANSFER_EVENT)))
+
+    def test_erc20_transfer(self):
+        decoder = abi_utils.compile_event(ERC20_TRANSFER_EVENT)
+        args = decoder.decode(
+            [TRANSFER_TOPIC, self.topic_address(self.sender), self.topic_address(self.receiver)],
+            "0x" + word(2000000000),
+        )
+        self.assertEqual(args, {"from": self.sender, "to": self.receiver, "value": 2000000000})
+
+    def test_registry_tells_erc721_apart(self):
+        registry = abi_utils.EventDecoderRegistry(STANDARD_EVENTS)
+        name, args = registry.decode(
+            [TRANSFER_TOPIC, self.topic_address(self.sender), self.topic_address(self.receiver), "0x" + word(7204)],
+            "0x",
+        )
+        self.assertEqual(name, "Transfer")
+        self.assertEqual(args["tokenId"], 7204)
+        self.assertIs(registry.get(TRANSFER_TOPIC, 4), abi_utils.compile_event(ERC721_TRANSFER_EVENT))
+
+    def test_erc1155_transfer_batch(self):
+        decoder = abi_utils.compile_event(ERC1155_TRANSFER_BATCH_EVENT)
+        data = "0x" + word(64) + word(160) + word(2) + word(1) + word(2) + word(2) + word(10) + word(20)
+        args = decoder.decode(
+            [decoder.topic, self.topic_address(self.sender), self.topic_address(self.sender), self.topic_address(self.receiver)],
+            data,
+        )
+        self.assertEqual(args["ids"], [1, 2])
+        self.assertEqual(args["values"], [10, 20])
+        self.assertEqual(args["to"], self.receiver)
+
+    def test_custom_event(self):
+        event_abi = {
+            "type": "event",
+            "name": "Memo",
+            "anonymous": False,
+            "inputs": [
+                {"name": "author", "type": "address", "indexed": True},
+                {"name": "delta", "type": "int256", "indexed": False},
+                {"name": "text", "type": "string", "indexed": False},
+                {"name": "flag", "type": "bool", "indexed": False},
+            ],
+        }
+        decoder = abi_utils.compile_event(event_abi)
+        text = "hello".encode().hex().ljust(64, "0")
+        data = "0x" + word((1 << 256) - 5) + word(96) + word(1) + word(5) + text
+        args = decoder.decode([decoder.topic, self.topic_address(self.sender)], data)
+        self.assertEqual(args, {"author": self.sender, "delta": -5, "text": "hello", "flag": True})
+
+    def test_unknown_event(self):
+        registry = abi_utils.EventDecoderRegistry(STANDARD_EVENTS)
+        with self.assertRaises(Exception):
+            registry.decode(["0x" + word(1)], "0x")
+
+    def test_decode_raw_bytes(self):
+        decoder = abi_utils.compile_event(ERC20_TRANSFER_EVENT)
+        topics = [TRANSFER_TOPIC, self.topic_address(self.sender), self.topic_address(self.receiver)]
+        from_hex = decoder.decode(topics, "0x" + word(148667304358))
+        from_bytes = decoder.decode(topics, bytes.fromhex(word(148667304358)))
+        self.assertEqual(from_hex, from_bytes)
+
+
+class TestWordViews(unittest.TestCase):
+    """Test bytes-native word helpers"""
+
+    def test_split_to_word_views(self):
+        data = "0x" + word(1) + "0" * 24 + "861ff4c1aa2591dac7b24a0e80631f77f59a06dc" + "f" * 64
+        words = abi_utils.split_to_word_views(data)
+        self.assertEqual(len(words), 3)
+        self.assertEqual(abi_utils.view_to_uint(words[0]), 1)
+        self.assertEqual(abi_utils.view_to_address(words[1]), "0x861ff4c1aa2591dac7b24a0e80631f77f59a06dc")
+        self.assertEqual(abi_utils.view_to_int(words[2]), -1)
+        self.assertEqual(["0x" + w.hex() for w in words], abi_utils.split_to_words(data))
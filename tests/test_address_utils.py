@@ -0,0 +1,33 @@
+import unittest
+
+from src.utils.address_utils import AddressInterner, address_to_bytes, bytes_to_address, intern_address
+
+
+class TestAddressUtils(unittest.TestCase):
+    """Test address bytes conversion and interning"""
+
+    checksum = "0xdAC17F958D2ee523a2206206994597C13D831ec7"
+    lower = "0xdac17f958d2ee523a2206206994597c13d831ec7"
+
+    def test_round_trip(self):
+        raw = address_to_bytes(self.checksum)
+        self.assertEqual(len(raw), 20)
+        self.assertEqual(bytes_to_address(raw), self.lower)
+        self.assertEqual(bytes_to_address(memoryview(raw)), self.lower)
+
+    def test_interning(self):
+        self.assertIs(intern_address(self.checksum), intern_address("".join(self.lower)))
+
+    def test_invalid(self):
+        interner = AddressInterner()
+        for address in ("dac17f958d2ee523a2206206994597c13d831ec7", self.lower[:-2], self.lower + "00",
+                        "0x" + "zz" * 20, "0x" + "0 " * 20):
+            with self.assertRaises(ValueError):
+                interner.get(address)
+        self.assertEqual(len(interner), 0)
+
+    def test_bounded(self):
+        interner = AddressInterner(max_size=2)
+        for i in range(5):
+            interner.get("0x" + format(i, "040x"))
+        self.assertEqual(len(interner), 2)
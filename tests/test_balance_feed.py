@@ -0,0 +1,37 @@
+import json
+import unittest
+from decimal import Decimal
+
+from src.utils.balance_feed import encode_balance_changes, decode_balance_changes
+
+TOKEN = "0xdac17f958d2ee523a2206206994597c13d831ec7"
+
+
+class TestBalanceFeed(unittest.TestCase):
+    """Test balance change notification payloads"""
+
+    def test_round_trip(self):
+        changes = {
+            "0x20dc3024213990d0cae48313da541459648a9483": (Decimal("1.000000000000000001"), 100),
+            "0x861ff4c1aa2591dac7b24a0e80631f77f59a06dc": (Decimal(0), 101),
+        }
+        payloads = encode_balance_changes(1, TOKEN, changes)
+        self.assertEqual(len(payloads), 1)
+        decoded = decode_balance_changes(payloads[0])
+        self.assertEqual(
+            {change.wallet_address: (change.balance, change.block_num) for change in decoded},
+            changes,
+        )
+        self.assertEqual({(change.chain_id, change.token_address) for change in decoded}, {(1, TOKEN)})
+
+    def test_split_under_limit(self):
+        changes = {"0x" + format(i, "040x"): (Decimal(i).scaleb(-18), 100) for i in range(500)}
+        payloads = encode_balance_changes(1, TOKEN, changes, limit=2000)
+        self.assertGreater(len(payloads), 1)
+        for payload in payloads:
+            self.assertLessEqual(len(payload), 2000)
+            json.loads(payload)
+        self.assertEqual(sum(len(decode_balance_changes(payload)) for payload in payloads), 500)
+
+    def test_empty(self):
+        self.assertEqual(encode_balance_changes(1, TOKEN, {}), [])
@@ -0,0 +1,55 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from src.providers import AlchemyProvider
+from src.utils.lru_cache import LRUCache
+from src.constants import COMPUTE_UNITS
+from tests.rpc_stub import RPCStub
+
+
+class TestLRUCacheClass(unittest.TestCase):
+    """Test LRUCache Class"""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put(1, "a")
+        cache.put(2, "b")
+        cache.get(1)
+        cache.put(3, "c")
+        self.assertIn(1, cache)
+        self.assertNotIn(2, cache)
+        self.assertEqual(len(cache), 2)
+
+
+class TestBlockTimes(unittest.TestCase):
+    """Test AlchemyProvider batched and cached block timestamps"""
+
+    def setUp(self) -> None:
+        # eth_getBlockByNumber with timestamp = 1000 * block number
+        self.rpc = RPCStub(lambda method, params: {"timestamp": hex(int(params[0], 16) * 1000)})
+        self.addCleanup(self.rpc.close)
+        self.provider = AlchemyProvider(1, self.rpc.url, "", "", compute_units_per_second=10000)
+
+    def test_one_call_per_unique_block(self):
+        block_times = self.provider.get_block_times([10, 10, 11, 12, 12, 12])
+        self.assertEqual(block_times[11], datetime.utcfromtimestamp(11000))
+        self.assertEqual(self.rpc.posts, 1)
+        self.assertEqual(self.rpc.calls, 3)
+
+    def test_cache_hits(self):
+        self.provider.get_block_times([10, 11])
+        block_times = self.provider.get_block_times([10, 11, 13])
+        self.assertEqual(len(block_times), 3)
+        self.assertEqual(self.rpc.posts, 2)
+        self.assertEqual(self.rpc.calls, 3)
+
+    def test_batch_charged_per_call(self):
+        provider = AlchemyProvider(1, self.rpc.url, "", "", compute_units_per_second=330)
+        limiter = provider._pool.endpoints[0].limiter
+        with patch.object(limiter, "acquire", wraps=limiter.acquire) as acquire:
+            provider.get_block_times(range(100))
+        charged = sum(call.args[0] for call in acquire.call_args_list)
+        self.assertEqual(charged, 100 * COMPUTE_UNITS["eth_getBlockByNumber"])
+        # 1600 CU for a 330 CU bucket: the next call waits the debt off, about 4 seconds
+        self.assertGreater(limiter.try_acquire(1), 3)
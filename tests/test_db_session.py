@@ -0,0 +1,134 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from src.db import DBSession
+from src.db.schemas import IndexerState
+from src.db.db_utils import _parse_replicas
+from src.utils.address_utils import address_to_bytes
+
+TOKENS = ["0xdac17f958d2ee523a2206206994597c13d831ec7", "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"]
+
+
+def _engine(positions):
+    engine = create_engine("sqlite://", future=True)
+    IndexerState.__table__.create(engine)
+    with engine.begin() as conn:
+        for chain_id, token, last_block, *version in positions:
+            conn.execute(
+                text("INSERT INTO indexer_state (chain_id, token_address, last_block, version) VALUES (:c, :t, :b, :v)"),
+                {"c": chain_id, "t": address_to_bytes(token), "b": last_block, "v": version[0] if version else 1},
+            )
+    return engine
+
+
+def _read_engine(*args, **kwargs):
+    with DBSession.read_connection(*args, **kwargs) as conn:
+        return conn.engine
+
+
+def _read_bind(*args, **kwargs):
+    with DBSession.read_session(*args, **kwargs) as session:
+        return session.get_bind()
+
+
+class TestDBSessionRouting(unittest.TestCase):
+    """Test the routing of the reads between the primary and the replicas"""
+
+    def route(self, replicas, max_lag=0):
+        primary = _engine([(1, TOKENS[0], 100), (1, TOKENS[1], 200), (137, TOKENS[0], 50)])
+        state = patch.multiple(
+            DBSession,
+            _engine=primary,
+            _sessionmaker=sessionmaker(primary),
+            _replica_engines=replicas,
+            _replica_sessionmakers=[sessionmaker(replica) for replica in replicas],
+            _positions_checked_at=float("-inf"),
+        )
+        state.start()
+        self.addCleanup(state.stop)
+        setting = patch("src.db.db_utils.settings.POSTGRES_REPLICA_MAX_LAG", max_lag)
+        setting.start()
+        self.addCleanup(setting.stop)
+        return primary
+
+    def test_parse_replicas(self):
+        with patch("src.db.db_utils.settings.POSTGRES_PORT", 5432):
+            self.assertEqual(_parse_replicas("replica-1, replica-2:5433,"), [("replica-1", 5432), ("replica-2", 5433)])
+        self.assertEqual(_parse_replicas(""), [])
+
+    def test_no_replicas(self):
+        primary = self.route([])
+        self.assertIs(_read_engine(1, TOKENS[0]), primary)
+        self.assertIs(_read_bind(1, TOKENS[0]), primary)
+
+    def test_caught_up_replicas_round_robin(self):
+        replicas = [_engine([(1, TOKENS[0], 100), (1, TOKENS[1], 200)]) for _ in range(2)]
+        self.route(replicas)
+        engines = {_read_engine(1, TOKENS[0].upper().replace("0X", "0x")) for _ in range(4)}
+        self.assertEqual(engines, set(replicas))
+        self.assertIn(_read_bind(1, TOKENS[1]), replicas)
+
+    def test_lagging_replica_falls_back(self):
+        lagging = _engine([(1, TOKENS[0], 100), (1, TOKENS[1], 199)])
+        primary = self.route([lagging])
+        self.assertIs(_read_engine(1, TOKENS[0]), lagging)
+        self.assertIs(_read_engine(1, TOKENS[1]), primary)
+        # A cross-token read needs every token of the chain
+        self.assertIs(_read_engine(1), primary)
+        # Not replicated yet
+        self.assertIs(_read_engine(137, TOKENS[0]), primary)
+        # Never indexed on the primary either
+        self.assertIs(_read_engine(10, TOKENS[0]), lagging)
+
+    def test_rebuilt_token_falls_back(self):
+        # Same block, but the primary rebuilt or compacted the token since
+        stale = _engine([(1, TOKENS[0], 100, 0), (1, TOKENS[1], 200)])
+        primary = self.route([stale])
+        self.assertIs(_read_engine(1, TOKENS[0]), primary)
+        self.assertIs(_read_engine(1, TOKENS[1]), stale)
+
+    def test_max_lag(self):
+        lagging = _engine([(1, TOKENS[0], 100), (1, TOKENS[1], 199), (137, TOKENS[0], 50)])
+        self.route([lagging], max_lag=1)
+        self.assertIs(_read_engine(1), lagging)
+
+    def test_unreachable_replica_skipped(self):
+        unreachable = create_engine("sqlite://", future=True)  # no indexer_state table
+        caught_up = _engine([(1, TOKENS[0], 100)])
+        self.route([unreachable, caught_up])
+        with self.assertLogs(level="WARNING"):
+            engines = {_read_engine(1, TOKENS[0]) for _ in range(2)}
+        self.assertEqual(engines, {caught_up})
+
+    def test_positions_cached(self):
+        replica = _engine([(1, TOKENS[0], 100)])
+        primary = self.route([replica])
+        self.assertIs(_read_engine(1, TOKENS[0]), replica)
+        with primary.begin() as conn:
+            conn.execute(text("UPDATE indexer_state SET last_block = 101"))
+        self.assertIs(_read_engine(1, TOKENS[0]), replica)
+        DBSession._positions_checked_at = float("-inf")
+        self.assertIs(_read_engine(1, TOKENS[0]), primary)
+
+    def test_expected_position_checked_on_the_replica(self):
+        replica = _engine([(1, TOKENS[0], 100), (1, TOKENS[1], 200)])
+        primary = self.route([replica], max_lag=5)
+        self.assertIs(_read_engine(1, TOKENS[0], {TOKENS[0]: (100, 1)}), replica)
+        self.assertIs(_read_bind(1, TOKENS[0], {TOKENS[0]: (100, 1)}), replica)
+
+        # The primary moved on since the positions were checked: the cached snapshot still trusts the replica
+        with primary.begin() as conn:
+            conn.execute(text("UPDATE indexer_state SET last_block = 101, version = 2 WHERE last_block = 100"))
+        self.assertIs(_read_engine(1, TOKENS[0]), replica)
+        self.assertIs(_read_engine(1, TOKENS[0], {TOKENS[0]: (101, 2)}), primary)
+        self.assertIs(_read_bind(1, TOKENS[0], {TOKENS[0]: (101, 2)}), primary)
+        # The tolerated lag doesn't apply to an expected position
+        self.assertIs(_read_engine(1, TOKENS[0], {TOKENS[0]: (100, 2)}), primary)
+        self.assertIs(_read_engine(1, expected={TOKENS[0]: (100, 1), TOKENS[1]: (201, 1)}), primary)
+
+        with replica.begin() as conn:
+            conn.execute(text("UPDATE indexer_state SET last_block = 102, version = 2 WHERE last_block = 100"))
+        self.assertIs(_read_engine(1, TOKENS[0], {TOKENS[0]: (101, 2)}), replica)
@@ -0,0 +1,33 @@
+import csv
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+from src.utils.export_writers import CSVChunkedWriter
+
+COLUMNS = [("block_num", "int"), ("tx_from", "address"), ("value", "decimal"), ("block_time", "datetime")]
+
+
+class TestCSVChunkedWriter(unittest.TestCase):
+    """Test CSVChunkedWriter Class"""
+
+    def test_splits_files(self):
+        address = bytes.fromhex("861ff4c1aa2591dac7b24a0e80631f77f59a06dc")
+        rows = [(i, address, Decimal("1.5"), datetime(2023, 1, 1)) for i in range(7)]
+        with tempfile.TemporaryDirectory() as output_dir:
+            writer = CSVChunkedWriter(output_dir, "transfers", COLUMNS, rows_per_file=3)
+            writer.write(rows[:2])
+            writer.write(rows[2:])
+            files = writer.close()
+
+            self.assertEqual([os.path.basename(file) for file in files], [
+                "transfers_00000.csv", "transfers_00001.csv", "transfers_00002.csv"
+            ])
+            with open(files[0]) as f:
+                content = list(csv.reader(f))
+            self.assertEqual(content[0], ["block_num", "tx_from", "value", "block_time"])
+            self.assertEqual(content[1], ["0", "0x861ff4c1aa2591dac7b24a0e80631f77f59a06dc", "1.5", "2023-01-01 00:00:00"])
+            self.assertEqual(len(content), 4)
+            self.assertEqual(writer.rows, 7)
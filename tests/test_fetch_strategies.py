@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+
+from src.parsers import TokenParser
+from src.providers import AlchemyProvider, AutoFetchStrategy, get_fetch_strategy
+from src.providers.fetch_strategies import LogsStrategy, ReceiptsStrategy, AssetTransfersStrategy
+from src.providers.stand_in_node import StandInNode
+from src.constants import FETCH_STRATEGIES
+
+TOKENS = ["0xdac17f958d2ee523a2206206994597c13d831ec7", "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"]
+
+
+class TestFetchStrategies(unittest.IsolatedAsyncioTestCase):
+    """Test the log fetch strategies against a local stand-in node"""
+
+    async def asyncSetUp(self) -> None:
+        self.node = StandInNode(TOKENS, transfers_per_second=3, history_blocks=300, start_block=1000)
+        self.runner = await self.node.serve()
+        host, port = self.runner.addresses[0][:2]
+        self.provider = AlchemyProvider(
+            1, f"http://{host}:{port}/", f"ws://{host}:{port}/", "", compute_units_per_second=1e9
+        )
+        self.token = self.provider.checksum_address(TOKENS[0])
+
+    async def asyncTearDown(self) -> None:
+        await self.runner.cleanup()
+
+    async def fetch(self, strategy, start_block: int, end_block: int):
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.provider.get_transfer_logs, self.token, start_block, end_block, strategy
+        )
+
+    async def test_identical_transfers(self):
+        start_block, end_block = self.node.first_block, self.node.head
+        transfers = {}
+        for name in FETCH_STRATEGIES + ("auto",):
+            logs = await self.fetch(get_fetch_strategy(name), start_block, end_block)
+            transfers[name] = [
+                (TokenParser().decode_log(log).dict(), log.block_time) for log in logs
+            ]
+
+        self.assertTrue(transfers["logs"])
+        self.assertTrue(all(block_time for _, block_time in transfers["logs"]))
+        for name in FETCH_STRATEGIES[1:] + ("auto",):
+            self.assertEqual(transfers[name], transfers["logs"], name)
+
+    def test_auto_chooses_by_cost(self):
+        dense = AutoFetchStrategy()
+        dense.density = 2000
+        # Round trips dominate on an unthrottled node, compute units on the free tier
+        self.assertIsInstance(dense.choose(1000, compute_units_per_second=1e9), ReceiptsStrategy)
+        self.assertIsInstance(dense.choose(1000, compute_units_per_second=330), LogsStrategy)
+        # A single eth_getBlockReceipts (500 CU) never fits in a 330 CU bucket
+        self.assertNotIsInstance(
+            dense.choose(1000, compute_units_per_second=1e9, compute_units_capacity=330), ReceiptsStrategy
+        )
+
+        # No block header lookups
+        sparse = AutoFetchStrategy()
+        sparse.density = 0.001
+        self.assertIsInstance(sparse.choose(100000, compute_units_per_second=330), AssetTransfersStrategy)
+
+    async def test_receipts_batches_fit_the_bucket(self):
+        provider = AlchemyProvider(1, self.provider._url, "", "", compute_units_per_second=1200)
+        with patch.object(provider, "batch_call", return_value=[[]] * 5) as batch_call:
+            provider.get_block_receipts(range(5))
+        self.assertEqual(batch_call.call_args.kwargs["batch_size"], 2)
+
+        provider = AlchemyProvider(1, self.provider._url, "", "", compute_units_per_second=330)
+        with patch.object(provider, "batch_call", return_value=[[]] * 5) as batch_call:
+            provider.get_block_receipts(range(5))
+        self.assertEqual(batch_call.call_args.kwargs["batch_size"], 1)
+
+    async def test_auto_drops_unsupported_method(self):
+        auto = AutoFetchStrategy(sample_blocks=10)
+        unsupported = ValueError({"code": -32601, "message": "the method eth_getBlockReceipts does not exist"})
+        with patch.object(auto, "choose", return_value=auto.candidates[1]), \
+                patch.object(self.provider, "get_block_receipts", side_effect=unsupported):
+            logs = await self.fetch(auto, self.node.first_block, self.node.head)
+
+        expected = await self.fetch(LogsStrategy(), self.node.first_block, self.node.head)
+        self.assertEqual(logs, expected)
+        self.assertNotIn("receipts", [candidate.name for candidate in auto.candidates])
+        self.assertEqual(auto.ranges, {"logs": 1})
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            get_fetch_strategy("trace")
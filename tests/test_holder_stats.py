@@ -0,0 +1,41 @@
+import unittest
+from decimal import Decimal
+
+from src.utils.holder_stats import balance_bucket, holder_delta, holder_buckets
+
+
+class TestHolderStats(unittest.TestCase):
+    """Test incremental holder stats helpers"""
+
+    def test_balance_bucket(self):
+        self.assertEqual(balance_bucket(Decimal("1")), 0)
+        self.assertEqual(balance_bucket(Decimal("999.5")), 2)
+        self.assertEqual(balance_bucket(Decimal("0.05")), -2)
+        self.assertEqual(balance_bucket(Decimal("1E-30")), -6)
+
+    def test_new_holder(self):
+        self.assertEqual(holder_delta(Decimal(0), Decimal(50)), (1, {1: 1}))
+
+    def test_holder_leaves(self):
+        self.assertEqual(holder_delta(Decimal(50), Decimal(0)), (-1, {1: -1}))
+
+    def test_same_bucket(self):
+        self.assertEqual(holder_delta(Decimal(50), Decimal(60)), (0, {}))
+
+    def test_bucket_move(self):
+        self.assertEqual(holder_delta(Decimal(50), Decimal(500)), (0, {1: -1, 2: 1}))
+
+    def test_incremental_matches_full(self):
+        balances = [Decimal(0)] * 4
+        holders = 0
+        buckets = {}
+        for wallet, value in [(0, 100), (1, 5), (0, -60), (2, 1000), (1, -5), (3, -2)]:
+            old = balances[wallet]
+            balances[wallet] += Decimal(value)
+            delta, bucket_deltas = holder_delta(old, balances[wallet])
+            holders += delta
+            for bucket, bucket_delta in bucket_deltas.items():
+                buckets[bucket] = buckets.get(bucket, 0) + bucket_delta
+        full_holders, full_buckets = holder_buckets(balances)
+        self.assertEqual(holders, full_holders)
+        self.assertEqual({b: h for b, h in buckets.items() if h}, full_buckets)
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import threading
+import unittest
+from unittest.mock import patch
+
+import websockets
+
+from src.providers import AlchemyProvider
+from src.models import ChainConfigModel
+from src.services import IndexerService, MultiChainService
+from src.constants import TRANSFER_TOPIC
+
+TOKENS = ["0xdac17f958d2ee523a2206206994597c13d831ec7", "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"]
+
+
+def log_notification(address: str, block_num: int, log_index: int, removed: bool = False) -> str:
+    return json.dumps({
+        "jsonrpc": "2.0",
+        "method": "eth_subscription",
+        "params": {
+            "subscription": "0x1",
+            "result": {
+                "address": address,
+                "blockHash": "0x" + "00" * 32,
+                "blockNumber": hex(block_num),
+                "data": "0x" + format(1, "064x"),
+                "logIndex": hex(log_index),
+                "removed": removed,
+                "topics": [TRANSFER_TOPIC, "0x" + "00" * 32, "0x" + "00" * 32],
+                "transactionHash": "0x" + "00" * 32,
+            },
+        },
+    })
+
+
+class TestIndexerFollow(unittest.IsolatedAsyncioTestCase):
+    """Test IndexerService following several tokens from a local logs subscription"""
+
+    async def asyncSetUp(self) -> None:
+        self.subscriptions = []
+
+        async def handler(ws, *args):
+            self.subscriptions.append(json.loads(await ws.recv()))
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": 1, "result": "0x1"}))
+            for message in [
+                log_notification(TOKENS[0], 10, 0),
+                log_notification(TOKENS[1], 10, 1),
+                log_notification(TOKENS[0], 10, 2),
+                log_notification(TOKENS[1], 10, 1, removed=True),
+            ]:
+                await ws.send(message)
+            await ws.wait_closed()
+
+        self.server = await websockets.serve(handler, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.provider = AlchemyProvider(1, "http://127.0.0.1:1/", f"ws://127.0.0.1:{port}", "")
+
+    async def asyncTearDown(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def follow(self, caught_up):
+        service = IndexerService(1, self.provider)
+        batches = []
+
+        def apply(logs, ends_block):
+            batches.append(([(log.address, log.log_index) for log in logs], ends_block))
+
+        with patch.object(service, "_catch_up_to_head", return_value=caught_up), \
+                patch.object(service, "_decode_and_apply", side_effect=apply):
+            task = asyncio.create_task(service.follow(TOKENS, max_concurrency=2))
+            while sum(len(batch) for batch, _ in batches) < 3 - len(caught_up) * 2:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        return batches
+
+    async def test_one_subscription_batches_per_token(self):
+        batches = await self.follow({})
+
+        self.assertEqual(len(self.subscriptions), 1)
+        self.assertEqual(self.subscriptions[0]["params"][1]["address"], TOKENS)
+        applied = sorted(entry for batch, _ in batches for entry in batch)
+        self.assertEqual(applied, sorted([(TOKENS[0], 0), (TOKENS[0], 2), (TOKENS[1], 1)]))
+        for batch, ends_block in batches:
+            # Batches never mix tokens
+            self.assertEqual(len({address for address, _ in batch}), 1)
+            # No later block seen yet, block 10 may have more logs
+            self.assertFalse(ends_block)
+
+    async def test_caught_up_blocks_dropped(self):
+        batches = await self.follow({TOKENS[0]: 10})
+        self.assertEqual([batch for batch, _ in batches], [[(TOKENS[1], 1)]])
+
+
+class TestMultiChainExecutors(unittest.IsolatedAsyncioTestCase):
+    """Test MultiChainService keeping the live writes off the threads of the catch-ups"""
+
+    @staticmethod
+    def chain(chain_id: int) -> ChainConfigModel:
+        return ChainConfigModel(
+            chain_id=chain_id,
+            provider_url="http://127.0.0.1:1/",
+            provider_websocket="ws://127.0.0.1:1",
+            provider_key="",
+            tokens=[TOKENS[0]],
+        )
+
+    async def test_live_writes_while_catch_ups_block(self):
+        release = threading.Event()
+        catch_up_threads = set()
+        backfilling = set()
+        write_threads = set()
+        written = asyncio.Event()
+
+        def catch_up(chain, *args):
+            catch_up_threads.add(threading.get_ident())
+            # Chain 1 is caught up, the others backfill until released
+            if chain.chain_id != 1:
+                backfilling.add(chain.chain_id)
+                release.wait(10)
+
+        async def follow(service, tokens, max_concurrency, catch_up_executor):
+            loop = asyncio.get_running_loop()
+            # Writes once chains 2 and 3 hold every catch-up thread
+            while len(backfilling) < 2:
+                await asyncio.sleep(0.01)
+            for _ in range(5):
+                await loop.run_in_executor(None, lambda: write_threads.add(threading.get_ident()))
+            written.set()
+            await asyncio.Event().wait()
+
+        service = MultiChainService(
+            [self.chain(1), self.chain(2), self.chain(3)], max_workers=3, storage=object(), catch_up_workers=2
+        )
+        with patch.object(service, "_catch_up", side_effect=catch_up), \
+                patch.object(IndexerService, "follow", autospec=True, side_effect=follow):
+            task = asyncio.create_task(service.run())
+            try:
+                await asyncio.wait_for(written.wait(), 5)
+                self.assertFalse(write_threads & catch_up_threads)
+            finally:
+                release.set()
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+
+    def test_catch_up_workers_below_max_workers(self):
+        with self.assertRaises(Exception):
+            MultiChainService([], max_workers=2, storage=object(), catch_up_workers=2)
@@ -0,0 +1,75 @@
+import unittest
+
+from src.providers import AlchemyProvider
+from src.utils.multicall import encode_aggregate3, decode_aggregate3
+from src.utils.abi_utils import view_to_uint
+from tests.rpc_stub import RPCStub
+
+TOKEN = "0x600000000a36f3cd48407e35eb7c5c910dc1f7a8"
+
+
+def word(value: int) -> bytes:
+    return value.to_bytes(32, "big")
+
+
+def decode_calls(calldata: bytes):
+    """Inverse of encode_aggregate3: [(target, callData)]"""
+    view = memoryview(calldata[4:])
+    count = view_to_uint(view[32:64])
+    calls = []
+    for i in range(count):
+        start = 64 + view_to_uint(view[64 + i * 32: 96 + i * 32])
+        target = bytes(view[start + 12: start + 32])
+        data_start = start + view_to_uint(view[start + 64: start + 96])
+        length = view_to_uint(view[data_start: data_start + 32])
+        calls.append((target, bytes(view[data_start + 32: data_start + 32 + length])))
+    return calls
+
+
+def encode_results(results):
+    """Encodes (bool success, bytes returnData)[]"""
+    tuples = [word(int(success)) + word(64) + word(len(data)) + data + b"\x00" * (-len(data) % 32) for success, data in results]
+    offsets = []
+    offset = 32 * len(tuples)
+    for encoded in tuples:
+        offsets.append(word(offset))
+        offset += len(encoded)
+    return word(32) + word(len(tuples)) + b"".join(offsets) + b"".join(tuples)
+
+
+def answer_balances_of(balances):
+    """Answers Multicall3 aggregate3 of balanceOf(wallet) with balances[wallet], failing for other wallets"""
+    def answer(method, params):
+        results = []
+        for target, data in decode_calls(bytes.fromhex(params[0]["data"][2:])):
+            wallet = "0x" + data[16:36].hex()
+            results.append((True, word(balances[wallet])) if wallet in balances else (False, b""))
+        return "0x" + encode_results(results).hex()
+    return answer
+
+
+class TestMulticallEncoding(unittest.TestCase):
+    """Test aggregate3 encoding"""
+
+    def test_round_trip(self):
+        calls = [(bytes(range(20)), b"\x70\xa0\x82\x31" + word(5)), (bytes(20), b"")]
+        self.assertEqual(decode_calls(encode_aggregate3(calls)), calls)
+
+    def test_decode_results(self):
+        results = [(True, word(10)), (False, b"")]
+        self.assertEqual(decode_aggregate3(encode_results(results)), results)
+
+
+class TestBalancesOf(unittest.TestCase):
+    """Test AlchemyProvider.get_balances_of against a local JSON-RPC stand-in"""
+
+    def test_thousands_of_wallets_per_request(self):
+        wallets = ["0x" + format(i, "040x") for i in range(1, 5001)]
+        rpc = RPCStub(answer_balances_of({wallet: i * 10 for i, wallet in enumerate(wallets)}))
+        self.addCleanup(rpc.close)
+        provider = AlchemyProvider(1, rpc.url, "", "", compute_units_per_second=100000)
+        missing = "0x" + "f" * 40
+        balances = provider.get_balances_of(TOKEN, wallets + [missing])
+        self.assertEqual(balances[:-1], [i * 10 for i in range(5000)])
+        self.assertIsNone(balances[-1])
+        self.assertEqual(rpc.posts, 1)
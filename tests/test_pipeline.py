@@ -0,0 +1,43 @@
+import time
+import unittest
+
+from src.utils.pipeline import Pipeline
+
+
+class TestPipelineClass(unittest.TestCase):
+    """Test Pipeline Class"""
+
+    def test_keeps_order(self):
+        written = []
+        pipeline = Pipeline(range(20), [("double", lambda x: x * 2), ("write", written.append)], queue_size=2)
+        stats = pipeline.run()
+        self.assertEqual(written, [x * 2 for x in range(20)])
+        self.assertEqual([stage.items for stage in stats], [20, 20, 20])
+
+    def test_stages_overlap(self):
+        def slow_source():
+            for i in range(5):
+                time.sleep(0.05)
+                yield i
+
+        def slow_write(item):
+            time.sleep(0.05)
+
+        st = time.time()
+        stats = Pipeline(slow_source(), [("write", slow_write)], queue_size=2).run()
+        # Serial would take 0.5s
+        self.assertLess(time.time() - st, 0.45)
+        self.assertGreater(stats[0].busy, 0.2)
+
+    def test_backpressure_blocks_source(self):
+        stats = Pipeline(range(10), [("write", lambda item: time.sleep(0.02))], queue_size=1).run()
+        self.assertGreater(stats[0].blocked, stats[0].busy)
+
+    def test_error_stops_pipeline(self):
+        def fail(item):
+            if item == 3:
+                raise ValueError("decode error")
+            return item
+
+        with self.assertRaises(ValueError):
+            Pipeline(iter(range(1000)), [("decode", fail), ("write", lambda item: None)], queue_size=2).run()
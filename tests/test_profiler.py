@@ -0,0 +1,62 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from src.utils.profiler import SamplingProfiler
+
+
+def busy_loop(seconds: float) -> int:
+    total = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """Test SamplingProfiler Class"""
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.dir.cleanup()
+
+    def test_collapsed_stacks_and_summary(self):
+        profiler = SamplingProfiler(self.dir.name, interval=0.002)
+        profiler.start()
+        worker = threading.Thread(target=busy_loop, args=(0.3,), name="worker")
+        worker.start()
+        worker.join()
+        profiler.stop()
+
+        with open(os.path.join(self.dir.name, "profile.collapsed")) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(any(line.startswith("worker;") and "busy_loop (test_profiler.py:" in line for line in lines))
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+
+        with open(os.path.join(self.dir.name, "profile_summary.txt")) as f:
+            summary = f.read()
+        self.assertIn("busy_loop", summary)
+        self.assertIn("Allocation hot spots", summary)
+
+    def test_stops_after_chunks(self):
+        profiler = SamplingProfiler(self.dir.name, max_chunks=2, trace_memory=False)
+        profiler.start()
+        profiler.chunk_done()
+        self.assertFalse(os.path.exists(os.path.join(self.dir.name, "profile.collapsed")))
+        profiler.chunk_done()
+        self.assertTrue(os.path.exists(os.path.join(self.dir.name, "profile.collapsed")))
+        profiler.stop()
+
+    def test_stops_after_seconds(self):
+        profiler = SamplingProfiler(self.dir.name, max_seconds=0.05, interval=0.005, trace_memory=False)
+        profiler.start()
+        time.sleep(0.3)
+        self.assertTrue(os.path.exists(os.path.join(self.dir.name, "profile_summary.txt")))
+        samples = profiler.samples
+        time.sleep(0.05)
+        self.assertEqual(profiler.samples, samples)
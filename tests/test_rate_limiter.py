@@ -0,0 +1,102 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from src.providers import AlchemyProvider, TokenBucket, Endpoint, EndpointPool, RateLimitException
+from src.providers.rate_limiter import is_rate_limit_error
+from tests.rpc_stub import RPCStub
+
+
+class TestTokenBucketClass(unittest.TestCase):
+    """Test TokenBucket Class"""
+
+    def test_burst_up_to_capacity(self):
+        bucket = TokenBucket(rate=100)
+        self.assertEqual(bucket.try_acquire(60), 0)
+        self.assertEqual(bucket.try_acquire(40), 0)
+        self.assertGreater(bucket.try_acquire(10), 0)
+
+    def test_acquire_waits_for_refill(self):
+        bucket = TokenBucket(rate=100)
+        bucket.acquire(100)
+        waited = bucket.acquire(20)
+        self.assertAlmostEqual(waited, 0.2, delta=0.1)
+
+    def test_cost_above_capacity_is_debt(self):
+        bucket = TokenBucket(rate=100)
+        self.assertEqual(bucket.acquire(150), 0)
+        # 50 tokens of debt plus the 10 of the call
+        self.assertAlmostEqual(bucket.acquire(10), 0.6, delta=0.1)
+
+    def test_pause(self):
+        bucket = TokenBucket(rate=1000)
+        bucket.pause(0.2)
+        self.assertGreater(bucket.try_acquire(1), 0.1)
+
+
+class TestEndpointPoolClass(unittest.TestCase):
+    """Test EndpointPool Class"""
+
+    def test_weighted_round_robin(self):
+        heavy = Endpoint("http://heavy", 100, weight=3)
+        light = Endpoint("http://light", 100, weight=1)
+        pool = EndpointPool([heavy, light])
+        picks = [pool.next() for _ in range(8)]
+        self.assertEqual(picks.count(heavy), 6)
+        self.assertEqual(picks.count(light), 2)
+
+    def test_failover(self):
+        first = Endpoint("http://first", 100)
+        second = Endpoint("http://second", 100)
+        pool = EndpointPool([first, second], cooldown=60)
+        pool.mark_failure(first)
+        self.assertEqual({pool.next() for _ in range(4)}, {second})
+
+    def test_health_check(self):
+        up = Endpoint("http://up", 100)
+        down = Endpoint("http://down", 100)
+        pool = EndpointPool([up, down], cooldown=60)
+
+        def probe(endpoint):
+            if endpoint is down:
+                raise ConnectionError("down")
+
+        self.assertEqual(pool.health_check(probe), 1)
+        self.assertFalse(down.healthy)
+
+    def test_rate_limit_error(self):
+        self.assertTrue(is_rate_limit_error(ValueError({"code": 429, "message": "Too Many Requests"})))
+        self.assertFalse(is_rate_limit_error(ValueError({"code": -32602, "message": "query returned more than 10000 results"})))
+
+
+class TestAlchemyProviderThrottling(unittest.TestCase):
+    """Test AlchemyProvider against a local stub returning 429s"""
+
+    def setUp(self) -> None:
+        # eth_blockNumber
+        self.rpc = RPCStub(lambda method, params: "0x10")
+        self.addCleanup(self.rpc.close)
+
+    def test_retries_throttled_calls(self):
+        self.rpc.throttled = 2
+        provider = AlchemyProvider(1, self.rpc.url, "", "", compute_units_per_second=1000)
+        st = time.time()
+        self.assertEqual(provider.get_latest_block_num(), 16)
+        self.assertEqual(self.rpc.posts, 3)
+        # Each 429 pauses the endpoint before retrying
+        self.assertGreaterEqual(time.time() - st, 1)
+
+    def test_throttled_call_fails_over(self):
+        self.rpc.throttled = 1
+        provider = AlchemyProvider(1, self.rpc.url, "", "", endpoints=[(self.rpc.url, 1)], compute_units_per_second=1000)
+        st = time.time()
+        self.assertEqual(provider.get_latest_block_num(), 16)
+        # The second endpoint answers without waiting for the first one to recover
+        self.assertLess(time.time() - st, 1)
+
+    def test_raises_rate_limit_exception(self):
+        self.rpc.throttled = 1000
+        provider = AlchemyProvider(1, self.rpc.url, "", "", compute_units_per_second=1000)
+        with patch("src.providers.alchemy.RATE_LIMIT_RETRIES", 1):
+            with self.assertRaises(RateLimitException):
+                provider.get_latest_block_num()
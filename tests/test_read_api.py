@@ -0,0 +1,117 @@
+import unittest
+from decimal import Decimal
+from unittest.mock import patch
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.api import ReadAPI, ResponseCache
+from src.models import BalanceModel, IndexerStateModel, TransferModel, PortfolioEntryModel
+
+TOKEN = "0x600000000a36f3cd48407e35eb7c5c910dc1f7a8"
+WALLET = "0x861ff4c1aa2591dac7b24a0e80631f77f59a06dc"
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test ResponseCache Class"""
+
+    def test_valid_only_for_position(self):
+        cache = ResponseCache(10)
+        etag = cache.put(TOKEN, "top_holders", 10, (100, 1), b"[]")
+        self.assertEqual(cache.get(TOKEN, "top_holders", 10, (100, 1)), (etag, b"[]"))
+        self.assertIsNone(cache.get(TOKEN, "top_holders", 10, (100, 2)))
+        self.assertIsNone(cache.get(TOKEN, "top_holders", 20, (100, 1)))
+
+
+class TestReadAPI(unittest.IsolatedAsyncioTestCase):
+    """Test ReadAPI caching against a mocked query layer"""
+
+    async def asyncSetUp(self) -> None:
+        self.state = IndexerStateModel(chain_id=1, token_address=TOKEN, last_block=100, version=1)
+        self.patches = [
+            patch("src.db.get_indexer_states", side_effect=lambda chain_id: [self.state]),
+            patch("src.db.get_token_top_holders", return_value=[
+                BalanceModel(chain_id=1, token_address=TOKEN, wallet_address=WALLET, balance=Decimal(5))
+            ]),
+        ]
+        self.states_mock, self.holders_mock = [p.start() for p in self.patches]
+        self.api = ReadAPI(1, refresh_interval=3600)
+        self.client = TestClient(TestServer(self.api.build_app()))
+        await self.client.start_server()
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        for p in self.patches:
+            p.stop()
+
+    async def test_polls_between_blocks_hit_cache(self):
+        for _ in range(3):
+            response = await self.client.get(f"/tokens/{TOKEN}/top-holders?limit=5")
+            self.assertEqual(response.status, 200)
+        self.assertEqual(self.holders_mock.call_count, 1)
+        self.assertEqual(response.headers["X-Indexed-Block"], "100")
+
+    async def test_if_none_match(self):
+        response = await self.client.get(f"/tokens/{TOKEN}/top-holders")
+        etag = response.headers["ETag"]
+        response = await self.client.get(f"/tokens/{TOKEN}/top-holders", headers={"If-None-Match": etag})
+        self.assertEqual(response.status, 304)
+
+    async def test_invalidated_when_token_advances(self):
+        await self.client.get(f"/tokens/{TOKEN}/top-holders")
+        self.state = IndexerStateModel(chain_id=1, token_address=TOKEN, last_block=101, version=2)
+        await self.api.refresh_positions()
+        response = await self.client.get(f"/tokens/{TOKEN}/top-holders")
+        self.assertEqual(self.holders_mock.call_count, 2)
+        self.assertEqual(response.headers["X-Indexed-Block"], "101")
+        # The query must read a database at the position the response is cached for
+        self.holders_mock.assert_called_with(1, TOKEN, 10, expected={TOKEN: (101, 2)})
+
+    async def test_invalid_address(self):
+        response = await self.client.get("/tokens/0x1234/top-holders")
+        self.assertEqual(response.status, 400)
+
+    async def test_wallet_transfers_cursor(self):
+        transfer = TransferModel(
+            chain_id=1,
+            block_num=99,
+            log_index=7,
+            tx_hash="0x00",
+            tx_from=WALLET,
+            tx_to=TOKEN,
+            value=Decimal(1),
+            type="Transfer",
+            token_address=TOKEN,
+        )
+        with patch("src.db.get_wallet_transfers", return_value=([transfer], (99, 7))) as transfers_mock:
+            response = await self.client.get(f"/tokens/{TOKEN}/wallets/{WALLET}/transfers?limit=1&before=100:3")
+            body = await response.json()
+        self.assertEqual(body["next"], "99:7")
+        self.assertEqual(body["transfers"][0]["log_index"], 7)
+        transfers_mock.assert_called_once_with(1, TOKEN, WALLET, 1, (100, 3), expected={TOKEN: (100, 1)})
+
+        response = await self.client.get(f"/tokens/{TOKEN}/wallets/{WALLET}/transfers?before=100")
+        self.assertEqual(response.status, 400)
+
+    async def test_wallet_portfolio(self):
+        entry = PortfolioEntryModel(
+            chain_id=1,
+            wallet_address=WALLET,
+            token_address=TOKEN,
+            decimals=18,
+            balance=Decimal("1.5"),
+            raw_balance=1500000000000000000,
+        )
+        with patch("src.db.get_wallet_portfolio", return_value=[entry]) as portfolio_mock:
+            for _ in range(2):
+                response = await self.client.get(f"/wallets/{WALLET}/portfolio")
+            body = await response.json()
+            self.assertEqual(body[0]["token_address"], TOKEN)
+            self.assertEqual(body[0]["raw_balance"], 1500000000000000000)
+            self.assertEqual(portfolio_mock.call_count, 1)
+            portfolio_mock.assert_called_once_with(1, WALLET, expected={TOKEN: (100, 1)})
+
+            # Any token advancing invalidates the portfolios
+            self.state = IndexerStateModel(chain_id=1, token_address=TOKEN, last_block=101, version=2)
+            await self.api.refresh_positions()
+            await self.client.get(f"/wallets/{WALLET}/portfolio")
+            self.assertEqual(portfolio_mock.call_count, 2)
@@ -0,0 +1,113 @@
+import csv
+import gzip
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+from src.db.schemas.retention.retention_compaction import _checkpoint_deltas
+from src.models import TransferRetentionModel
+from src.services import RetentionService
+from src.utils.address_utils import address_to_bytes
+from src.constants import NULL_ADDRESS
+
+TOKEN = "0xdac17f958d2ee523a2206206994597c13d831ec7"
+NULL = address_to_bytes(NULL_ADDRESS)
+ALICE = bytes.fromhex("861ff4c1aa2591dac7b24a0e80631f77f59a06dc")
+BOB = bytes.fromhex("a0b86991c6218b36c1d19d4a2e9eb0ce3606eb48")
+
+
+def _row(block_num, tx_from, tx_to, value):
+    """TRANSFER_ARCHIVE_COLUMNS row"""
+    return (block_num, 0, "0x00", tx_from, tx_to, Decimal(value), "ERC20", datetime(2023, 1, 1))
+
+
+class TestCheckpointDeltas(unittest.TestCase):
+    """Test the balance checkpoint of compacted transfers"""
+
+    def test_checkpoint_plus_remaining_is_balance(self):
+        rows = [
+            _row(1, NULL, ALICE, "100"),
+            _row(2, ALICE, BOB, "30.5"),
+            _row(3, BOB, NULL, "10"),
+            _row(4, ALICE, BOB, "1"),
+            _row(5, BOB, ALICE, "0.25"),
+        ]
+        deltas, minted, burned = _checkpoint_deltas(rows)
+        self.assertEqual(deltas, {ALICE: Decimal("68.75"), BOB: Decimal("21.25")})
+        self.assertEqual((minted, burned), (Decimal(100), Decimal(10)))
+
+        # Compacted in two batches
+        first, first_minted, first_burned = _checkpoint_deltas(rows[:2])
+        second, second_minted, second_burned = _checkpoint_deltas(rows[2:])
+        for wallet in (ALICE, BOB):
+            self.assertEqual(first.get(wallet, 0) + second.get(wallet, 0), deltas[wallet])
+        self.assertEqual(first_minted + second_minted - first_burned - second_burned, Decimal(90))
+
+
+class TestRetentionService(unittest.TestCase):
+    """Test RetentionService Class, with the db functions patched"""
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.retention = TransferRetentionModel(
+            chain_id=1, token_address=TOKEN, retain_blocks=100, archive_dir=self.dir.name, cutoff_block=None,
+        )
+        self.rows = [_row(block_num, ALICE, BOB, "1") for block_num in (850, 880, 900)]
+
+    def patch_db(self, retention, last_block=1000):
+        patches = [
+            patch("src.db.get_transfer_retention", return_value=retention),
+            patch("src.db.get_last_indexed_block", return_value=last_block),
+            patch("src.db.get_last_transfer_id", return_value=42),
+            patch("src.db.stream_compactable_transfers", return_value=iter([self.rows[:2], self.rows[2:]])),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_archives_then_compacts(self):
+        self.patch_db(self.retention)
+
+        def compact(chain_id, token_address, cutoff_block, max_id, batch_size):
+            # The archive is complete before any transfer is deleted
+            with gzip.open(os.path.join(self.dir.name, os.listdir(self.dir.name)[0]), "rt", newline="") as f:
+                self.assertEqual(len(list(csv.reader(f))), 1 + len(self.rows))
+            return len(self.rows)
+
+        with patch("src.db.compact_token_transfers", side_effect=compact) as compact_mock:
+            report = RetentionService(1, batch_size=2).compact(TOKEN)
+
+        compact_mock.assert_called_once_with(1, TOKEN, 900, 42, 2)
+        self.assertEqual(report.cutoff_block, 900)
+        self.assertEqual(report.compacted, 3)
+        self.assertEqual(len(report.files), 1)
+        self.assertTrue(report.files[0].endswith(".csv.gz"))
+        with gzip.open(report.files[0], "rt", newline="") as f:
+            content = list(csv.reader(f))
+        self.assertEqual(content[0][:2], ["block_num", "log_index"])
+        self.assertEqual(content[1][3:6], ["0x" + ALICE.hex(), "0x" + BOB.hex(), "1"])
+
+    def test_delete_only(self):
+        self.patch_db(self.retention.copy(update={"archive_dir": None}))
+        with patch("src.db.compact_token_transfers", return_value=3):
+            report = RetentionService(1).compact(TOKEN)
+        self.assertEqual(report.files, [])
+        self.assertEqual(os.listdir(self.dir.name), [])
+
+    def test_nothing_old_enough(self):
+        self.patch_db(self.retention, last_block=50)
+        with patch("src.db.compact_token_transfers") as compact_mock:
+            report = RetentionService(1).compact(TOKEN)
+        compact_mock.assert_not_called()
+        self.assertIsNone(report.cutoff_block)
+
+    def test_no_policy(self):
+        self.patch_db(None)
+        with self.assertRaises(Exception):
+            RetentionService(1).compact(TOKEN)
+        with self.assertRaises(Exception):
+            RetentionService(1).set_policy(TOKEN, -1)
@@ -0,0 +1,59 @@
+import unittest
+from datetime import datetime
+from decimal import Decimal
+
+from src.models import TransferModel
+from src.utils.rollups import bucket_start, rollup_transfers
+from src.constants import NULL_ADDRESS
+
+
+def transfer(tx_from: str, tx_to: str, value: int, block_time: datetime | None) -> TransferModel:
+    return TransferModel(
+        chain_id=1,
+        block_num=1,
+        tx_hash="0x00",
+        tx_from=tx_from,
+        tx_to=tx_to,
+        value=Decimal(value),
+        type="erc20",
+        token_address="0xdac17f958d2ee523a2206206994597c13d831ec7",
+        block_time=block_time,
+    )
+
+
+class TestRollups(unittest.TestCase):
+    """Test transfer rollup aggregation"""
+
+    alice = "0x20dc3024213990d0cae48313da541459648a9483"
+    bob = "0x861ff4c1aa2591dac7b24a0e80631f77f59a06dc"
+
+    def test_bucket_start(self):
+        block_time = datetime(2023, 5, 17, 13, 42, 7)
+        self.assertEqual(bucket_start(block_time, "hour"), datetime(2023, 5, 17, 13))
+        self.assertEqual(bucket_start(block_time, "day"), datetime(2023, 5, 17))
+        with self.assertRaises(ValueError):
+            bucket_start(block_time, "week")
+
+    def test_volume_and_count(self):
+        buckets, _ = rollup_transfers([
+            transfer(self.alice, self.bob, 10, datetime(2023, 5, 17, 13, 1)),
+            transfer(self.bob, self.alice, 5, datetime(2023, 5, 17, 13, 59)),
+            transfer(self.alice, self.bob, 1, datetime(2023, 5, 17, 14, 0)),
+        ])
+        self.assertEqual(buckets[("hour", datetime(2023, 5, 17, 13))], [Decimal(15), 2])
+        self.assertEqual(buckets[("hour", datetime(2023, 5, 17, 14))], [Decimal(1), 1])
+        self.assertEqual(buckets[("day", datetime(2023, 5, 17))], [Decimal(16), 3])
+
+    def test_wallet_days(self):
+        day = datetime(2023, 5, 17)
+        _, wallet_days = rollup_transfers([
+            transfer(NULL_ADDRESS, self.alice, 10, datetime(2023, 5, 17, 1)),
+            transfer(self.alice, self.bob, 5, datetime(2023, 5, 17, 2)),
+            transfer(self.alice, self.bob, 1, datetime(2023, 5, 17, 3)),
+        ])
+        self.assertEqual(wallet_days, {(day, True, self.alice), (day, False, self.alice), (day, False, self.bob)})
+
+    def test_skips_transfers_without_block_time(self):
+        buckets, wallet_days = rollup_transfers([transfer(self.alice, self.bob, 10, None)])
+        self.assertEqual(buckets, {})
+        self.assertEqual(wallet_days, set())
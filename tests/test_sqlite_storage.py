@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+from src.db import Storage, get_storage
+from src.db.sqlite_storage import SQLiteStorage
+from src.models import TransferModel, BalanceModel
+from src.services import IndexerService
+from src.constants import NULL_ADDRESS
+
+TOKEN = "0xdac17f958d2ee523a2206206994597c13d831ec7"
+ALICE = "0x20dc3024213990d0cae48313da541459648a9483"
+BOB = "0x861ff4c1aa2591dac7b24a0e80631f77f59a06dc"
+
+
+def transfer(tx_from: str, tx_to: str, value: str, block_num: int, log_index: int = 0) -> TransferModel:
+    return TransferModel(
+        chain_id=1,
+        block_num=block_num,
+        log_index=log_index,
+        tx_hash="0x00",
+        tx_from=tx_from,
+        tx_to=tx_to,
+        value=Decimal(value),
+        type="Transfer",
+        token_address=TOKEN,
+        block_time=datetime(2023, 5, 17, 13, block_num % 60),
+    )
+
+
+class TestSQLiteStorage(unittest.TestCase):
+    """Test the embedded SQLite Storage"""
+
+    def setUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.storage = get_storage("sqlite:///" + os.path.join(self.dir.name, "indexer.db"))
+        self.storage.create_tables()
+
+    def tearDown(self) -> None:
+        self.storage.close()
+        self.dir.cleanup()
+
+    def test_get_storage(self):
+        self.assertIsInstance(self.storage, SQLiteStorage)
+        with self.assertRaises(ValueError):
+            get_storage("mysql://localhost/indexer")
+
+    def test_incomplete_storage(self):
+        class CreateOnlyStorage(Storage):
+            def create_tables(self) -> None:
+                pass
+
+        with self.assertRaises(TypeError):
+            CreateOnlyStorage()
+
+    def test_wal(self):
+        self.assertEqual(self.storage._conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_increment_balance_is_exact(self):
+        self.storage.increment_balance(1, TOKEN, ALICE, Decimal("123456789.123456789123456789"))
+        new_balance = self.storage.increment_balance(1, TOKEN, ALICE, Decimal("0.000000000000000001"))
+        self.assertEqual(new_balance, Decimal("123456789.123456789123456790"))
+
+    def token_state(self):
+        holders = self.storage.get_token_top_holders(1, TOKEN)
+        stats = self.storage._conn.execute("SELECT holder_count, total_minted FROM token_stats").fetchone()
+        rollup = self.storage._conn.execute("SELECT transfer_count FROM transfer_rollups WHERE period = 'day'").fetchone()
+        return (
+            self.storage._conn.execute("SELECT count(*) FROM transfers").fetchone()[0],
+            {holder.wallet_address: holder.balance for holder in holders},
+            (stats[0], Decimal(stats[1])) if stats else None,
+            rollup[0] if rollup else None,
+            self.storage.get_last_indexed_block(1, TOKEN),
+        )
+
+    def test_transfer_batch_commits_together(self):
+        batch = [transfer(NULL_ADDRESS, ALICE, "10", 1), transfer(ALICE, BOB, "4", 2)]
+        # Crash after the transfers, balances and stats are written, before the rollups and the indexer state
+        with patch.object(SQLiteStorage, "_apply_transfer_rollups", side_effect=RuntimeError("crash")):
+            with self.assertRaises(RuntimeError):
+                self.storage.apply_transfer_batch(1, TOKEN, batch, 2)
+        self.assertEqual(self.token_state(), (0, {}, None, None, None))
+
+        applied, changes = self.storage.apply_transfer_batch(1, TOKEN, batch, 2)
+        self.assertEqual(applied, 2)
+        self.assertEqual(changes, {ALICE: (Decimal(6), 2), BOB: (Decimal(4), 2)})
+        self.assertEqual(self.token_state(), (2, {ALICE: 6, BOB: 4}, (2, Decimal(10)), 2, 2))
+
+    def test_replayed_batch_applied_once(self):
+        service = IndexerService(1, provider=None, storage=self.storage)
+        batch = [transfer(NULL_ADDRESS, ALICE, "10", 1), transfer(ALICE, BOB, "4", 2), transfer(BOB, ALICE, "1", 3)]
+        self.assertEqual(service._apply_transfers(batch[:2]), 2)
+        # Resumed from block 1 after a restart, with a block mined since
+        self.assertEqual(service._apply_transfers(batch), 1)
+        self.assertEqual(service._apply_transfers(batch), 0)
+        self.assertEqual(self.token_state(), (3, {ALICE: 7, BOB: 3}, (2, Decimal(10)), 3, 3))
+
+    def test_top_holders(self):
+        self.storage.insert_balances(1, [
+            BalanceModel(chain_id=1, token_address=TOKEN, wallet_address=ALICE, balance=Decimal(5)),
+            BalanceModel(chain_id=1, token_address=TOKEN, wallet_address=BOB, balance=Decimal(7)),
+        ])
+        holders = self.storage.get_token_top_holders(1, TOKEN, 1)
+        self.assertEqual([(holder.wallet_address, holder.balance) for holder in holders], [(BOB, Decimal(7))])
+        self.storage.delete_token_balances(1, TOKEN)
+        self.assertEqual(self.storage.get_token_top_holders(1, TOKEN), [])
+
+    def test_indexer_state(self):
+        self.assertIsNone(self.storage.get_last_indexed_block(1, TOKEN))
+        self.storage.set_last_indexed_block(1, TOKEN, 100)
+        self.storage.set_last_indexed_block(1, TOKEN, 101)
+        self.assertEqual(self.storage.get_last_indexed_block(1, TOKEN), 101)
+
+    def test_rollups_count_unique_wallets_once(self):
+        self.storage.apply_transfer_rollups(1, TOKEN, [transfer(ALICE, BOB, "1", 1)])
+        self.storage.apply_transfer_rollups(1, TOKEN, [transfer(ALICE, BOB, "2", 2), transfer(BOB, ALICE, "3", 3)])
+        row = self.storage._conn.execute(
+            "SELECT volume, transfer_count, unique_senders, unique_receivers FROM transfer_rollups WHERE period = 'day'"
+        ).fetchone()
+        self.assertEqual((Decimal(row[0]), row[1], row[2], row[3]), (Decimal(6), 3, 2, 2))
+
+    def test_indexer_runs_on_sqlite(self):
+        service = IndexerService(1, provider=None, storage=self.storage)
+        service._apply_transfers([transfer(NULL_ADDRESS, ALICE, "10", 1), transfer(ALICE, BOB, "4", 2)])
+        holders = self.storage.get_token_top_holders(1, TOKEN)
+        self.assertEqual({holder.wallet_address: holder.balance for holder in holders}, {ALICE: 6, BOB: 4})
+        stats = self.storage._conn.execute("SELECT holder_count, total_minted FROM token_stats").fetchone()
+        self.assertEqual((stats[0], Decimal(stats[1])), (2, Decimal(10)))
+        self.assertEqual(self.storage.get_last_indexed_block(1, TOKEN), 2)
@@ -0,0 +1,146 @@
+import os
+import tempfile
+import asyncio
+import unittest
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from src.db import get_storage
+from src.providers import AlchemyProvider
+from src.providers.stand_in_node import StandInNode
+from src.services import IndexerService
+from src.services.load_test_service import LoadTestService, percentile
+from src.constants import TRANSFER_TOPIC
+
+TOKENS = ["0xdac17f958d2ee523a2206206994597c13d831ec7", "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"]
+
+
+class TestStandInNode(unittest.IsolatedAsyncioTestCase):
+    """Test the JSON-RPC and subscription methods of StandInNode"""
+
+    async def asyncSetUp(self) -> None:
+        self.node = StandInNode(TOKENS, transfers_per_second=10, history_blocks=5, start_block=100)
+        self.client = TestClient(TestServer(self.node.build_app()))
+        await self.client.start_server()
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+
+    async def rpc(self, method: str, params: list):
+        response = await self.client.post("/", json={"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+        return (await response.json())["result"]
+
+    async def test_get_logs_and_headers(self):
+        self.assertEqual(await self.rpc("eth_blockNumber", []), hex(104))
+        logs = await self.rpc("eth_getLogs", [{
+            "fromBlock": hex(101), "toBlock": hex(102), "address": TOKENS[0], "topics": [TRANSFER_TOPIC],
+        }])
+        self.assertTrue(logs)
+        self.assertEqual({log["address"] for log in logs}, {TOKENS[0]})
+        self.assertEqual({log["blockNumber"] for log in logs} - {hex(101), hex(102)}, set())
+
+        header = await self.rpc("eth_getBlockByNumber", [logs[0]["blockNumber"], False])
+        self.assertEqual(header["number"], logs[0]["blockNumber"])
+        self.assertIsNone(await self.rpc("eth_getBlockByNumber", [hex(105), False]))
+
+    async def test_subscription_with_reorg(self):
+        ws = await self.client.ws_connect("/")
+        await ws.send_json({"jsonrpc": "2.0", "id": 1, "method": "eth_subscribe", "params": [
+            "logs", {"address": [TOKENS[0]], "topics": [TRANSFER_TOPIC]},
+        ]})
+        subscription_id = (await ws.receive_json())["result"]
+
+        block = await self.node.mine_block()
+        new_block = await self.node.reorg()
+        expected = [log for log in block["logs"] if log["address"] == TOKENS[0]]
+        expected_new = [log for log in new_block["logs"] if log["address"] == TOKENS[0]]
+        messages = [await ws.receive_json() for _ in range(2 * len(expected) + len(expected_new))]
+        await ws.close()
+
+        self.assertEqual({message["params"]["subscription"] for message in messages}, {subscription_id})
+        results = [message["params"]["result"] for message in messages]
+        self.assertEqual(results[:len(expected)], expected)
+        self.assertEqual(results[len(expected): 2 * len(expected)], [dict(log, removed=True) for log in expected])
+        self.assertEqual(results[2 * len(expected):], expected_new)
+        self.assertEqual(new_block["number"], block["number"])
+        self.assertEqual(self.node.head, block["number"])
+
+
+class TestLoadTestService(unittest.IsolatedAsyncioTestCase):
+    """Test a short offline load test into SQLite"""
+
+    def test_percentile(self):
+        self.assertEqual(percentile(list(range(1, 101)), 0.5), 50)
+        self.assertEqual(percentile(list(range(1, 101)), 0.99), 99)
+        self.assertIsNone(percentile([], 0.5))
+
+    async def test_every_notified_transfer_is_committed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = get_storage("sqlite:///" + os.path.join(tmp, "indexer.db"))
+            storage.create_tables()
+            node = StandInNode(TOKENS, transfers_per_second=200, block_interval=0.1, reorg_every=3)
+            report = await LoadTestService(node, storage, max_concurrency=2).run(duration=1, drain_timeout=10)
+            storage.close()
+
+        self.assertGreater(report.emitted, 0)
+        self.assertEqual(report.committed, report.emitted)
+        self.assertGreater(report.removed, 0)
+        self.assertGreater(report.throughput, 0)
+        self.assertLessEqual(report.latency_p50, report.latency_p99)
+        self.assertTrue(report.memory)
+
+
+class TestCatchUp(unittest.IsolatedAsyncioTestCase):
+    """Test IndexerService.catch_up against a local stand-in node"""
+
+    async def asyncSetUp(self) -> None:
+        self.node = StandInNode(TOKENS, transfers_per_second=3, history_blocks=300, start_block=1000)
+        self.runner = await self.node.serve()
+        host, port = self.runner.addresses[0][:2]
+        self.provider = AlchemyProvider(
+            1, f"http://{host}:{port}/", f"ws://{host}:{port}/", "", compute_units_per_second=1e9
+        )
+        self.token = self.provider.checksum_address(TOKENS[0])
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = get_storage("sqlite:///" + os.path.join(self.tmp.name, "indexer.db"))
+        self.storage.create_tables()
+
+    async def asyncTearDown(self) -> None:
+        self.storage.close()
+        self.tmp.cleanup()
+        await self.runner.cleanup()
+
+    async def catch_up(self) -> int:
+        service = IndexerService(1, self.provider, self.storage)
+        return await asyncio.get_running_loop().run_in_executor(
+            None, service.catch_up, self.token, self.node.first_block, self.node.head
+        )
+
+    async def expected(self) -> int:
+        return len(await asyncio.get_running_loop().run_in_executor(
+            None, self.provider.get_transfer_logs, self.token, self.node.first_block, self.node.head
+        ))
+
+    async def test_catch_up(self):
+        applied = await self.catch_up()
+        self.assertEqual(applied, await self.expected())
+        self.assertEqual(self.storage.get_last_indexed_block(1, self.token), self.node.head)
+
+    async def test_resumes_partially_applied_block(self):
+        logs = await asyncio.get_running_loop().run_in_executor(
+            None, self.provider.get_transfer_logs, self.token, self.node.first_block, self.node.head
+        )
+        block_num = next(log.block_num for log, next_log in zip(logs, logs[1:]) if log.block_num == next_log.block_num)
+        applied = [log for log in logs if log.block_num < block_num] + [next(log for log in logs if log.block_num == block_num)]
+        service = IndexerService(1, self.provider, self.storage)
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: service._apply_transfers([service._parser.decode_log(log) for log in applied], ends_block=False)
+        )
+        self.assertEqual(self.storage.get_last_indexed_block(1, self.token), block_num - 1)
+
+        resumed = await asyncio.get_running_loop().run_in_executor(
+            None, service.catch_up, self.token, block_num, self.node.head
+        )
+        self.assertEqual(resumed, len(logs) - len(applied))
+        stored = self.storage._conn.execute("SELECT block_num, log_index FROM transfers ORDER BY block_num, log_index")
+        self.assertEqual(stored.fetchall(), [(log.block_num, log.log_index) for log in logs])
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest.mock import patch
+
+from src.db import get_storage
+from src.models import LogModel
+from src.parsers import TokenParser
+from src.providers import AlchemyProvider
+from src.providers.stand_in_node import StandInNode
+from src.services import TokenMetadataService
+from src.utils.abi_utils import decode_abi_string, encode_abi_string
+from src.constants import TRANSFER_TOPIC
+
+TOKENS = ["0xdac17f958d2ee523a2206206994597c13d831ec7", "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48"]
+UNKNOWN_TOKEN = "0x600000000a36f3cd48407e35eb7c5c910dc1f7a8"
+
+
+class TestAbiString(unittest.TestCase):
+    """Test the decoding of symbol() and name() return data"""
+
+    def test_abi_string(self):
+        self.assertEqual(decode_abi_string(encode_abi_string("Tether USD")), "Tether USD")
+
+    def test_bytes32(self):
+        self.assertEqual(decode_abi_string(b"MKR" + b"\x00" * 29), "MKR")
+
+    def test_malformed(self):
+        self.assertIsNone(decode_abi_string(b""))
+        self.assertIsNone(decode_abi_string((1000).to_bytes(32, "big") * 2))
+
+
+class TestTokenMetadataService(unittest.IsolatedAsyncioTestCase):
+    """Test TokenMetadataService against a local stand-in node and SQLite"""
+
+    async def asyncSetUp(self) -> None:
+        self.dir = tempfile.TemporaryDirectory()
+        self.storage = get_storage("sqlite:///" + os.path.join(self.dir.name, "indexer.db"))
+        self.storage.create_tables()
+        self.runner = await StandInNode(TOKENS, transfers_per_second=0, decimals=6).serve()
+        host, port = self.runner.addresses[0][:2]
+        self.provider = AlchemyProvider(1, f"http://{host}:{port}/", f"ws://{host}:{port}/", "")
+
+    async def asyncTearDown(self) -> None:
+        await self.runner.cleanup()
+        self.storage.close()
+        self.dir.cleanup()
+
+    async def resolve(self, service: TokenMetadataService, tokens):
+        return await asyncio.get_running_loop().run_in_executor(None, service.resolve, tokens)
+
+    async def test_resolved_once(self):
+        service = TokenMetadataService(1, self.provider, self.storage)
+        with patch.object(self.provider, "get_tokens_metadata", wraps=self.provider.get_tokens_metadata) as fetch:
+            metadata = await self.resolve(service, [TOKENS[0].upper().replace("0X", "0x"), TOKENS[1], UNKNOWN_TOKEN])
+            await self.resolve(service, TOKENS)
+        fetch.assert_called_once()
+        self.assertEqual(metadata[TOKENS[0]].decimals, 6)
+        self.assertEqual(metadata[TOKENS[0]].symbol, "TKN0")
+        self.assertEqual(metadata[TOKENS[1]].name, "Stand-in Token 1")
+        # Not a token: default decimals, no symbol
+        self.assertEqual(metadata[UNKNOWN_TOKEN].decimals, 18)
+        self.assertIsNone(metadata[UNKNOWN_TOKEN].symbol)
+
+        # A new process reads the stored metadata
+        restarted = TokenMetadataService(1, self.provider, self.storage)
+        with patch.object(self.provider, "get_tokens_metadata") as fetch:
+            metadata = await self.resolve(restarted, TOKENS)
+        fetch.assert_not_called()
+        self.assertEqual(metadata[TOKENS[1]].symbol, "TKN1")
+
+    async def test_refuses_tokens_indexed_in_other_units(self):
+        # Indexed by a previous version, scaled by 18 decimals
+        self.storage.set_last_indexed_block(1, TOKENS[0], 100)
+        service = TokenMetadataService(1, self.provider, self.storage)
+        with self.assertRaisesRegex(Exception, "Backfill it again"):
+            await self.resolve(service, TOKENS)
+        self.assertEqual(self.storage.get_tokens_metadata(1, TOKENS), {})
+
+        # A backfill replaces its data
+        metadata = await asyncio.get_running_loop().run_in_executor(None, service.resolve, TOKENS, True)
+        self.assertEqual(metadata[TOKENS[0]].decimals, 6)
+
+    async def test_parser_scales_by_decimals(self):
+        service = TokenMetadataService(1, self.provider, self.storage)
+        await self.resolve(service, TOKENS)
+        log = LogModel(
+            chain_id=1,
+            block_num=1,
+            block_hash="0x00",
+            address=TOKENS[0],
+            topic=TRANSFER_TOPIC,
+            topics=[TRANSFER_TOPIC, "0x" + format(1, "064x"), "0x" + format(2, "064x")],
+            data="0x" + format(1500000, "064x"),
+            transaction_hash="0x00",
+            log_index=0,
+            deleted=False,
+        )
+        self.assertEqual(TokenParser(decimals=service.decimals).decode_log(log).value, Decimal("1.5"))
+        self.assertEqual(TokenParser().decode_log(log).value, Decimal("1.5E-12"))
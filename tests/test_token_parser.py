@@ -84,6 +84,7 @@ class TestTokenParserClass(unittest.TestCase):
         tx_from="0x20dc3024213990d0cae48313da541459648a9483",
         tx_to="0x861ff4c1aa2591dac7b24a0e80631f77f59a06dc",
         value=Decimal(2000000000) / Decimal(10**18),
+        log_index=log_1.log_index,
         type="Transfer",
         token_address=log_1.address,
     )
@@ -95,6 +96,7 @@ class TestTokenParserClass(unittest.TestCase):
         tx_from="0xc5be99a02c6857f9eac67bbce58df5572498f40c",
         tx_to="0xe6c4293235d11c9d241d6d204eb366f0afdbe3fa",
         value=Decimal(148667304358) / Decimal(10**18),
+        log_index=log_2.log_index,
         type="Transfer",
         token_address=log_2.address,
     )